@@ -0,0 +1,94 @@
+# Peak memory of exporting verified users: fetchall() vs server-side cursor.
+#
+#     DATABASE_URL=... python bench/export_memory.py --rows 1000000
+#
+# Seeds a throwaway project with N verified users, then measures each mode
+# in a fresh subprocess (peak RSS from getrusage) and deletes the project.
+from __future__ import annotations
+
+import os
+import sys
+import time
+import argparse
+import resource
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bot import db  # noqa: E402
+from bot.export import export_chunks  # noqa: E402
+
+
+def seed(rows: int) -> int:
+    db.init_db()
+    with db.db() as con, con.cursor() as cur:
+        cur.execute(
+            """
+            INSERT INTO projects (owner_username, network, contract_address)
+            VALUES ('bench', 'eth', %s)
+            RETURNING id
+            """,
+            (f"0xbench{time.time_ns():x}",),
+        )
+        pid = cur.fetchone()[0]
+        cur.execute(
+            """
+            INSERT INTO users (telegram_id, username, project_id, verified, wallet_address)
+            SELECT 1000000000 + g, 'user' || g, %s, 1,
+                   '0x' || lpad(to_hex(g), 40, '0')
+            FROM generate_series(1, %s) AS g
+            """,
+            (pid, rows),
+        )
+    return pid
+
+
+def run_mode(mode: str, pid: int):
+    started = time.perf_counter()
+    sink = open(os.devnull, "wb")
+    if mode == "fetchall":
+        users = db.get_verified_users(pid)
+        rows = [tuple(u[c] for c in db.VERIFIED_USER_COLUMNS) for u in users]
+        count = len(rows)
+        for chunk in export_chunks(rows, "csv"):
+            sink.write(chunk)
+    else:
+        count = 0
+
+        def counted():
+            nonlocal count
+            for row in db.iter_verified_users(pid):
+                count += 1
+                yield row
+
+        for chunk in export_chunks(counted(), "csv"):
+            sink.write(chunk)
+    elapsed = time.perf_counter() - started
+    peak_kib = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss  # KiB on Linux
+    print(f"{mode:<9} rows={count:<9} time={elapsed:6.1f}s peak_rss={peak_kib / 1024:8.1f} MiB")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--mode", choices=("fetchall", "stream"))
+    parser.add_argument("--project", type=int)
+    args = parser.parse_args()
+
+    if args.mode:
+        run_mode(args.mode, args.project)
+        return
+
+    pid = seed(args.rows)
+    try:
+        for mode in ("stream", "fetchall"):
+            subprocess.run(
+                [sys.executable, __file__, "--mode", mode, "--project", str(pid)],
+                check=True,
+            )
+    finally:
+        db.delete_project(pid)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+# In-memory Telegram Bot API transport for benchmarks.
+#
+# Plugs into python-telegram-bot as the `request` of a Bot/Application:
+# every API call is answered locally (no network), counted per method, and
+# the last text sent to each chat is kept so a simulated user can read its
+# captcha question or verification result.
+from __future__ import annotations
+
+import json
+import time
+import itertools
+from collections import Counter
+from typing import Dict, Optional, Tuple
+
+from telegram.request import BaseRequest, RequestData
+
+BOT_USER = {"id": 1, "is_bot": True, "first_name": "Bench", "username": "holderxrbot"}
+
+
+class FakeRequest(BaseRequest):
+    def __init__(self):
+        self.calls: Counter = Counter()
+        self.last_text: Dict[int, str] = {}
+        self._message_ids = itertools.count(1)
+
+    @property
+    def read_timeout(self) -> Optional[float]:
+        return None
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    def _message(self, params: Dict) -> Dict:
+        chat_id = int(params["chat_id"])
+        text = params.get("text") or ""
+        self.last_text[chat_id] = text
+        return {
+            "message_id": int(params.get("message_id") or next(self._message_ids)),
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private" if chat_id > 0 else "channel"},
+            "from": BOT_USER,
+            "text": text,
+        }
+
+    async def do_request(self, url: str, method: str, request_data: Optional[RequestData] = None,
+                         read_timeout=None, write_timeout=None, connect_timeout=None,
+                         pool_timeout=None) -> Tuple[int, bytes]:
+        api_method = url.rsplit("/", 1)[-1]
+        self.calls[api_method] += 1
+        params = request_data.parameters if request_data else {}
+        if api_method == "getMe":
+            result = BOT_USER
+        elif api_method in ("sendMessage", "editMessageText"):
+            result = self._message(params)
+        elif api_method == "sendDocument":
+            result = self._message({"chat_id": params["chat_id"], "text": ""})
+        else:
+            result = True
+        return 200, json.dumps({"ok": True, "result": result}).encode()
+
+    def stats(self) -> Dict[str, int]:
+        return dict(self.calls)
@@ -0,0 +1,163 @@
+# Local stand-in for the balance providers (Alchemy / plain EVM RPC,
+# Helius / Solana RPC, Sui fullnode, Etherscan-style explorers).
+#
+#     python bench/stub_rpc.py --port 8545 --latency 0.05 --jitter 0.02 --error-rate 0.01
+#
+# Paths: /alchemy/<chain>, /rpc/<chain>, /helius, /solana, /sui take JSON-RPC
+# (single or batch); /explorer/<chain>/api answers module=account
+# action=tokenbalance. Whether a wallet holds the token is a deterministic
+# function of its address (--holder-ratio), so reruns see the same answers.
+# A fraction of requests (--error-rate) get HTTP 429 or 500. GET /__stats
+# returns request counts per path.
+from __future__ import annotations
+
+import json
+import base64
+import time
+import random
+import hashlib
+import argparse
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+BALANCE = 10**21
+TOKEN_PROGRAM_ID = "TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA"
+SUI_COIN_TYPE = "0x" + "beef".rjust(64, "0") + "::bench::BENCH"
+
+
+class StubState:
+    def __init__(self, latency: float, jitter: float, error_rate: float, holder_ratio: float):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.holder_ratio = holder_ratio
+        self.requests: Counter = Counter()
+        self.calls: Counter = Counter()
+        self.errors = 0
+        self.lock = threading.Lock()
+
+    def holds(self, wallet: str) -> bool:
+        digest = hashlib.sha1(wallet.lower().encode()).digest()
+        return int.from_bytes(digest[:4], "big") / 2**32 < self.holder_ratio
+
+    def balance(self, wallet: str) -> int:
+        return BALANCE if self.holds(wallet) else 0
+
+
+def _token_account(amount: int) -> dict:
+    """base64 SPL token account (initialized; mint and owner left zeroed)."""
+    data = bytearray(165)
+    data[64:72] = min(amount, 2**64 - 1).to_bytes(8, "little")
+    data[108] = 1
+    return {"owner": TOKEN_PROGRAM_ID, "lamports": 2039280, "data": [base64.b64encode(bytes(data)).decode(), "base64"]}
+
+
+def _rpc_result(state: StubState, method: str, params: list):
+    if method == "eth_call":
+        data = params[0].get("data", "")
+        if data.startswith("0x70a08231"):  # balanceOf(address)
+            return "0x" + format(state.balance("0x" + data[-40:]), "064x")
+        if data.startswith("0x313ce567"):  # decimals()
+            return "0x" + format(18, "064x")
+        return "0x"
+    if method == "eth_blockNumber":
+        return hex(int(time.time()) // 12)
+    if method == "getAccountInfo":  # only asked for mints
+        return {"value": {"owner": TOKEN_PROGRAM_ID, "lamports": 1, "data": ["", "base64"]}}
+    if method == "getMultipleAccounts":  # associated token accounts
+        return {"value": [_token_account(BALANCE) if state.holds(key) else None for key in params[0]]}
+    if method == "getTokenAccountsByOwner":
+        amount = state.balance(params[0])
+        return {"value": [{"pubkey": params[0], "account": _token_account(amount)}] if amount else []}
+    if method == "suix_getAllBalances":  # every holder has SUI, plus the bench coin
+        coins = [{"coinType": "0x2::sui::SUI", "coinObjectCount": 1, "totalBalance": str(BALANCE)}]
+        if state.holds(params[0]):
+            coins.append({"coinType": SUI_COIN_TYPE, "coinObjectCount": 1, "totalBalance": str(BALANCE)})
+        return coins
+    if method == "suix_getBalance":
+        return {"coinType": params[1], "totalBalance": str(state.balance(params[0]))}
+    raise KeyError(method)
+
+
+def _rpc_answer(state: StubState, req: dict) -> dict:
+    with state.lock:
+        state.calls[req.get("method")] += 1
+    try:
+        return {"jsonrpc": "2.0", "id": req.get("id"), "result": _rpc_result(state, req["method"], req.get("params") or [])}
+    except KeyError:
+        return {"jsonrpc": "2.0", "id": req.get("id"), "error": {"code": -32601, "message": "Method not found"}}
+
+
+def make_handler(state: StubState):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status: int, body: dict):
+            raw = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(raw)))
+            self.end_headers()
+            self.wfile.write(raw)
+
+        def _simulate(self, path: str) -> bool:
+            """Sleep the configured latency; True when this request should fail."""
+            with state.lock:
+                state.requests[path] += 1
+            time.sleep(max(0.0, random.gauss(state.latency, state.jitter)))
+            if random.random() < state.error_rate:
+                with state.lock:
+                    state.errors += 1
+                self._send(random.choice((429, 500)), {"error": "stub failure"})
+                return True
+            return False
+
+        def do_GET(self):
+            url = urlsplit(self.path)
+            if url.path == "/__stats":
+                with state.lock:
+                    self._send(200, {"requests": dict(state.requests), "calls": dict(state.calls), "errors": state.errors})
+                return
+            if self._simulate(url.path):
+                return
+            q = {k: v[0] for k, v in parse_qs(url.query).items()}
+            if url.path.startswith("/explorer/") and q.get("action") == "tokenbalance":
+                with state.lock:
+                    state.calls["tokenbalance"] += 1
+                self._send(200, {"status": "1", "message": "OK", "result": str(state.balance(q.get("address", "")))})
+                return
+            self._send(404, {"error": "unknown path"})
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"null")
+            if self._simulate(urlsplit(self.path).path):
+                return
+            if isinstance(body, list):
+                self._send(200, [_rpc_answer(state, req) for req in body])
+            else:
+                self._send(200, _rpc_answer(state, body))
+
+    return Handler
+
+
+def serve(port: int, latency: float = 0.05, jitter: float = 0.0, error_rate: float = 0.0, holder_ratio: float = 0.8):
+    state = StubState(latency, jitter, error_rate, holder_ratio)
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(state))
+    server.daemon_threads = True
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stub balance-provider server for benchmarks")
+    parser.add_argument("--port", type=int, default=8545)
+    parser.add_argument("--latency", type=float, default=0.05, help="mean seconds per request")
+    parser.add_argument("--jitter", type=float, default=0.0, help="latency standard deviation")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction answered with 429/500")
+    parser.add_argument("--holder-ratio", type=float, default=0.8, help="fraction of wallets holding the token")
+    args = parser.parse_args()
+    serve(args.port, args.latency, args.jitter, args.error_rate, args.holder_ratio)
@@ -0,0 +1,456 @@
+# Offline load test of the verification flow.
+#
+#     python bench/verify_load.py --users 5000 --concurrency 200 --network eth
+#     python bench/verify_load.py --users 5000 --save-baseline eth-5k
+#     python bench/verify_load.py --users 5000 --compare eth-5k
+#
+# Every simulated user goes /start verify_<pid> → "✅ Verify" button →
+# captcha answer → wallet, through the real cmd_start / on_button /
+# on_message handlers of a python-telegram-bot Application whose Bot API
+# transport is bench/fakebot.py. Balance checks go to bench/stub_rpc.py
+# (a subprocess emulating Alchemy, Helius, Sui and Etherscan with
+# configurable latency and error rate). Postgres is a throwaway cluster
+# started with initdb/pg_ctl from PATH, or a scratch database created on
+# --database-url and dropped afterwards.
+#
+# Reports throughput, p50/p95/p99 latency per handler, and Bot API calls,
+# provider HTTP requests and Postgres transactions per update. Baselines
+# are saved to bench/baselines/<name>.json; --compare exits 1 when
+# throughput or a handler's p95 regresses by more than --tolerance.
+from __future__ import annotations
+
+import os
+import re
+import sys
+import json
+import time
+import shutil
+import socket
+import asyncio
+import hashlib
+import argparse
+import tempfile
+import itertools
+import subprocess
+import multiprocessing
+import urllib.request
+from collections import Counter
+from typing import Dict, List, Optional
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+import psycopg2  # noqa: E402
+
+from stub_rpc import serve as serve_stub  # noqa: E402
+from bot.solana import b58encode  # noqa: E402  (no config imports)
+
+BASELINE_DIR = os.path.join(BENCH_DIR, "baselines")
+CONTRACTS = {
+    "eth": "0x" + "ab" * 20,
+    "sol": "So11111111111111111111111111111111111111112",
+    "sui": "0xBEEF::bench::BENCH",  # short form of the stub's coin type
+}
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wallet(network: str, i: int) -> str:
+    digest = hashlib.sha256(f"bench-wallet-{i}".encode()).digest()
+    if network == "eth":
+        return "0x" + digest[:20].hex()
+    if network == "sui":
+        return "0x" + digest.hex()
+    return b58encode(digest)
+
+
+def _percentile(ordered: List[float], q: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+# ===========================
+# Throwaway Postgres
+# ===========================
+
+class ScratchPostgres:
+    """A temporary cluster (initdb) or a scratch database on an existing server."""
+
+    def __init__(self, database_url: Optional[str]):
+        self.admin_url = database_url
+        self.tmpdir: Optional[str] = None
+        self.dbname = f"holderxr_bench_{os.getpid()}"
+        self.url = ""
+
+    def __enter__(self) -> "ScratchPostgres":
+        if self.admin_url:
+            con = psycopg2.connect(self.admin_url)
+            con.autocommit = True
+            with con.cursor() as cur:
+                cur.execute(f'CREATE DATABASE "{self.dbname}"')
+            con.close()
+            base, _, query = self.admin_url.partition("?")
+            self.url = f"{base.rsplit('/', 1)[0]}/{self.dbname}" + (f"?{query}" if query else "")
+            return self
+
+        if not shutil.which("initdb") or not shutil.which("pg_ctl"):
+            raise SystemExit("initdb/pg_ctl not on PATH: pass --database-url of a server to create a scratch database on")
+        self.tmpdir = tempfile.mkdtemp(prefix="holderxr-pg-")
+        data, port = os.path.join(self.tmpdir, "data"), _free_port()
+        subprocess.run(["initdb", "-D", data, "-U", "postgres", "-A", "trust"], check=True, stdout=subprocess.DEVNULL)
+        subprocess.run(
+            ["pg_ctl", "-D", data, "-w", "-l", os.path.join(self.tmpdir, "log"),
+             "-o", f"-p {port} -k {self.tmpdir} -c listen_addresses='' -c fsync=off -c max_connections=200",
+             "start"],
+            check=True, stdout=subprocess.DEVNULL,
+        )
+        self.url = f"postgresql://postgres@/postgres?host={self.tmpdir}&port={port}"
+        return self
+
+    def __exit__(self, *exc):
+        if self.tmpdir:
+            subprocess.run(["pg_ctl", "-D", os.path.join(self.tmpdir, "data"), "-m", "immediate", "stop"],
+                           stdout=subprocess.DEVNULL)
+            shutil.rmtree(self.tmpdir, ignore_errors=True)
+        else:
+            con = psycopg2.connect(self.admin_url)
+            con.autocommit = True
+            with con.cursor() as cur:
+                cur.execute(f'DROP DATABASE IF EXISTS "{self.dbname}" WITH (FORCE)')
+            con.close()
+
+    def counters(self) -> Dict[str, int]:
+        """Committed transactions and rows written so far (pg_stat_database)."""
+        con = psycopg2.connect(self.url)
+        try:
+            with con.cursor() as cur:
+                cur.execute(
+                    """
+                    SELECT xact_commit + xact_rollback, tup_inserted + tup_updated + tup_deleted, tup_returned
+                    FROM pg_stat_database WHERE datname = current_database()
+                    """
+                )
+                xacts, written, read = cur.fetchone()
+        finally:
+            con.close()
+        return {"transactions": xacts, "rows_written": written, "rows_read": read}
+
+
+# ===========================
+# Simulated users
+# ===========================
+
+class Driver:
+    def __init__(self, app, transport, project_id: int, network: str):
+        self.app = app
+        self.transport = transport
+        self.project_id = project_id
+        self.network = network
+        self.latencies: Dict[str, List[float]] = {}
+        self.outcomes: Counter = Counter()
+        self.errors: Counter = Counter()
+        self._update_ids = itertools.count(1)
+        self._message_ids = itertools.count(1_000_000)
+
+    def _user(self, uid: int) -> Dict:
+        return {"id": uid, "is_bot": False, "first_name": "Bench", "username": f"bench{uid}"}
+
+    def _message(self, uid: int, text: str) -> Dict:
+        message = {
+            "message_id": next(self._message_ids),
+            "date": int(time.time()),
+            "chat": {"id": uid, "type": "private"},
+            "from": self._user(uid),
+            "text": text,
+        }
+        if text.startswith("/"):
+            message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]
+        return {"update_id": next(self._update_ids), "message": message}
+
+    def _callback(self, uid: int, data: str) -> Dict:
+        return {
+            "update_id": next(self._update_ids),
+            "callback_query": {
+                "id": str(next(self._update_ids)),
+                "from": self._user(uid),
+                "chat_instance": str(uid),
+                "data": data,
+                "message": {
+                    "message_id": next(self._message_ids),
+                    "date": int(time.time()),
+                    "chat": {"id": uid, "type": "private"},
+                    "text": "🚀 Token Holder Verification",
+                },
+            },
+        }
+
+    async def on_error(self, update, context):
+        self.errors[type(context.error).__name__] += 1
+
+    async def _send(self, label: str, payload: Dict):
+        from telegram import Update
+
+        update = Update.de_json(payload, self.app.bot)
+        started = time.perf_counter()
+        await self.app.process_update(update)
+        self.latencies.setdefault(label, []).append(time.perf_counter() - started)
+
+    async def user_flow(self, i: int):
+        uid = 5_000_000_000 + i
+        await self._send("cmd_start", self._message(uid, f"/start verify_{self.project_id}"))
+        await self._send("on_button", self._callback(uid, f"user_verify:{self.project_id}"))
+        question = re.search(r"(\d+) \+ (\d+)", self.transport.last_text.get(uid, ""))
+        if not question:
+            self.outcomes["no_captcha"] += 1
+            return
+        answer = int(question.group(1)) + int(question.group(2))
+        await self._send("on_message:VERIFY_MATH", self._message(uid, str(answer)))
+        await self._send("on_message:VERIFY_WALLET", self._message(uid, _wallet(self.network, i)))
+        reply = self.transport.last_text.get(uid, "")
+        if "Verified" in reply:
+            self.outcomes["verified"] += 1
+        elif "do not hold" in reply:
+            self.outcomes["not_holder"] += 1
+        elif "busy" in reply:
+            self.outcomes["provider_busy"] += 1
+        else:
+            self.outcomes["other"] += 1
+
+
+async def run(args, pg: ScratchPostgres, stub_url: str) -> Dict:
+    # bot.* reads its configuration at import time
+    os.environ.update({
+        "TELEGRAM_BOT_TOKEN": "1:bench",
+        "DATABASE_URL": pg.url + ("&" if "?" in pg.url else "?") + "sslmode=disable",
+        "DB_BACKEND": args.db_backend,
+        "DB_POOL_MAX": str(args.db_pool),
+        "ADMIN_USERNAMES": "",
+        "JOB_QUEUE": "inline",
+        "HOLDER_INDEX_PROJECTS": "",
+        "ALCHEMY_API_KEY": "",
+        "HELIUS_API_KEY": "",
+        "ETHERSCAN_API_KEY": "",
+        "BASESCAN_API_KEY": "",
+        "BSCSCAN_API_KEY": "",
+        "ETH_RPC_URL": f"{stub_url}/rpc/eth",
+        "BASE_RPC_URL": f"{stub_url}/rpc/base",
+        "BSC_RPC_URL": f"{stub_url}/rpc/bsc",
+        "SOLANA_RPC_URL": f"{stub_url}/solana",
+        "SUI_RPC_URL": f"{stub_url}/sui",
+        "PROVIDER_RATE_LIMITS": "127.0.0.1=100000",
+        "CACHE_PG_ENABLED": "1" if args.pg_cache else "0",
+    })
+    from telegram.ext import Application, CommandHandler, MessageHandler, CallbackQueryHandler, filters
+
+    from fakebot import FakeRequest
+    from bot import db, blockchain
+    from bot.providers import Provider, ProviderRegistry
+    from bot.adb import close_pool as close_db_pool
+    from bot.httpclient import aclose as close_http_clients
+    from bot.state import store as state_store, flush_states
+    from bot.projects import registry as projects
+    from bot.handlers import cmd_start, on_button, on_message
+    from bot import tasks  # noqa: F401  (registers job kinds)
+
+    # The same provider mix as production, pointed at the stub
+    stubs = ProviderRegistry()
+    stubs.register(Provider("alchemy", "eth", lambda a, c: blockchain._evm_balance_rpc(f"{stub_url}/alchemy/eth", a, c)))
+    stubs.register(Provider("explorer", "eth", lambda a, c: blockchain._evm_balance_explorer(
+        f"{stub_url}/explorer/eth/api", "bench", a, c)))
+    stubs.register(Provider("helius", "solana", lambda a, m, n=1: blockchain._solana_balance(f"{stub_url}/helius", a, m, n)))
+    stubs.register(Provider("rpc", "solana", lambda a, m, n=1: blockchain._solana_balance(f"{stub_url}/solana", a, m, n)))
+    stubs.register(Provider("rpc", "sui", lambda a, t: blockchain._sui_balance(f"{stub_url}/sui", a, t)))
+    blockchain.registry = stubs
+
+    db.init_db()
+    state_store.load()
+    pid = db.create_project("bench")
+    db.set_project_contract(pid, args.network, CONTRACTS[args.network])
+    await projects.reload()
+
+    transport = FakeRequest()
+    app = Application.builder().token("1:bench").request(transport).get_updates_request(FakeRequest()).build()
+    app.add_handler(CommandHandler("start", cmd_start))
+    app.add_handler(CallbackQueryHandler(on_button))
+    app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, on_message))
+    driver = Driver(app, transport, pid, args.network)
+    app.add_error_handler(driver.on_error)
+    await app.initialize()
+    sem = asyncio.Semaphore(args.concurrency)
+
+    async def one(i: int):
+        async with sem:
+            await driver.user_flow(i)
+
+    async def flusher():
+        while True:
+            await asyncio.sleep(float(os.getenv("STATE_FLUSH_INTERVAL", "2")))
+            await flush_states()
+
+    db_before = pg.counters()
+    telegram_before = Counter(transport.calls)
+    started = time.perf_counter()
+    flushing = asyncio.create_task(flusher())
+    try:
+        await asyncio.gather(*(one(i) for i in range(args.users)))
+    finally:
+        flushing.cancel()
+    elapsed = time.perf_counter() - started
+    await flush_states()
+
+    await asyncio.sleep(1.0)  # let the backends report their counters
+    db_after = pg.counters()
+    with urllib.request.urlopen(f"{stub_url}/__stats") as r:
+        stub = json.loads(r.read())
+
+    await app.shutdown()
+    await close_http_clients()
+    await close_db_pool()
+    db.close_pool()
+
+    updates = sum(len(v) for v in driver.latencies.values())
+    per_update = lambda n: round(n / updates, 3) if updates else 0.0  # noqa: E731
+    telegram = Counter(transport.calls) - telegram_before
+    return {
+        "config": {
+            "users": args.users,
+            "concurrency": args.concurrency,
+            "network": args.network,
+            "latency": args.latency,
+            "error_rate": args.error_rate,
+            "db_backend": args.db_backend,
+            "pg_cache": args.pg_cache,
+        },
+        "elapsed_s": round(elapsed, 3),
+        "updates": updates,
+        "updates_per_s": round(updates / elapsed, 1),
+        "verifications_per_s": round(args.users / elapsed, 1),
+        "outcomes": dict(driver.outcomes),
+        "handler_errors": dict(driver.errors),
+        "handlers": {
+            label: {
+                "count": len(samples),
+                "p50_ms": round(_percentile(ordered, 0.50) * 1000, 2),
+                "p95_ms": round(_percentile(ordered, 0.95) * 1000, 2),
+                "p99_ms": round(_percentile(ordered, 0.99) * 1000, 2),
+            }
+            for label, samples in driver.latencies.items()
+            for ordered in [sorted(samples)]
+        },
+        "per_update": {
+            "telegram_calls": per_update(sum(telegram.values())),
+            "provider_requests": per_update(sum(stub["requests"].values())),
+            "db_transactions": per_update(db_after["transactions"] - db_before["transactions"]),
+            "db_rows_written": per_update(db_after["rows_written"] - db_before["rows_written"]),
+        },
+        "telegram_calls": dict(telegram),
+        "provider_requests": stub["requests"],
+        "provider_errors": stub["errors"],
+    }
+
+
+# ===========================
+# Reporting / baselines
+# ===========================
+
+def print_report(result: Dict):
+    cfg = result["config"]
+    print(f"\n{cfg['users']} users • concurrency {cfg['concurrency']} • {cfg['network']} • "
+          f"stub latency {cfg['latency'] * 1000:.0f}ms • error rate {cfg['error_rate']:.1%} • {cfg['db_backend']}")
+    print(f"{result['updates']} updates in {result['elapsed_s']:.2f}s: "
+          f"{result['updates_per_s']:.1f} updates/s, {result['verifications_per_s']:.1f} verifications/s")
+    print(f"Outcomes: {result['outcomes']}")
+    if result["handler_errors"]:
+        print(f"Handler errors: {result['handler_errors']}")
+    print(f"\n{'handler':<26}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for label, h in result["handlers"].items():
+        print(f"{label:<26}{h['count']:>8}{h['p50_ms']:>10.2f}{h['p95_ms']:>10.2f}{h['p99_ms']:>10.2f}")
+    print("\nPer update: " + ", ".join(f"{k} {v}" for k, v in result["per_update"].items()))
+    print(f"Bot API calls: {result['telegram_calls']}")
+    print(f"Provider requests: {result['provider_requests']} ({result['provider_errors']} injected errors)")
+
+
+def compare(result: Dict, name: str, tolerance: float) -> bool:
+    """Print deltas against a saved baseline; False on a regression beyond `tolerance`."""
+    with open(os.path.join(BASELINE_DIR, f"{name}.json")) as f:
+        base = json.load(f)
+    ok = True
+    print(f"\nAgainst baseline {name!r}:")
+    delta = result["updates_per_s"] / base["updates_per_s"] - 1
+    flag = delta < -tolerance
+    ok &= not flag
+    print(f"  updates/s {base['updates_per_s']:.1f} → {result['updates_per_s']:.1f} ({delta:+.1%}){'  REGRESSION' if flag else ''}")
+    for label, h in result["handlers"].items():
+        old = base["handlers"].get(label)
+        if not old or not old["p95_ms"]:
+            continue
+        delta = h["p95_ms"] / old["p95_ms"] - 1
+        flag = delta > tolerance
+        ok &= not flag
+        print(f"  {label} p95 {old['p95_ms']:.2f} → {h['p95_ms']:.2f} ms ({delta:+.1%}){'  REGRESSION' if flag else ''}")
+    for key, value in result["per_update"].items():
+        old = base["per_update"].get(key)
+        if old is not None and value != old:
+            print(f"  {key} per update {old} → {value}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline load test of the verification flow")
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=100, help="users mid-flow at once")
+    parser.add_argument("--network", choices=sorted(CONTRACTS), default="eth")
+    parser.add_argument("--latency", type=float, default=0.05, help="stub provider latency (s)")
+    parser.add_argument("--jitter", type=float, default=0.01)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of provider requests failing")
+    parser.add_argument("--holder-ratio", type=float, default=0.8)
+    parser.add_argument("--database-url", help="server to create a scratch database on (default: temporary initdb cluster)")
+    parser.add_argument("--db-backend", choices=("psycopg2", "asyncpg"), default="psycopg2")
+    parser.add_argument("--db-pool", type=int, default=20)
+    parser.add_argument("--pg-cache", action="store_true", help="enable the kv_cache holder-result tier")
+    parser.add_argument("--save-baseline", metavar="NAME")
+    parser.add_argument("--compare", metavar="NAME")
+    parser.add_argument("--tolerance", type=float, default=0.15)
+    parser.add_argument("--json", action="store_true", help="print the raw result as JSON")
+    args = parser.parse_args()
+
+    port = _free_port()
+    stub = multiprocessing.get_context("spawn").Process(
+        target=serve_stub, args=(port, args.latency, args.jitter, args.error_rate, args.holder_ratio), daemon=True
+    )
+    stub.start()
+    stub_url = f"http://127.0.0.1:{port}"
+    for _ in range(50):
+        try:
+            urllib.request.urlopen(f"{stub_url}/__stats").close()
+            break
+        except OSError:
+            time.sleep(0.1)
+
+    try:
+        with ScratchPostgres(args.database_url) as pg:
+            result = asyncio.run(run(args, pg, stub_url))
+    finally:
+        stub.terminate()
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print_report(result)
+    if args.save_baseline:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        with open(os.path.join(BASELINE_DIR, f"{args.save_baseline}.json"), "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"\nSaved baseline {args.save_baseline!r}")
+    if args.compare and not compare(result, args.compare, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import json
+import asyncio
+import logging
+import weakref
+import functools
+from contextlib import asynccontextmanager
+from typing import Dict, List, Tuple
+
+from . import db, metrics
+
+try:  # only needed with DB_BACKEND=asyncpg
+    import asyncpg
+except ImportError:  # pragma: no cover - depends on environment
+    asyncpg = None
+
+logger = logging.getLogger(__name__)
+
+# Async twin of bot/db.py for the request path. With DB_BACKEND=asyncpg the
+# queries run on an asyncpg pool (statements are prepared once and cached
+# per connection); otherwise each call runs the bot/db.py function in a
+# worker thread. Either way the event loop is free while a query runs.
+USE_ASYNCPG = db.DB_BACKEND == "asyncpg"
+
+# asyncpg pools are bound to the loop that created them
+_pools: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Future]" = weakref.WeakKeyDictionary()
+
+
+async def _create_pool():
+    if asyncpg is None:
+        raise RuntimeError("DB_BACKEND=asyncpg requires the asyncpg package")
+    return await asyncpg.create_pool(
+        db._dsn(),
+        min_size=db.DB_POOL_MIN,
+        max_size=db.DB_POOL_MAX,
+        max_inactive_connection_lifetime=db.DB_POOL_MAX_AGE,
+        statement_cache_size=db.DB_STATEMENT_CACHE_SIZE,
+    )
+
+
+async def get_pool():
+    loop = asyncio.get_running_loop()
+    fut = _pools.get(loop)
+    if fut is None:
+        fut = _pools[loop] = asyncio.ensure_future(_create_pool())
+    try:
+        return await asyncio.shield(fut)
+    except Exception:
+        if _pools.get(loop) is fut:
+            del _pools[loop]
+        raise
+
+
+async def close_pool():
+    """Close the running loop's asyncpg pool (call on shutdown)."""
+    fut = _pools.pop(asyncio.get_running_loop(), None)
+    if fut is not None and fut.done() and not fut.exception():
+        await fut.result().close()
+
+
+@asynccontextmanager
+async def adb():
+    """Pooled asyncpg connection inside a transaction (commit on success)."""
+    pool = await get_pool()
+    async with pool.acquire(timeout=db.DB_POOL_TIMEOUT) as con:
+        async with con.transaction():
+            yield con
+
+
+def _or_thread(sync_fn):
+    """Run the native coroutine with asyncpg, else `sync_fn` in a worker thread."""
+    def wrap(native):
+        native_timed = metrics.DB_SECONDS.timed(function=native.__name__, backend="asyncpg")(native)
+
+        @functools.wraps(native)
+        async def call(*args, **kwargs):
+            if USE_ASYNCPG:
+                return await native_timed(*args, **kwargs)
+            return await asyncio.to_thread(sync_fn, *args, **kwargs)
+        return call
+    return wrap
+
+
+# ===== Projects =====
+_PROJECT_COLUMNS = "id, owner_username, network, contract_address, group_invite_link, channel_chat_id, created_at"
+
+
+@_or_thread(db.get_all_projects)
+async def get_all_projects() -> List[Dict]:
+    """Return a list of all projects (dicts, newest first)."""
+    async with adb() as con:
+        rows = await con.fetch(f"SELECT {_PROJECT_COLUMNS} FROM projects ORDER BY created_at DESC")
+        return [dict(r) for r in rows]
+
+
+async def _notify_projects(con, project_id: int):
+    await con.execute("SELECT pg_notify($1, $2)", db.PROJECTS_CHANNEL, str(project_id))
+
+
+@_or_thread(db.create_project)
+async def create_project(owner_username: str) -> int:
+    """Insert a placeholder project (network/contract are set later); returns its id."""
+    async with adb() as con:
+        pid = await con.fetchval(
+            "INSERT INTO projects (owner_username, network, contract_address) VALUES ($1, $2, $3) RETURNING id",
+            owner_username, "eth", "0x0",
+        )
+        await _notify_projects(con, pid)
+        return pid
+
+
+@_or_thread(db.set_project_contract)
+async def set_project_contract(project_id: int, network: str, contract: str):
+    async with adb() as con:
+        await con.execute(
+            "UPDATE projects SET network=$1, contract_address=$2 WHERE id=$3",
+            network, contract, project_id,
+        )
+        await _notify_projects(con, project_id)
+
+
+@_or_thread(db.set_project_group)
+async def set_project_group(project_id: int, group_invite_link: str):
+    async with adb() as con:
+        await con.execute("UPDATE projects SET group_invite_link=$1 WHERE id=$2", group_invite_link, project_id)
+        await _notify_projects(con, project_id)
+
+
+@_or_thread(db.set_project_channel)
+async def set_project_channel(project_id: int, channel_chat_id: str):
+    async with adb() as con:
+        await con.execute("UPDATE projects SET channel_chat_id=$1 WHERE id=$2", channel_chat_id, project_id)
+        await _notify_projects(con, project_id)
+
+
+@_or_thread(db.delete_project)
+async def delete_project(project_id: int):
+    """Delete a project by ID along with its associated users (cascade)."""
+    async with adb() as con:
+        await con.execute("DELETE FROM projects WHERE id = $1", project_id)
+        await _notify_projects(con, project_id)
+
+
+# ===== Users =====
+@_or_thread(db.save_verified_user)
+async def save_verified_user(telegram_id: int, username: str, project_id: int, wallet: str):
+    """Save (or refresh) a verified Telegram user."""
+    await save_verified_users([(telegram_id, username, project_id, wallet)])
+
+
+@_or_thread(db.save_verified_users)
+async def save_verified_users(rows: List[Tuple[int, str, int, str]]):
+    """Upsert many verified users in one round-trip (see db.save_verified_users)."""
+    latest = list({(r[0], r[2]): r for r in rows}.values())
+    if not latest:
+        return
+    async with adb() as con:
+        await con.execute("SELECT last_user_id FROM stats_watermark FOR SHARE")
+        await con.execute(
+            db.SAVE_USERS_SQL.format(
+                values="SELECT * FROM unnest($1::bigint[], $2::text[], $3::int[], $4::text[])"
+            ),
+            *(list(col) for col in zip(*latest)),
+        )
+
+
+# ===== Job queue =====
+@_or_thread(db.enqueue_job)
+async def enqueue_job(kind: str, payload: Dict, priority: int = 100, max_attempts: int = 5, delay: float = 0.0) -> int:
+    """Queue a job for the workers (lower priority runs first); returns its id."""
+    async with adb() as con:
+        job_id = await con.fetchval(
+            """
+            INSERT INTO jobs (kind, payload, priority, max_attempts, run_at)
+            VALUES ($1, $2::jsonb, $3, $4, CURRENT_TIMESTAMP + make_interval(secs => $5))
+            RETURNING id
+            """,
+            kind, json.dumps(payload), priority, max_attempts, float(delay),
+        )
+        await con.execute("SELECT pg_notify($1, $2)", db.JOBS_CHANNEL, kind)
+        return job_id
@@ -1,17 +1,36 @@
 from __future__ import annotations
 
-import os
 import re
-import requests
+import asyncio
 import logging
-from typing import Optional, Dict
+import functools
+import itertools
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
 from .config import (
     ETHERSCAN_API_KEY,
     ALCHEMY_API_KEY,
     SUI_RPC_URL,
     HELIUS_API_KEY,
+    BASESCAN_API_KEY,
+    BSCSCAN_API_KEY,
+    EVM_RPC_URLS,
+    SOLANA_RPC_URL,
+    CACHE_MAX_ENTRIES,
+    CACHE_MAX_BYTES,
+    CACHE_HOLDER_TTL,
+    CACHE_HOLDER_NEGATIVE_TTL,
+    CACHE_SUI_BALANCES_TTL,
+    CACHE_PG_ENABLED,
 )
+from .httpclient import get_json, post_json, run_sync
+from .cache import MISSING, LRUCache, PgCache
+from .singleflight import SingleFlight
+from .providers import Provider, ProviderRegistry
+from .metrics import PROVIDER_SECONDS
+from .profiling import span
+from .ratelimit import ProviderUnavailable
+from . import multicall, solana
 
 logger = logging.getLogger(__name__)
 
@@ -23,14 +42,147 @@ def _is_valid_evm_address(addr: str) -> bool:
     return bool(re.fullmatch(r"0x[a-fA-F0-9]{40}", addr))
 
 
+def _alchemy_url(chain: str) -> Optional[str]:
+    if not ALCHEMY_API_KEY:
+        return None
+    hosts = {
+        "eth": "eth-mainnet.g.alchemy.com",
+        "base": "base-mainnet.g.alchemy.com",
+        "bsc": "bnb-mainnet.g.alchemy.com",
+    }
+    host = hosts.get(chain)
+    return f"https://{host}/v2/{ALCHEMY_API_KEY}" if host else None
+
+
+def evm_rpc_url(chain: str) -> Optional[str]:
+    """Alchemy when configured, else the plain RPC endpoint for the chain."""
+    return _alchemy_url(chain) or EVM_RPC_URLS.get(chain) or None
+
+
+# ERC20 selectors
+SEL_NAME = "0x06fdde03"          # name()
+SEL_SYMBOL = "0x95d89b41"        # symbol()
+SEL_DECIMALS = "0x313ce567"      # decimals()
+SEL_TOTAL_SUPPLY = "0x18160ddd"  # totalSupply()
+SEL_BALANCE_OF = "0x70a08231"    # balanceOf(address)
+
+
+def _pad_address(addr: str) -> str:
+    return addr.lower().replace("0x", "").rjust(64, "0")
+
+
+def balance_of_data(address: str) -> str:
+    return SEL_BALANCE_OF + _pad_address(address)
+
+
+def eth_call(contract: str, data: str, block: str = "latest") -> Tuple[str, list]:
+    """Build an (method, params) pair for JsonRpcClient.batch()."""
+    return "eth_call", [{"to": contract, "data": data}, block]
+
+
+def _decode_uint(result: Any) -> Optional[int]:
+    if not isinstance(result, str) or len(result) < 3:
+        return None
+    return int(result[2:66], 16)
+
+
+def _decode_abi_string(result: Any) -> Optional[str]:
+    """Decode an ABI `string` return value; also accepts legacy bytes32 names."""
+    if not isinstance(result, str) or len(result) < 66:
+        return None
+    raw = bytes.fromhex(result[2:])
+    if len(raw) == 32:  # bytes32 (e.g. MKR)
+        return raw.rstrip(b"\x00").decode("utf-8", errors="ignore") or None
+    offset = int.from_bytes(raw[:32], "big")
+    if offset + 32 > len(raw):
+        return None
+    length = int.from_bytes(raw[offset:offset + 32], "big")
+    text = raw[offset + 32:offset + 32 + length].decode("utf-8", errors="ignore")
+    return text.strip("\x00") or None
+
+
+# ===========================
+# JSON-RPC CLIENT
+# ===========================
+
+class RpcError(Exception):
+    """A JSON-RPC level error (the HTTP request itself succeeded)."""
+
+    def __init__(self, code: Any, message: str):
+        super().__init__(f"{code}: {message}")
+        self.code = code
+        self.message = message
+
+
+# JSON-RPC error codes providers use for throttling / overload
+THROTTLE_CODES = {429, -32005, -32429, -32090}
+
+
+def _is_throttle(err: RpcError) -> bool:
+    return err.code in THROTTLE_CODES or "rate limit" in (err.message or "").lower()
+
+
+class JsonRpcClient:
+    """
+    Minimal JSON-RPC 2.0 client.
+    batch() sends many calls in one HTTP request and matches responses by id,
+    so providers that reorder batch responses are handled.
+    """
+
+    _ids = itertools.count(1)
+
+    def __init__(self, url: str):
+        self.url = url
+
+    async def call(self, method: str, params: Sequence[Any]) -> Any:
+        result = (await self.batch([(method, params)]))[0]
+        if isinstance(result, RpcError):
+            raise result
+        return result
+
+    async def batch(self, calls: Sequence[Tuple[str, Sequence[Any]]]) -> List[Any]:
+        """
+        Send `calls` as one batch request.
+        Returns results in call order; failed calls come back as RpcError instances.
+        """
+        if not calls:
+            return []
+
+        ids = [next(self._ids) for _ in calls]
+        payload = [
+            {"jsonrpc": "2.0", "id": i, "method": method, "params": list(params)}
+            for i, (method, params) in zip(ids, calls)
+        ]
+        body = await post_json(self.url, payload if len(payload) > 1 else payload[0])
+
+        if isinstance(body, dict):
+            if len(payload) > 1 and "id" not in body:
+                err = body.get("error") or {}
+                raise RpcError(err.get("code"), err.get("message", "batch rejected"))
+            body = [body]
+
+        by_id = {item.get("id"): item for item in body if isinstance(item, dict)}
+        out: List[Any] = []
+        for i in ids:
+            item = by_id.get(i)
+            if item is None:
+                out.append(RpcError(None, "missing response"))
+            elif item.get("error"):
+                out.append(RpcError(item["error"].get("code"), item["error"].get("message", "")))
+            else:
+                out.append(item.get("result"))
+        return out
+
+
 # ===========================
 # TOKEN METADATA (ERC20)
 # ===========================
 
-def get_token_meta(network: str, contract: str) -> Optional[Dict[str, str]]:
+@PROVIDER_SECONDS.timed(chain="any", provider="token_meta")
+async def _fetch_token_meta(network: str, contract: str) -> Optional[Dict[str, str]]:
     """
-    Fetch ERC20 token name & symbol.
-    Returns: { "name": str, "symbol": str } or None
+    Fetch ERC20 token name, symbol & decimals.
+    Returns: { "name": str, "symbol": str, "decimals": int | None } or None
     """
     try:
         network = (network or "eth").lower()
@@ -41,45 +193,22 @@ def get_token_meta(network: str, contract: str) -> Optional[Dict[str, str]]:
         if not _is_valid_evm_address(contract):
             return None
 
-        # Prefer Alchemy
-        alchemy_urls = {
-            "eth": f"https://eth-mainnet.g.alchemy.com/v2/{ALCHEMY_API_KEY}",
-            "base": f"https://base-mainnet.g.alchemy.com/v2/{ALCHEMY_API_KEY}",
-        }
+        # Prefer JSON-RPC: name, symbol and decimals in one batch round-trip
+        rpc = evm_rpc_url(network)
+        if rpc:
+            name_hex, symbol_hex, decimals_hex = await JsonRpcClient(rpc).batch([
+                eth_call(contract, SEL_NAME),
+                eth_call(contract, SEL_SYMBOL),
+                eth_call(contract, SEL_DECIMALS),
+            ])
+            name = _decode_abi_string(name_hex)
+            symbol = _decode_abi_string(symbol_hex)
 
-        rpc = alchemy_urls.get(network)
-        if rpc and ALCHEMY_API_KEY:
-            def eth_call(sig: str) -> str:
-                payload = {
-                    "jsonrpc": "2.0",
-                    "id": 1,
-                    "method": "eth_call",
-                    "params": [{"to": contract, "data": sig}, "latest"],
-                }
-                r = requests.post(rpc, json=payload, timeout=10)
-                r.raise_for_status()
-                return r.json().get("result", "")
-
-            # name() → 0x06fdde03
-            # symbol() → 0x95d89b41
-            name_hex = eth_call("0x06fdde03")
-            symbol_hex = eth_call("0x95d89b41")
-
-            if name_hex and symbol_hex:
-                name = bytes.fromhex(name_hex[130:]).decode("utf-8", errors="ignore").strip("\x00")
-                symbol = bytes.fromhex(symbol_hex[130:]).decode("utf-8", errors="ignore").strip("\x00")
-
-                if name and symbol:
-                    return {"name": name, "symbol": symbol}
+            if name and symbol:
+                return {"name": name, "symbol": symbol, "decimals": _decode_uint(decimals_hex)}
 
         # --------- Fallback: Etherscan-style APIs ---------
-        api_map = {
-            "eth": ("https://api.etherscan.io/api", ETHERSCAN_API_KEY),
-            "base": ("https://api.basescan.org/api", os.getenv("BASESCAN_API_KEY")),
-            "bsc": ("https://api.bscscan.com/api", os.getenv("BSCSCAN_API_KEY")),
-        }
-
-        base_url, api_key = api_map.get(network, (None, None))
+        base_url, api_key = EXPLORER_APIS.get(network, (None, None))
         if not base_url or not api_key:
             return None
 
@@ -90,16 +219,18 @@ def get_token_meta(network: str, contract: str) -> Optional[Dict[str, str]]:
             "apikey": api_key,
         }
 
-        r = requests.get(base_url, params=params, timeout=10)
-        r.raise_for_status()
-        data = r.json().get("result")
+        data = (await get_json(base_url, params=params)).get("result")
 
         if isinstance(data, list) and data:
+            divisor = data[0].get("divisor")
             return {
                 "name": data[0].get("tokenName"),
                 "symbol": data[0].get("symbol"),
+                "decimals": int(divisor) if str(divisor or "").isdigit() else None,
             }
 
+    except ProviderUnavailable:
+        raise
     except Exception as exc:
         logger.exception("get_token_meta failed: %s", exc)
 
@@ -110,140 +241,519 @@ def get_token_meta(network: str, contract: str) -> Optional[Dict[str, str]]:
 # HOLDER CHECK — EVM
 # ===========================
 
-def _is_holder_evm(address: str, contract: str, min_amount: int = 1, chain: str = "eth") -> bool:
+async def _evm_balance_rpc(url: str, address: str, contract: str) -> Optional[int]:
     try:
-        if not _is_valid_evm_address(address) or not _is_valid_evm_address(contract):
-            return False
+        result = await JsonRpcClient(url).call(*eth_call(contract, balance_of_data(address)))
+    except RpcError as err:
+        if _is_throttle(err):
+            raise ProviderUnavailable(str(err)) from err
+        return None  # e.g. reverted: not an ERC20
+    return _decode_uint(result)
+
+
+async def _evm_balance_explorer(base_url: str, key: Optional[str], address: str, contract: str) -> Optional[int]:
+    params = {
+        "module": "account",
+        "action": "tokenbalance",
+        "contractaddress": contract,
+        "address": address,
+        "tag": "latest",
+        "apikey": key,
+    }
+
+    body = await get_json(base_url, params=params)
+
+    if body.get("status") in ("1", 1):
+        return int(body.get("result", 0))
+    if "rate limit" in str(body.get("result", "")).lower():
+        raise ProviderUnavailable(f"{base_url}: {body.get('result')}")
+    return None
 
-        alchemy_map = {
-            "eth": f"https://eth-mainnet.g.alchemy.com/v2/{ALCHEMY_API_KEY}",
-            "base": f"https://base-mainnet.g.alchemy.com/v2/{ALCHEMY_API_KEY}",
-        }
 
-        rpc = alchemy_map.get(chain)
-        if rpc and ALCHEMY_API_KEY:
-            addr_padded = address.lower().replace("0x", "").rjust(64, "0")
-            data = "0x70a08231" + addr_padded
+async def _is_holder_evm(address: str, contract: str, min_amount: int = 1, chain: str = "eth") -> bool:
+    if not _is_valid_evm_address(address) or not _is_valid_evm_address(contract):
+        return False
 
-            payload = {
-                "jsonrpc": "2.0",
-                "id": 1,
-                "method": "eth_call",
-                "params": [{"to": contract, "data": data}, "latest"],
-            }
+    # Answer from the Transfer-log index when it is caught up; an indexed
+    # balance below the minimum is re-checked, so only positives skip the RPC
+    from .indexer import indexed_balance  # indexer imports this module
+    balance = await indexed_balance(chain, contract, address)
+    if balance is None or balance < int(min_amount):
+        balance = await registry.hedged(chain, address, contract)
+    return balance is not None and balance >= int(min_amount)
 
-            r = requests.post(rpc, json=payload, timeout=10)
-            r.raise_for_status()
-            result = r.json().get("result")
 
-            if result:
-                return int(result, 16) >= int(min_amount)
+# ===========================
+# BULK BALANCES — EVM (Multicall3)
+# ===========================
 
-        api_map = {
-            "eth": ("https://api.etherscan.io/api", ETHERSCAN_API_KEY),
-            "base": ("https://api.basescan.org/api", os.getenv("BASESCAN_API_KEY")),
-            "bsc": ("https://api.bscscan.com/api", os.getenv("BSCSCAN_API_KEY")),
-        }
+MULTICALL_CONCURRENCY = 4
 
-        base_url, key = api_map.get(chain, (None, None))
-        if not base_url:
-            return False
 
-        params = {
-            "module": "account",
-            "action": "tokenbalance",
-            "contractaddress": contract,
-            "address": address,
-            "tag": "latest",
-            "apikey": key,
-        }
+@PROVIDER_SECONDS.timed(chain="evm", provider="multicall")
+async def bulk_balances_async(chain: str, contract: str, addresses: Sequence[str]) -> Dict[str, Optional[int]]:
+    """
+    balanceOf for many holders via Multicall3 aggregate3.
+    Returns { lowercased address: balance } — None when the call failed
+    for that address (e.g. invalid address or reverted balanceOf).
+    """
+    chain = (chain or "eth").lower()
+    rpc = evm_rpc_url(chain)
+    if not rpc or not _is_valid_evm_address(contract):
+        raise ValueError(f"bulk balances unavailable for {chain}:{contract}")
+
+    balances: Dict[str, Optional[int]] = {}
+    calls: List[multicall.Call3] = []
+    for addr in dict.fromkeys(a.lower() for a in addresses):
+        if not _is_valid_evm_address(addr):
+            balances[addr] = None
+            continue
+        calls.append((contract, True, bytes.fromhex(balance_of_data(addr)[2:])))
+
+    client = JsonRpcClient(rpc)
+    sem = asyncio.Semaphore(MULTICALL_CONCURRENCY)
+
+    async def run(chunk: List[multicall.Call3]):
+        async with sem:
+            data = multicall.encode_aggregate3(chunk)
+            result = await client.call(*eth_call(multicall.MULTICALL3_ADDRESS, data))
+        for (_, _, calldata), (ok, ret) in zip(chunk, multicall.decode_aggregate3(result)):
+            holder = "0x" + calldata[-20:].hex()
+            balances[holder] = multicall.decode_uint256(ret) if ok else None
+
+    await asyncio.gather(*(run(c) for c in multicall.chunk_calls(calls)))
+    return balances
 
-        r = requests.get(base_url, params=params, timeout=10)
-        r.raise_for_status()
 
-        if r.json().get("status") in ("1", 1):
-            return int(r.json().get("result", 0)) >= int(min_amount)
+# ===========================
+# SOLANA (Helius)
+# ===========================
 
-    except Exception as exc:
-        logger.exception("_is_holder_evm error: %s", exc)
+def _rpc_error_answer(body: Dict[str, Any]) -> None:
+    """Raise for throttling errors; other errors (e.g. invalid address) mean no answer."""
+    err = body.get("error") or {}
+    rpc_err = RpcError(err.get("code"), err.get("message", ""))
+    if _is_throttle(rpc_err):
+        raise ProviderUnavailable(str(rpc_err))
+    return None
 
-    return False
+
+def _helius_url() -> str:
+    return f"https://mainnet.helius-rpc.com/?api-key={HELIUS_API_KEY}"
+
+
+# Token program per mint (a mint never changes programs)
+_mint_programs: Dict[str, str] = {}
+
+SolanaPair = Tuple[str, str]  # (owner wallet, mint)
+
+# Owner scans (wallets whose ATA is missing or short) per JSON-RPC batch request
+SOLANA_SCAN_BATCH = 100
+
+
+async def _mint_program(client: JsonRpcClient, mint: str) -> Optional[str]:
+    """SPL Token or Token-2022 program owning `mint`; None if it is not a token mint."""
+    program = _mint_programs.get(mint)
+    if program is None:
+        info = await client.call("getAccountInfo", [mint, {"encoding": "base64", "dataSlice": {"offset": 0, "length": 0}}])
+        program = ((info or {}).get("value") or {}).get("owner")
+        if program not in solana.TOKEN_PROGRAMS:
+            return None
+        _mint_programs[mint] = program
+    return program
+
+
+def _check_rpc_results(results: List[Any]) -> None:
+    for result in results:
+        if isinstance(result, RpcError) and _is_throttle(result):
+            raise ProviderUnavailable(str(result))
+
+
+async def _solana_balances(
+    url: str, pairs: Sequence[SolanaPair], min_amount: int = 1
+) -> Dict[SolanaPair, Optional[int]]:
+    """
+    Raw token balance per (owner, mint), across any mix of mints: associated
+    token accounts are derived locally and read with getMultipleAccounts
+    (base64, 100 per call, all in one JSON-RPC batch). Owners whose ATA is
+    missing or holds less than `min_amount` get a getTokenAccountsByOwner
+    scan, since the rest may sit in other token accounts.
+    None means the balance could not be determined.
+    """
+    client = JsonRpcClient(url)
+    balances: Dict[SolanaPair, Optional[int]] = {}
+    try:
+        programs = {mint: await _mint_program(client, mint) for mint in {m for _, m in pairs}}
+    except RpcError as err:
+        if _is_throttle(err):
+            raise ProviderUnavailable(str(err)) from err
+        return {pair: None for pair in pairs}
+
+    atas: Dict[str, SolanaPair] = {}
+    for owner, mint in dict.fromkeys(pairs):
+        ata = solana.associated_token_address(owner, mint, programs[mint]) if programs[mint] else None
+        if ata is None:
+            balances[(owner, mint)] = None
+        else:
+            atas[ata] = (owner, mint)
+
+    keys = list(atas)
+    chunks = [keys[i:i + solana.MAX_MULTIPLE_ACCOUNTS] for i in range(0, len(keys), solana.MAX_MULTIPLE_ACCOUNTS)]
+    results = await client.batch([("getMultipleAccounts", [chunk, {"encoding": "base64"}]) for chunk in chunks])
+    _check_rpc_results(results)
+
+    scan: List[SolanaPair] = []
+    for chunk, result in zip(chunks, results):
+        values = result.get("value") if isinstance(result, dict) else None
+        if not isinstance(values, list) or len(values) != len(chunk):
+            balances.update((atas[ata], None) for ata in chunk)
+            continue
+        for ata, account in zip(chunk, values):
+            pair = atas[ata]
+            if account is None:
+                scan.append(pair)
+                continue
+            # The address itself binds owner and mint; only the layout is checked
+            token = solana.decode_token_account(solana.account_data(account))
+            balances[pair] = token.amount if token and account.get("owner") == programs[pair[1]] else None
+            if token and token.amount < min_amount:
+                scan.append(pair)
+
+    for i in range(0, len(scan), SOLANA_SCAN_BATCH):
+        batch = scan[i:i + SOLANA_SCAN_BATCH]
+        results = await client.batch([
+            ("getTokenAccountsByOwner", [owner, {"mint": mint}, {"encoding": "base64"}]) for owner, mint in batch
+        ])
+        _check_rpc_results(results)
+        for pair, result in zip(batch, results):
+            if not isinstance(result, dict):
+                balances[pair] = None
+                continue
+            tokens = [solana.decode_token_account(solana.account_data(acc.get("account") or {}))
+                      for acc in result.get("value", [])]
+            balances[pair] = sum(t.amount for t in tokens if t)
+    return balances
+
+
+async def _solana_balance(url: str, address: str, mint: str, min_amount: int = 1) -> Optional[int]:
+    return (await _solana_balances(url, [(address, mint)], min_amount)).get((address, mint))
+
+
+async def _is_holder_solana(address: str, mint: str, min_amount: int = 1) -> bool:
+    balance = await registry.hedged("solana", address, mint, int(min_amount))
+    return balance is not None and balance >= int(min_amount)
+
+
+def _solana_url() -> str:
+    if HELIUS_API_KEY:
+        return _helius_url()
+    if SOLANA_RPC_URL:
+        return SOLANA_RPC_URL
+    raise ValueError("HELIUS_API_KEY / SOLANA_RPC_URL not set")
+
+
+@PROVIDER_SECONDS.timed(chain="solana", provider="multiple_accounts")
+async def solana_balances_async(pairs: Sequence[SolanaPair], min_amount: int = 1) -> Dict[SolanaPair, Optional[int]]:
+    """Raw balances for many (owner, mint) pairs, possibly of different mints."""
+    return await _solana_balances(_solana_url(), pairs, min_amount)
+
+
+async def bulk_balances_solana_async(mint: str, owners: Sequence[str], min_amount: int = 1) -> Dict[str, Optional[int]]:
+    """Raw token balance per owner of one mint."""
+    balances = await solana_balances_async([(owner, mint) for owner in owners], min_amount)
+    return {owner: balances.get((owner, mint)) for owner in owners}
 
 
 # ===========================
-# SOLANA (Helius)
+# SUI
 # ===========================
 
-def _is_holder_solana(address: str, mint: str, min_amount: int = 1) -> bool:
-    try:
-        if not HELIUS_API_KEY:
-            return False
-
-        url = f"https://mainnet.helius-rpc.com/?api-key={HELIUS_API_KEY}"
-        payload = {
-            "jsonrpc": "2.0",
-            "id": "check",
-            "method": "getTokenAccountsByOwner",
-            "params": [address, {"mint": mint}, {"encoding": "jsonParsed"}],
-        }
+# Address parts of a coin type, e.g. 0x2 in 0x2::sui::SUI or inside generics
+_SUI_TYPE_ADDRESS = re.compile(r"0x([0-9a-fA-F]{1,64})(?=::)")
+
+
+@functools.lru_cache(maxsize=4096)
+def normalize_coin_type(coin_type: str) -> str:
+    """
+    One key per coin type however it is written: 0x2::sui::SUI and
+    0x00…02::sui::SUI both become the zero-padded, lowercased address form
+    the RPC also returns for some types. Module and struct names keep their case.
+    """
+    return _SUI_TYPE_ADDRESS.sub(lambda m: "0x" + m.group(1).lower().rjust(64, "0"), (coin_type or "").strip())
 
-        r = requests.post(url, json=payload, timeout=10)
-        r.raise_for_status()
 
-        for acc in r.json().get("result", {}).get("value", []):
-            amount = int(acc["account"]["data"]["parsed"]["info"]["tokenAmount"]["amount"])
-            if amount >= int(min_amount):
-                return True
+def _sui_coin_balances(result: Any) -> Optional[Dict[str, int]]:
+    """suix_getAllBalances result → {normalized coin type: raw total balance}."""
+    if not isinstance(result, list):
+        return None
+    return {
+        normalize_coin_type(b["coinType"]): int(b.get("totalBalance", 0))
+        for b in result
+        if isinstance(b, dict) and b.get("coinType")
+    }
 
-    except Exception as exc:
-        logger.exception("_is_holder_solana error: %s", exc)
 
-    return False
+async def _sui_all_balances(url: str, owners: Sequence[str]) -> Dict[str, Optional[Dict[str, int]]]:
+    """
+    Every coin balance per wallet, one suix_getAllBalances call per wallet
+    sent as a single JSON-RPC batch. Answers are cached for
+    CACHE_SUI_BALANCES_TTL, so checking a wallet against several Sui
+    projects costs one call. Keyed by the lowercased address; None means
+    the wallet could not be read.
+    """
+    out: Dict[str, Optional[Dict[str, int]]] = {}
+    fetch: List[str] = []
+    for owner in {o.lower(): o for o in owners}.values():
+        cached = _sui_wallets.get(owner.lower())
+        if cached is MISSING:
+            fetch.append(owner)
+        else:
+            out[owner.lower()] = cached
+
+    results = await JsonRpcClient(url).batch([("suix_getAllBalances", [owner]) for owner in fetch])
+    for owner, result in zip(fetch, results):
+        if isinstance(result, RpcError) and _is_throttle(result):
+            raise ProviderUnavailable(str(result))
+        coins = _sui_coin_balances(result)
+        out[owner.lower()] = coins
+        if coins is not None:
+            _sui_wallets.set(owner.lower(), coins, CACHE_SUI_BALANCES_TTL)
+    return out
+
+
+async def _sui_balance(url: str, address: str, coin_type: str) -> Optional[int]:
+    coins = await _sui_flights.do(
+        (url, address.lower()), lambda: _sui_all_balances(url, [address])
+    )
+    balances = coins.get(address.lower())
+    # A coin type missing from getAllBalances is a zero balance
+    return None if balances is None else balances.get(normalize_coin_type(coin_type), 0)
+
+
+async def _is_holder_sui(address: str, coin_type: str, min_amount: int = 1) -> bool:
+    balance = await registry.hedged("sui", address, coin_type)
+    return balance is not None and balance >= int(min_amount)
+
+
+@PROVIDER_SECONDS.timed(chain="sui", provider="rpc_batch")
+async def bulk_balances_sui_async(coin_type: str, owners: Sequence[str]) -> Dict[str, Optional[int]]:
+    """Total balance of `coin_type` per owner, one batched suix_getAllBalances request."""
+    if not SUI_RPC_URL:
+        raise ValueError("SUI_RPC_URL not set")
+
+    wallets = await _sui_all_balances(SUI_RPC_URL, owners)
+    key = normalize_coin_type(coin_type)
+    return {
+        owner: None if wallets.get(owner.lower()) is None else wallets[owner.lower()].get(key, 0)
+        for owner in owners
+    }
 
 
 # ===========================
-# SUI
+# PROVIDER REGISTRY
 # ===========================
 
-def _is_holder_sui(address: str, coin_type: str, min_amount: int = 1) -> bool:
-    try:
-        if not SUI_RPC_URL:
-            return False
-
-        payload = {
-            "jsonrpc": "2.0",
-            "id": 1,
-            "method": "suix_getBalance",
-            "params": [address, coin_type],
-        }
+EXPLORER_APIS = {
+    "eth": ("https://api.etherscan.io/api", ETHERSCAN_API_KEY),
+    "base": ("https://api.basescan.org/api", BASESCAN_API_KEY),
+    "bsc": ("https://api.bscscan.com/api", BSCSCAN_API_KEY),
+}
 
-        r = requests.post(SUI_RPC_URL, json=payload, timeout=10)
-        r.raise_for_status()
+registry = ProviderRegistry()
 
-        total = int(r.json().get("result", {}).get("totalBalance", 0))
-        return total >= int(min_amount)
 
-    except Exception as exc:
-        logger.exception("_is_holder_sui error: %s", exc)
+def _register_providers():
+    """Balance providers per chain; fetch(address, contract) → raw balance or None."""
+    for chain in ("eth", "base", "bsc"):
+        alchemy = _alchemy_url(chain)
+        if alchemy:
+            registry.register(Provider("alchemy", chain, lambda a, c, u=alchemy: _evm_balance_rpc(u, a, c)))
+        if EVM_RPC_URLS.get(chain):
+            url = EVM_RPC_URLS[chain]
+            registry.register(Provider("rpc", chain, lambda a, c, u=url: _evm_balance_rpc(u, a, c)))
+        base_url, key = EXPLORER_APIS[chain]
+        if key:
+            registry.register(
+                Provider("explorer", chain, lambda a, c, u=base_url, k=key: _evm_balance_explorer(u, k, a, c))
+            )
+
+    if HELIUS_API_KEY:
+        registry.register(Provider("helius", "solana", lambda a, m, n=1: _solana_balance(_helius_url(), a, m, n)))
+    if SOLANA_RPC_URL:
+        registry.register(Provider("rpc", "solana", lambda a, m, n=1: _solana_balance(SOLANA_RPC_URL, a, m, n)))
+
+    if SUI_RPC_URL:
+        registry.register(Provider("rpc", "sui", lambda a, t: _sui_balance(SUI_RPC_URL, a, t)))
+
+
+_register_providers()
 
-    return False
+
+def provider_stats() -> Dict[str, Dict[str, Any]]:
+    """Latency EWMA / p95 and request counters per chain:provider."""
+    return registry.stats()
+
+
+# ===========================
+# CACHE
+# ===========================
+
+# Token metadata never changes: cache it until evicted. Holder results
+# use separate TTLs for positive and negative answers.
+_meta_cache = LRUCache("token_meta", max_entries=CACHE_MAX_ENTRIES)
+_holder_cache = LRUCache("holder", max_entries=CACHE_MAX_ENTRIES, max_bytes=CACHE_MAX_BYTES)
+_pg_cache = PgCache(enabled=CACHE_PG_ENABLED)
+# Sui wallet → {coin type: balance}, shared by every Sui project's checks
+_sui_wallets = LRUCache("sui_balances", max_entries=CACHE_MAX_ENTRIES, max_bytes=CACHE_MAX_BYTES)
+
+# Concurrent misses for the same key share one provider request
+_meta_flights = SingleFlight("token_meta")
+_holder_flights = SingleFlight("holder")
+_sui_flights = SingleFlight("sui_balances")
+
+
+def _norm(network: str, value: str) -> str:
+    if network in ("eth", "base", "bsc"):
+        return value.lower()
+    if network == "sui":
+        return normalize_coin_type(value) if "::" in value else value.lower()
+    return value
+
+
+def cache_stats() -> Dict[str, Dict[str, int]]:
+    """Hit / miss / eviction counters for every cache tier."""
+    return {
+        "token_meta": _meta_cache.stats(),
+        "holder": _holder_cache.stats(),
+        "sui_balances": _sui_wallets.stats(),
+        "postgres": _pg_cache.stats(),
+    }
 
 
 # ===========================
 # ROUTER
 # ===========================
 
-def is_token_holder(network: str, address: str, contract: str, min_amount: int = 1) -> bool:
+async def get_token_meta_async(network: str, contract: str) -> Optional[Dict[str, str]]:
+    """Cached token metadata: memory LRU → kv_cache table → provider."""
+    network = (network or "eth").lower()
+    key = f"meta:{network}:{_norm(network, contract)}"
+
+    meta = _meta_cache.get(key)
+    if meta is not MISSING:
+        return meta
+    return await _meta_flights.do(key, lambda: _load_token_meta(key, network, contract))
+
+
+async def _load_token_meta(key: str, network: str, contract: str) -> Optional[Dict[str, str]]:
+    meta = await _pg_cache.get(key)
+    if meta is MISSING:
+        meta = await _fetch_token_meta(network, contract)
+        if not meta:
+            return None
+        await _pg_cache.set(key, meta)
+
+    _meta_cache.set(key, meta)
+    return meta
+
+
+def _holder_key(network: str, address: str, contract: str, min_amount: int) -> str:
+    return f"holder:{network}:{_norm(network, contract)}:{_norm(network, address)}:{int(min_amount)}"
+
+
+async def is_token_holder_async(network: str, address: str, contract: str, min_amount: int = 1) -> bool:
+    """
+    Cached holder check; positives are also persisted to the kv_cache table.
+    Raises ProviderUnavailable when no provider could answer (throttled / down).
+    """
+    network = (network or "").lower()
+    key = _holder_key(network, address, contract, min_amount)
+
+    with span("holder_check"):
+        held = _holder_cache.get(key)
+        if held is not MISSING:
+            return held
+        return await _holder_flights.do(
+            key, lambda: _load_holder(key, network, address, contract, min_amount)
+        )
+
+
+async def _load_holder(key: str, network: str, address: str, contract: str, min_amount: int) -> bool:
+    held = await _pg_cache.get(key)
+    if held is not MISSING:
+        _holder_cache.set(key, held, CACHE_HOLDER_TTL)
+        return held
+
+    held = await _check_holder(network, address, contract, min_amount)
+    _holder_cache.set(key, held, CACHE_HOLDER_TTL if held else CACHE_HOLDER_NEGATIVE_TTL)
+    if held:
+        await _pg_cache.set(key, True, CACHE_HOLDER_TTL)
+    return held
+
+
+async def forget_holders(network: str, contract: str, addresses: Sequence[str], min_amount: int = 1):
+    """
+    Drop cached holder answers (memory and kv_cache), e.g. for wallets the
+    sweep found no longer holding, so they cannot re-verify from the cache.
+    """
     network = (network or "").lower()
+    keys = [_holder_key(network, a, contract, min_amount) for a in addresses]
+    for key in keys:
+        _holder_cache.delete(key)
+    await _pg_cache.delete(keys)
 
+
+async def _check_holder(network: str, address: str, contract: str, min_amount: int = 1) -> bool:
     if network in ("eth", "base", "bsc"):
-        return _is_holder_evm(address, contract, min_amount, chain=network)
+        return await _is_holder_evm(address, contract, min_amount, chain=network)
 
     if network in ("sol", "solana", "pumpfun"):
-        return _is_holder_solana(address, contract, min_amount)
+        return await _is_holder_solana(address, contract, min_amount)
 
     if network == "sui":
-        return _is_holder_sui(address, contract, min_amount)
+        return await _is_holder_sui(address, contract, min_amount)
 
     logger.warning("Unsupported network: %s", network)
     return False
+
+
+async def bulk_token_balances_async(
+    network: str, contract: str, addresses: Sequence[str], min_amount: int = 1
+) -> Dict[str, Optional[int]]:
+    """
+    Balances for many wallets of one token, keyed by the addresses as given.
+    None means the balance could not be determined for that wallet.
+    `min_amount` lets Solana skip owner scans for wallets whose ATA suffices.
+    """
+    network = (network or "").lower()
+
+    if network in ("eth", "base", "bsc"):
+        by_lower = await bulk_balances_async(network, contract, addresses)
+        return {a: by_lower.get(a.lower()) for a in addresses}
+
+    if network in ("sol", "solana", "pumpfun"):
+        return await bulk_balances_solana_async(contract, addresses, min_amount)
+
+    if network == "sui":
+        return await bulk_balances_sui_async(contract, addresses)
+
+    raise ValueError(f"Unsupported network: {network}")
+
+
+# ===========================
+# SYNC WRAPPERS
+# ===========================
+
+def get_token_meta(network: str, contract: str) -> Optional[Dict[str, str]]:
+    """Blocking wrapper around get_token_meta_async (not for use inside handlers)."""
+    return run_sync(get_token_meta_async(network, contract))
+
+
+def is_token_holder(network: str, address: str, contract: str, min_amount: int = 1) -> bool:
+    """Blocking wrapper around is_token_holder_async (not for use inside handlers)."""
+    return run_sync(is_token_holder_async(network, address, contract, min_amount))
+
+
+def bulk_balances(chain: str, contract: str, addresses: Sequence[str]) -> Dict[str, Optional[int]]:
+    """Blocking wrapper around bulk_balances_async."""
+    return run_sync(bulk_balances_async(chain, contract, addresses))
@@ -0,0 +1,279 @@
+from __future__ import annotations
+
+import time
+import weakref
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from telegram import Bot, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.error import BadRequest, Forbidden, NetworkError, RetryAfter, TelegramError
+
+from .config import (
+    NETWORKS,
+    BOT_USERNAME,
+    BROADCAST_GLOBAL_RATE,
+    BROADCAST_CHAT_RATE,
+    BROADCAST_PAGE_SIZE,
+    BROADCAST_REPORT_INTERVAL,
+)
+from . import db
+from .jobs import submit, BATCH
+from .projects import registry as projects
+from .ratelimit import TokenBucket
+from .market import quote_lines
+
+logger = logging.getLogger(__name__)
+
+# Sends in flight per broadcast (the buckets set the actual pace)
+IN_FLIGHT = 32
+SEND_ATTEMPTS = 4
+
+_min_rate = 1.0
+
+
+class _Pacer:
+    """
+    Global bucket shared by every broadcast of an event loop: a RetryAfter
+    pauses it and halves the rate; sustained success creeps back up. Group /
+    channel chats also get a per-chat bucket (private chats get one message
+    per broadcast, so they need none).
+    """
+
+    def __init__(self):
+        self.global_bucket = TokenBucket(BROADCAST_GLOBAL_RATE, burst=BROADCAST_GLOBAL_RATE)
+        self.chat_buckets: Dict[str, TokenBucket] = {}
+        self.ok_since_flood = 0
+
+
+# Buckets hold an asyncio.Lock bound to one event loop; broadcast jobs under
+# JOB_QUEUE=local each run in a fresh loop, so pacing is kept per loop.
+_pacers: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _Pacer]" = weakref.WeakKeyDictionary()
+
+
+def _pacer() -> _Pacer:
+    loop = asyncio.get_running_loop()
+    pacer = _pacers.get(loop)
+    if pacer is None:
+        pacer = _pacers[loop] = _Pacer()
+    return pacer
+
+
+# Broadcast ids being run by this process
+_active: set = set()
+
+
+def _seconds(retry_after) -> float:
+    return retry_after.total_seconds() if hasattr(retry_after, "total_seconds") else float(retry_after)
+
+
+def _on_flood(seconds: float):
+    pacer = _pacer()
+    pacer.ok_since_flood = 0
+    bucket = pacer.global_bucket
+    bucket.pause(seconds)
+    bucket.set_rate(max(_min_rate, bucket.rate / 2))
+    logger.warning("Telegram flood control: paused %.0fs, broadcast rate → %.1f/s", seconds, bucket.rate)
+
+
+def _on_success():
+    pacer = _pacer()
+    pacer.ok_since_flood += 1
+    bucket = pacer.global_bucket
+    if pacer.ok_since_flood >= 100 and bucket.rate < BROADCAST_GLOBAL_RATE:
+        pacer.ok_since_flood = 0
+        bucket.set_rate(min(BROADCAST_GLOBAL_RATE, bucket.rate * 1.25))
+
+
+def _chat_bucket(chat_id: str) -> Optional[TokenBucket]:
+    if not (chat_id.startswith("-") or chat_id.startswith("@")):
+        return None
+    chat_buckets = _pacer().chat_buckets
+    bucket = chat_buckets.get(chat_id)
+    if bucket is None:
+        bucket = chat_buckets[chat_id] = TokenBucket(BROADCAST_CHAT_RATE, burst=3)
+    return bucket
+
+
+async def deliver(chat_id: str, call: Callable[[], Awaitable[Any]]) -> Tuple[bool, Any]:
+    """
+    Run one Bot API call under the global and per-chat buckets.
+    Retries flood control and network errors; gives up on blocked users,
+    missing chats and other permanent errors. Returns (ok, result).
+    """
+    global_bucket, bucket = _pacer().global_bucket, _chat_bucket(chat_id)
+    for attempt in range(1, SEND_ATTEMPTS + 1):
+        await global_bucket.acquire()
+        if bucket is not None:
+            await bucket.acquire()
+        try:
+            result = await call()
+        except RetryAfter as exc:
+            seconds = _seconds(exc.retry_after)
+            _on_flood(seconds)
+            if bucket is not None:
+                bucket.pause(seconds)
+            continue
+        except (Forbidden, BadRequest) as exc:
+            logger.debug("Broadcast to %s dropped: %s", chat_id, exc)
+            return False, None
+        except NetworkError as exc:
+            logger.debug("Broadcast to %s attempt %d failed: %s", chat_id, attempt, exc)
+            await asyncio.sleep(attempt)
+            continue
+        except TelegramError as exc:
+            logger.warning("Broadcast to %s failed: %s", chat_id, exc)
+            return False, None
+        _on_success()
+        return True, result
+    return False, None
+
+
+# ===========================
+# Verification post
+# ===========================
+
+def verification_post(project: Dict) -> Tuple[str, InlineKeyboardMarkup]:
+    text = (
+        "🚀 <b>HOLDERS-ONLY ACCESS</b>\n\n"
+        f"🌐 <b>Network:</b> {NETWORKS.get(project['network'])}\n"
+        f"📄 <b>Contract:</b> <code>{project['contract_address']}</code>\n"
+        f"{quote_lines(project)}\n"
+        "👇 Click below to verify"
+    )
+    kb = InlineKeyboardMarkup(
+        [[InlineKeyboardButton("✅ Verify Now", url=f"https://t.me/{BOT_USERNAME}?start=verify_{project['id']}")]]
+    )
+    return text, kb
+
+
+async def pin_verification_post(bot: Bot, project: Dict) -> bool:
+    """Post and pin a project's verify message in its channel."""
+    chat_id = str(project["channel_chat_id"])
+    text, kb = verification_post(project)
+    ok, msg = await deliver(
+        chat_id, lambda: bot.send_message(chat_id=chat_id, text=text, reply_markup=kb, parse_mode="HTML")
+    )
+    if not ok:
+        return False
+    ok, _ = await deliver(
+        chat_id,
+        lambda: bot.pin_chat_message(chat_id=chat_id, message_id=msg.message_id, disable_notification=True),
+    )
+    return ok
+
+
+# ===========================
+# Broadcast runner
+# ===========================
+
+def _eta(seconds: float) -> str:
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h {seconds % 3600 // 60}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m {seconds % 60}s"
+    return f"{seconds}s"
+
+
+def progress_text(b: Dict, sent: int, failed: int, rate: float, status: str) -> str:
+    what = f"DM • project {b['project_id']}" if b["kind"] == "dm" else "Channel pins"
+    done = sent + failed
+    lines = [f"📢 <b>Broadcast #{b['id']}</b> ({what})", f"Sent {sent} / {b['total']} • failed {failed}"]
+    if status == "running":
+        remaining = max(b["total"] - done, 0)
+        eta = _eta(remaining / rate) if rate > 0 else "…"
+        lines.append(f"{rate:.1f} msg/s • ETA {eta}")
+    else:
+        lines.append(f"Status: <b>{status}</b>")
+    return "\n".join(lines)
+
+
+def cancel_kb(broadcast_id: int) -> InlineKeyboardMarkup:
+    return InlineKeyboardMarkup([[InlineKeyboardButton("⛔ Cancel", callback_data=f"bcast_cancel:{broadcast_id}")]])
+
+
+async def _report(bot: Bot, b: Dict, text: str, running: bool):
+    if not b.get("admin_chat_id") or not b.get("status_message_id"):
+        return
+    try:
+        await bot.edit_message_text(
+            text,
+            chat_id=b["admin_chat_id"],
+            message_id=b["status_message_id"],
+            parse_mode="HTML",
+            reply_markup=cancel_kb(b["id"]) if running else None,
+        )
+    except TelegramError as exc:
+        logger.debug("Broadcast progress edit failed: %s", exc)
+
+
+async def run_broadcast(bot: Bot, broadcast_id: int):
+    """Send (or resume from its checkpoint) a broadcast; reports progress to the admin."""
+    if broadcast_id in _active:
+        return
+    b = await asyncio.to_thread(db.get_broadcast, broadcast_id)
+    if not b or b["status"] != "running":
+        return
+    _active.add(broadcast_id)
+    try:
+        await _run(bot, b)
+    finally:
+        _active.discard(broadcast_id)
+
+
+async def _run(bot: Bot, b: Dict):
+    cursor, sent, failed = b["cursor"], b["sent"], b["failed"]
+    started, started_done = time.monotonic(), sent + failed
+    last_report = 0.0
+    sem = asyncio.Semaphore(IN_FLIGHT)
+
+    async def send_one(row_id: int, chat_id: str) -> bool:
+        async with sem:
+            if b["kind"] == "dm":
+                ok, _ = await deliver(chat_id, lambda: bot.send_message(chat_id=chat_id, text=b["text"]))
+                return ok
+            # 'pin' rows are projects: pin each project's own post, even when channels are shared
+            project = projects.get(row_id)
+            return bool(project) and await pin_verification_post(bot, project)
+
+    status = "running"
+    while status == "running":
+        page = await asyncio.to_thread(
+            db.get_broadcast_recipients, b["kind"], b["project_id"], cursor, BROADCAST_PAGE_SIZE
+        )
+        if page:
+            results = await asyncio.gather(*(send_one(row_id, str(chat_id)) for row_id, chat_id in page))
+            sent += sum(results)
+            failed += len(results) - sum(results)
+            cursor = page[-1][0]
+        # Checkpoint after every page: a restart re-sends at most one page
+        status = await asyncio.to_thread(db.checkpoint_broadcast, b["id"], cursor, sent, failed, not page)
+
+        now = time.monotonic()
+        if status != "running" or now - last_report >= BROADCAST_REPORT_INTERVAL:
+            last_report = now
+            rate = (sent + failed - started_done) / max(now - started, 1e-9)
+            await _report(bot, b, progress_text(b, sent, failed, rate, status), status == "running")
+
+    logger.info("Broadcast %s %s: %d sent, %d failed", b["id"], status, sent, failed)
+
+
+def broadcast_stats() -> Dict[str, float]:
+    pacers = list(_pacers.values())
+    return {
+        "active": len(_active),
+        "rate": min((p.global_bucket.rate for p in pacers), default=BROADCAST_GLOBAL_RATE),
+        "chat_buckets": sum(len(p.chat_buckets) for p in pacers),
+        "waited": sum(p.global_bucket.waited for p in pacers),
+    }
+
+
+async def resume_broadcasts(context=None):
+    """Restart broadcasts left running by a previous process (not needed with JOB_QUEUE=postgres)."""
+    bot = context.bot if context else None
+    for broadcast_id in await asyncio.to_thread(db.get_running_broadcasts):
+        logger.info("Resuming broadcast %s", broadcast_id)
+        asyncio.get_running_loop().create_task(
+            submit("broadcast", {"broadcast_id": broadcast_id}, priority=BATCH, bot=bot)
+        )
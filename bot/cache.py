@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import json
+import time
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from .db import cache_delete, cache_get, cache_put, cache_purge_expired
+
+logger = logging.getLogger(__name__)
+
+# Returned on a miss, so that None / False results can be cached too
+MISSING = object()
+
+
+def _sizeof(key: str, value: Any) -> int:
+    try:
+        return len(key) + len(json.dumps(value, default=str))
+    except (TypeError, ValueError):
+        return len(key) + len(repr(value))
+
+
+class LRUCache:
+    """
+    Bounded in-process LRU with per-entry TTL.
+    ttl=None keeps an entry until it is evicted by the size limits.
+    """
+
+    def __init__(self, name: str, max_entries: int = 10_000, max_bytes: Optional[int] = None):
+        self.name = name
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._data: "OrderedDict[str, Tuple[Any, Optional[float], int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return MISSING
+            value, expires_at, size = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                self._bytes -= size
+                self.expirations += 1
+                self.misses += 1
+                return MISSING
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        size = _sizeof(key, value)
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._bytes -= old[2]
+            self._data[key] = (value, expires_at, size)
+            self._bytes += size
+            while self._data and (
+                len(self._data) > self.max_entries
+                or (self.max_bytes is not None and self._bytes > self.max_bytes)
+            ):
+                _, (_, _, evicted) = self._data.popitem(last=False)
+                self._bytes -= evicted
+                self.evictions += 1
+
+    def delete(self, key: str):
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._bytes -= old[2]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._data),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+class PgCache:
+    """
+    Postgres-backed second tier (`kv_cache` table) so entries survive restarts.
+    Values are stored as JSON; any database error is logged and treated as a miss.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.hits = self.misses = self.errors = 0
+
+    async def get(self, key: str) -> Any:
+        if not self.enabled:
+            return MISSING
+        try:
+            raw = await asyncio.to_thread(cache_get, key)
+        except Exception as exc:
+            self.errors += 1
+            logger.warning("kv_cache read failed for %s: %s", key, exc)
+            return MISSING
+        if raw is None:
+            self.misses += 1
+            return MISSING
+        self.hits += 1
+        return json.loads(raw)
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        if not self.enabled:
+            return
+        try:
+            await asyncio.to_thread(cache_put, key, json.dumps(value), ttl)
+        except Exception as exc:
+            self.errors += 1
+            logger.warning("kv_cache write failed for %s: %s", key, exc)
+
+    async def delete(self, keys: List[str]):
+        if not self.enabled or not keys:
+            return
+        try:
+            await asyncio.to_thread(cache_delete, keys)
+        except Exception as exc:
+            self.errors += 1
+            logger.warning("kv_cache delete failed for %d keys: %s", len(keys), exc)
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "errors": self.errors}
+
+
+async def purge_expired(context):
+    """Job-queue task: drop expired rows from the kv_cache table."""
+    try:
+        removed = await asyncio.to_thread(cache_purge_expired)
+        logger.info("kv_cache purge removed %d rows", removed)
+    except Exception as exc:
+        logger.warning("kv_cache purge failed: %s", exc)
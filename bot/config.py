@@ -13,6 +13,42 @@ BASESCAN_API_KEY = os.getenv("BASESCAN_API_KEY", "").strip()
 BSCSCAN_API_KEY = os.getenv("BSCSCAN_API_KEY", "").strip()
 HELIUS_API_KEY = os.getenv("HELIUS_API_KEY", "").strip()
 SUI_RPC_URL = os.getenv("SUI_RPC_URL", "https://fullnode.mainnet.sui.io:443").strip()
+
+# Plain EVM JSON-RPC endpoints, used when Alchemy is not configured for a chain
+EVM_RPC_URLS = {
+    "eth": os.getenv("ETH_RPC_URL", "").strip(),
+    "base": os.getenv("BASE_RPC_URL", "").strip(),
+    "bsc": os.getenv("BSC_RPC_URL", "https://bsc-dataseed.bnbchain.org").strip(),
+}
+SOLANA_RPC_URL = os.getenv("SOLANA_RPC_URL", "").strip()
+
+# Per-provider rate limits: "host=rate[:burst],..." (requests per second).
+# Keys match the host or any of its subdomains; one bucket per host + API key.
+def _parse_rate_limits(raw: str):
+    limits = {}
+    for item in raw.split(","):
+        if "=" not in item:
+            continue
+        host, spec = item.split("=", 1)
+        rate, _, burst = spec.partition(":")
+        limits[host.strip()] = (float(rate), float(burst or rate))
+    return limits
+
+
+PROVIDER_RATE_LIMITS = _parse_rate_limits(os.getenv(
+    "PROVIDER_RATE_LIMITS",
+    "etherscan.io=5,basescan.org=5,bscscan.com=5,helius-rpc.com=10,"
+    "alchemy.com=25,coingecko.com=0.5:3,dexscreener.com=5",
+))
+DEFAULT_RATE_LIMIT = (20.0, 20.0)
+RATE_LIMIT_MAX_WAIT = float(os.getenv("RATE_LIMIT_MAX_WAIT", "3"))   # seconds queued before giving up
+BREAKER_THRESHOLD = int(os.getenv("BREAKER_THRESHOLD", "5"))          # consecutive 429/5xx/timeouts
+BREAKER_COOLDOWN = float(os.getenv("BREAKER_COOLDOWN", "30"))
+
+# Hedged provider requests: the backup request fires after the primary's
+# p95 latency, clamped to this range (seconds)
+HEDGE_MIN_DELAY = float(os.getenv("HEDGE_MIN_DELAY", "0.15"))
+HEDGE_MAX_DELAY = float(os.getenv("HEDGE_MAX_DELAY", "2.0"))
 CHANNEL_ID = "@YourChannelUsername"
 BOT_USERNAME = "holderxrbot"
 
@@ -27,3 +63,85 @@ NETWORKS = {
 }
 
 DEFAULT_MIN_AMOUNT = 1
+
+# FSM state store: states live in memory and are flushed to Postgres in batches
+STATE_FLUSH_INTERVAL = float(os.getenv("STATE_FLUSH_INTERVAL", "2"))
+STATE_TTLS = {
+    "VERIFY_MATH": float(os.getenv("STATE_TTL_VERIFY_MATH", "300")),
+    "VERIFY_WALLET": float(os.getenv("STATE_TTL_VERIFY_WALLET", "1800")),
+}
+STATE_DEFAULT_TTL = float(os.getenv("STATE_DEFAULT_TTL", "86400"))
+# Exactly one bot front end (main.py / run_web.py) owns the state store; scale
+# out with worker.py. A second front end waits this long for the first to
+# exit (rolling deploys), then refuses to start.
+STATE_OWNER_WAIT = float(os.getenv("STATE_OWNER_WAIT", "60"))
+
+# Holder-check / token metadata cache
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "50000"))
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+CACHE_HOLDER_TTL = float(os.getenv("CACHE_HOLDER_TTL", "900"))               # positive results
+CACHE_HOLDER_NEGATIVE_TTL = float(os.getenv("CACHE_HOLDER_NEGATIVE_TTL", "60"))
+CACHE_SUI_BALANCES_TTL = float(os.getenv("CACHE_SUI_BALANCES_TTL", "30"))   # all coin balances of a Sui wallet
+CACHE_PG_ENABLED = os.getenv("CACHE_PG_ENABLED", "1") == "1" and bool(os.getenv("DATABASE_URL"))
+
+# Optional local holder index built from ERC20 Transfer logs.
+# HOLDER_INDEX_PROJECTS="<project id>:<start block>,..." (EVM projects only)
+HOLDER_INDEX_PROJECTS = {
+    int(pid): int(block or 0)
+    for pid, _, block in (
+        item.strip().partition(":") for item in os.getenv("HOLDER_INDEX_PROJECTS", "").split(",") if item.strip()
+    )
+}
+INDEX_POLL_INTERVAL = float(os.getenv("INDEX_POLL_INTERVAL", "4"))
+INDEX_REORG_DEPTH = int(os.getenv("INDEX_REORG_DEPTH", "12"))
+INDEX_MAX_LAG_BLOCKS = int(os.getenv("INDEX_MAX_LAG_BLOCKS", "3"))
+# Seconds since the last successful tip refresh before the index stops answering
+INDEX_MAX_AGE = float(os.getenv("INDEX_MAX_AGE", str(INDEX_POLL_INTERVAL * 1.5)))
+INDEX_MAX_RANGES_PER_STEP = int(os.getenv("INDEX_MAX_RANGES_PER_STEP", "20"))
+
+# Holder re-verification sweep
+SWEEP_INTERVAL = int(os.getenv("SWEEP_INTERVAL", "21600"))        # seconds, 0 disables
+SWEEP_PAGE_SIZE = int(os.getenv("SWEEP_PAGE_SIZE", "500"))
+SWEEP_CONCURRENCY = int(os.getenv("SWEEP_CONCURRENCY", "2"))
+SWEEP_PROVIDER_RPS = float(os.getenv("SWEEP_PROVIDER_RPS", "2"))   # per provider, leaves room for users
+
+# Admin dashboard stats (summary tables refreshed incrementally)
+STATS_REFRESH_INTERVAL = int(os.getenv("STATS_REFRESH_INTERVAL", "60"))   # seconds
+STATS_RETENTION_DAYS = int(os.getenv("STATS_RETENTION_DAYS", "35"))       # hourly buckets kept
+
+# Update processing: >1 runs that many updates concurrently (one at a time per user)
+UPDATE_CONCURRENCY = int(os.getenv("UPDATE_CONCURRENCY", "8"))
+UPDATE_QUEUE_LIMIT = int(os.getenv("UPDATE_QUEUE_LIMIT", "256"))   # queued + in-flight before put() waits
+
+# Job execution: "inline" (in the bot process), "postgres" (jobs table + worker.py) or "local" (process pool)
+JOB_QUEUE = os.getenv("JOB_QUEUE", "inline").lower()
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+JOB_VISIBILITY_TIMEOUT = float(os.getenv("JOB_VISIBILITY_TIMEOUT", "120"))   # seconds a claim stays hidden
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "5"))               # fallback when NOTIFY is missed
+WORKER_CONCURRENCY = int(os.getenv("WORKER_CONCURRENCY", "8"))               # jobs in flight per worker process
+WORKER_PROCESSES = int(os.getenv("WORKER_PROCESSES", "2"))                   # worker.py / local pool processes
+
+# Broadcasts (Telegram allows ~30 msg/s per bot and ~20 msg/min per group)
+BROADCAST_GLOBAL_RATE = float(os.getenv("BROADCAST_GLOBAL_RATE", "25"))        # messages / second
+BROADCAST_CHAT_RATE = float(os.getenv("BROADCAST_CHAT_RATE", "18")) / 60.0      # per group/channel, from msgs / minute
+BROADCAST_PAGE_SIZE = int(os.getenv("BROADCAST_PAGE_SIZE", "200"))             # recipients per checkpoint
+BROADCAST_REPORT_INTERVAL = float(os.getenv("BROADCAST_REPORT_INTERVAL", "10"))  # seconds between progress edits
+
+# Market data (price / FDV / liquidity), refreshed in the background and served from cache
+MARKET_REFRESH_INTERVAL = int(os.getenv("MARKET_REFRESH_INTERVAL", "120"))   # seconds, 0 disables
+MARKET_FRESH_TTL = float(os.getenv("MARKET_FRESH_TTL", "120"))               # served as-is
+MARKET_MAX_AGE = float(os.getenv("MARKET_MAX_AGE", "3600"))                  # served stale while revalidating
+MARKET_COINGECKO_BATCH = int(os.getenv("MARKET_COINGECKO_BATCH", "10"))      # contracts per CoinGecko request
+
+# Prometheus metrics at /metrics (webhook mode: on PORT; polling mode: on METRICS_PORT if set)
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "").strip()   # optional bearer token for scrapes
+
+# Profiling (opt-in): JSON-line traces of slow updates, and /profile <seconds> for admins
+TRACE_SLOW_UPDATE_MS = float(os.getenv("TRACE_SLOW_UPDATE_MS", "0"))          # 0 disables tracing
+TRACE_FILE = os.getenv("TRACE_FILE", "logs/slow_updates.jsonl")
+TRACE_FILE_MAX_BYTES = int(os.getenv("TRACE_FILE_MAX_BYTES", str(5 * 1024 * 1024)))
+TRACE_FILE_BACKUPS = int(os.getenv("TRACE_FILE_BACKUPS", "3"))
+PROFILER_ENABLED = os.getenv("PROFILER_ENABLED", "0") == "1"
+PROFILER_INTERVAL = float(os.getenv("PROFILER_INTERVAL", "10")) / 1000.0      # ms between stack samples
+PROFILER_MAX_SECONDS = int(os.getenv("PROFILER_MAX_SECONDS", "120"))
@@ -1,12 +1,36 @@
+import io
 import os
+import uuid
+import logging
+import threading
 import psycopg2
 import psycopg2.extras
 from contextlib import contextmanager
-from typing import Optional, List, Dict, Tuple
+from typing import Optional, List, Dict, Tuple, Iterator
+
+from .pool import PgPool
+from . import metrics
+
+logger = logging.getLogger(__name__)
 
 # Database URL from environment variables
 DATABASE_URL = os.getenv("DATABASE_URL")
 
+# Connection pool settings
+DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", "1"))
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+DB_POOL_MAX_AGE = float(os.getenv("DB_POOL_MAX_AGE", "1800"))
+DB_POOL_CHECK_IDLE = float(os.getenv("DB_POOL_CHECK_IDLE", "30"))
+
+# Request-path backend for bot/adb.py: "psycopg2" (worker threads) or "asyncpg"
+DB_BACKEND = os.getenv("DB_BACKEND", "psycopg2").lower()
+# Prepared statements cached per asyncpg connection (0 behind pgbouncer)
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100"))
+
+# Rows fetched per round-trip by streaming (server-side cursor) reads
+EXPORT_ITERSIZE = int(os.getenv("EXPORT_ITERSIZE", "5000"))
+
 SCHEMA = """
 CREATE TABLE IF NOT EXISTS projects (
     id SERIAL PRIMARY KEY,
@@ -34,34 +58,251 @@ CREATE TABLE IF NOT EXISTS users (
 CREATE INDEX IF NOT EXISTS idx_users_telegram_id
     ON users (telegram_id);
 
+ALTER TABLE users ADD COLUMN IF NOT EXISTS last_checked_at TIMESTAMPTZ;
+
+CREATE INDEX IF NOT EXISTS idx_users_project_id
+    ON users (project_id, id);
+
 CREATE TABLE IF NOT EXISTS states (
     id SERIAL PRIMARY KEY,
     telegram_id BIGINT NOT NULL UNIQUE,
     state TEXT,
     payload TEXT
 );
+
+ALTER TABLE states ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP;
+
+CREATE INDEX IF NOT EXISTS idx_users_project_verified_joined
+    ON users (project_id, verified, joined_at);
+
+-- Dashboard summary, maintained incrementally from users.id > last_user_id
+CREATE TABLE IF NOT EXISTS project_stats (
+    project_id INT PRIMARY KEY REFERENCES projects(id) ON DELETE CASCADE,
+    verified_users BIGINT NOT NULL DEFAULT 0,
+    verifications BIGINT NOT NULL DEFAULT 0,
+    distinct_wallets BIGINT NOT NULL DEFAULT 0,
+    refreshed_at TIMESTAMPTZ
+);
+
+CREATE TABLE IF NOT EXISTS project_stats_hourly (
+    project_id INT REFERENCES projects(id) ON DELETE CASCADE,
+    hour TIMESTAMPTZ NOT NULL,
+    verifications INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (project_id, hour)
+);
+
+CREATE TABLE IF NOT EXISTS project_wallets (
+    project_id INT REFERENCES projects(id) ON DELETE CASCADE,
+    wallet_address TEXT NOT NULL,
+    PRIMARY KEY (project_id, wallet_address)
+);
+
+CREATE TABLE IF NOT EXISTS stats_watermark (
+    id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+    last_user_id INT NOT NULL DEFAULT 0
+);
+
+INSERT INTO stats_watermark DEFAULT VALUES ON CONFLICT DO NOTHING;
+
+CREATE TABLE IF NOT EXISTS kv_cache (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    expires_at TIMESTAMPTZ
+);
 """
 
-# Context manager for database connection
-@contextmanager
-def db():
-    """PostgreSQL connection context manager with SSL enforcement."""
+# Versioned migrations applied in order by init_db(); never edit a shipped
+# entry, append a new version instead. Version 1 is the original schema.
+MIGRATIONS: List[Tuple[int, str]] = [
+    (1, SCHEMA),
+    (2, """
+    ALTER TABLE users ADD COLUMN IF NOT EXISTS last_verified_at TIMESTAMPTZ;
+
+    -- Collapse duplicate (telegram_id, project_id) rows into the newest one,
+    -- keeping the first join time and the latest verification time.
+    WITH ranked AS (
+        SELECT id,
+               row_number() OVER w AS rn,
+               min(joined_at) OVER w AS first_joined,
+               max(joined_at) OVER w AS last_joined
+        FROM users
+        WINDOW w AS (PARTITION BY telegram_id, project_id ORDER BY id DESC
+                     ROWS BETWEEN UNBOUNDED PRECEDING AND UNBOUNDED FOLLOWING)
+    )
+    UPDATE users u
+    SET joined_at = r.first_joined,
+        last_verified_at = r.last_joined
+    FROM ranked r
+    WHERE u.id = r.id AND r.rn = 1;
+
+    DELETE FROM users u
+    USING users newer
+    WHERE newer.telegram_id = u.telegram_id
+      AND newer.project_id = u.project_id
+      AND newer.id > u.id;
+
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_users_telegram_project
+        ON users (telegram_id, project_id);
+
+    -- The unique key leads with telegram_id, so this one is redundant
+    DROP INDEX IF EXISTS idx_users_telegram_id;
+
+    -- Rows were removed below the stats watermark: rebuild the summary
+    TRUNCATE project_stats, project_stats_hourly, project_wallets;
+    UPDATE stats_watermark SET last_user_id = 0;
+    """),
+    (3, """
+    -- Work queue for worker.py; status 'dead' is the dead-letter state
+    CREATE TABLE IF NOT EXISTS jobs (
+        id BIGSERIAL PRIMARY KEY,
+        kind TEXT NOT NULL,
+        payload JSONB NOT NULL DEFAULT '{}',
+        priority SMALLINT NOT NULL DEFAULT 100,
+        status TEXT NOT NULL DEFAULT 'queued',
+        attempts INT NOT NULL DEFAULT 0,
+        max_attempts INT NOT NULL DEFAULT 5,
+        run_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        locked_by TEXT,
+        locked_until TIMESTAMPTZ,
+        last_error TEXT,
+        created_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP,
+        finished_at TIMESTAMPTZ
+    );
+
+    CREATE INDEX IF NOT EXISTS idx_jobs_ready
+        ON jobs (priority, run_at, id) WHERE status = 'queued';
+
+    CREATE INDEX IF NOT EXISTS idx_jobs_running
+        ON jobs (locked_until) WHERE status = 'running';
+    """),
+    (4, """
+    -- Broadcast progress; `cursor` is the last recipient id fully handled
+    CREATE TABLE IF NOT EXISTS broadcasts (
+        id SERIAL PRIMARY KEY,
+        kind TEXT NOT NULL,
+        project_id INT REFERENCES projects(id) ON DELETE CASCADE,
+        text TEXT,
+        admin_chat_id BIGINT,
+        status_message_id BIGINT,
+        status TEXT NOT NULL DEFAULT 'running',
+        cursor BIGINT NOT NULL DEFAULT 0,
+        total INT NOT NULL DEFAULT 0,
+        sent INT NOT NULL DEFAULT 0,
+        failed INT NOT NULL DEFAULT 0,
+        created_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP,
+        finished_at TIMESTAMPTZ
+    );
+    """),
+    (5, """
+    -- Holder index published by the bot process for the job workers.
+    -- A contract's balances are only trusted while its head row is fresh.
+    CREATE TABLE IF NOT EXISTS holder_index (
+        chain TEXT NOT NULL,
+        contract TEXT NOT NULL,
+        address BYTEA NOT NULL,
+        balance NUMERIC(78, 0) NOT NULL,
+        PRIMARY KEY (chain, contract, address)
+    );
+
+    CREATE TABLE IF NOT EXISTS holder_index_heads (
+        chain TEXT NOT NULL,
+        contract TEXT NOT NULL,
+        head BIGINT NOT NULL,
+        tip BIGINT NOT NULL,
+        refreshed_at TIMESTAMPTZ NOT NULL,
+        PRIMARY KEY (chain, contract)
+    );
+    """),
+]
+
+_pool: Optional[PgPool] = None
+_pool_lock = threading.Lock()
+
+
+def _dsn() -> str:
     if not DATABASE_URL:
         raise RuntimeError("DATABASE_URL environment variable not set")
+    if "sslmode=" in DATABASE_URL:
+        return DATABASE_URL
+    sep = "&" if "?" in DATABASE_URL else "?"
+    return f"{DATABASE_URL}{sep}sslmode=require"
+
+
+def get_pool() -> PgPool:
+    """Return the process-wide connection pool, creating it on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = PgPool(
+                    _dsn(),
+                    minconn=DB_POOL_MIN,
+                    maxconn=DB_POOL_MAX,
+                    timeout=DB_POOL_TIMEOUT,
+                    max_age=DB_POOL_MAX_AGE,
+                    check_idle=DB_POOL_CHECK_IDLE,
+                )
+    return _pool
+
 
-    dsn = f"{DATABASE_URL}?sslmode=require" if "sslmode=" not in DATABASE_URL else DATABASE_URL
-    con = psycopg2.connect(dsn)
+def pool_stats() -> Dict[str, float]:
+    """Pool metrics: in_use, idle, waiting, checkout latency, counters."""
+    return get_pool().stats() if _pool is not None else {}
+
+
+def close_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
+
+
+# Context manager for database connection
+@contextmanager
+def db():
+    """Pooled PostgreSQL connection context manager with SSL enforcement."""
+    pool = get_pool()
+    con = pool.getconn()
+    broken = False
     try:
         yield con
         con.commit()
+    except (psycopg2.OperationalError, psycopg2.InterfaceError):
+        broken = True
+        raise
+    except Exception:
+        try:
+            con.rollback()
+        except Exception:
+            broken = True
+        raise
     finally:
-        con.close()
+        pool.putconn(con, discard=broken)
 
 
 def init_db():
-    """Initialize database schema."""
+    """Initialize the database schema by applying pending migrations."""
     with db() as con, con.cursor() as cur:
-        cur.execute(SCHEMA)
+        # One replica migrates at a time; the others wait, then see it done
+        cur.execute("SELECT pg_advisory_xact_lock(hashtext('holderxr_migrations'))")
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INT PRIMARY KEY,
+                applied_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP
+            )
+            """
+        )
+        cur.execute("SELECT version FROM schema_migrations")
+        applied = {row[0] for row in cur.fetchall()}
+        for version, sql in MIGRATIONS:
+            if version in applied:
+                continue
+            logger.info("Applying schema migration %d", version)
+            cur.execute(sql)
+            cur.execute("INSERT INTO schema_migrations (version) VALUES (%s)", (version,))
 
 
 # ===== States (FSM) =====
@@ -73,10 +314,11 @@ def upsert_state(telegram_id: int, state: Optional[str], payload: Optional[str])
         else:
             cur.execute(
                 """
-                INSERT INTO states (telegram_id, state, payload)
-                VALUES (%s, %s, %s)
+                INSERT INTO states (telegram_id, state, payload, updated_at)
+                VALUES (%s, %s, %s, CURRENT_TIMESTAMP)
                 ON CONFLICT (telegram_id)
-                DO UPDATE SET state = EXCLUDED.state, payload = EXCLUDED.payload
+                DO UPDATE SET state = EXCLUDED.state, payload = EXCLUDED.payload,
+                              updated_at = EXCLUDED.updated_at
                 """,
                 (telegram_id, state, payload or ""),
             )
@@ -90,6 +332,67 @@ def get_state(telegram_id: int) -> Tuple[Optional[str], Optional[str]]:
         return (row[0], row[1]) if row else (None, None)
 
 
+def load_states() -> List[Tuple[int, str, str, float]]:
+    """All stored FSM states: [(telegram_id, state, payload, age in seconds), ...]."""
+    with db() as con, con.cursor() as cur:
+        cur.execute(
+            """
+            SELECT telegram_id, state, payload,
+                   EXTRACT(EPOCH FROM CURRENT_TIMESTAMP - COALESCE(updated_at, CURRENT_TIMESTAMP))
+            FROM states
+            """
+        )
+        return [(r[0], r[1], r[2], float(r[3])) for r in cur.fetchall()]
+
+
+def write_states(upserts: List[Tuple[int, str, str]], deletes: List[int]):
+    """Apply a batch of FSM state changes in one transaction."""
+    with db() as con, con.cursor() as cur:
+        if deletes:
+            cur.execute("DELETE FROM states WHERE telegram_id = ANY(%s)", (list(deletes),))
+        if upserts:
+            psycopg2.extras.execute_values(
+                cur,
+                """
+                INSERT INTO states (telegram_id, state, payload, updated_at)
+                VALUES %s
+                ON CONFLICT (telegram_id)
+                DO UPDATE SET state = EXCLUDED.state, payload = EXCLUDED.payload,
+                              updated_at = EXCLUDED.updated_at
+                """,
+                upserts,
+                template="(%s, %s, %s, CURRENT_TIMESTAMP)",
+            )
+
+
+# Session-level advisory lock held by the one bot front end that owns `states`
+STATE_OWNER_LOCK = 0x486F6C64
+
+
+def try_claim_state_owner():
+    """A dedicated connection holding STATE_OWNER_LOCK, or None if another process holds it."""
+    con = psycopg2.connect(_dsn())
+    con.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+    with con.cursor() as cur:
+        cur.execute("SELECT pg_try_advisory_lock(%s)", (STATE_OWNER_LOCK,))
+        if cur.fetchone()[0]:
+            return con
+    con.close()
+    return None
+
+
+# The bot process listens here, so a job running in another process can
+# end a user's flow (payload "telegram_id:state")
+STATES_CHANNEL = "states_cleared"
+
+
+def clear_state_if(telegram_id: int, state: str):
+    """Delete a user's FSM state if it is still `state`, and notify the bot process."""
+    with db() as con, con.cursor() as cur:
+        cur.execute("DELETE FROM states WHERE telegram_id = %s AND state = %s", (telegram_id, state))
+        cur.execute("SELECT pg_notify(%s, %s)", (STATES_CHANNEL, f"{telegram_id}:{state}"))
+
+
 # ===== Projects =====
 def get_latest_project() -> Optional[Dict]:
     """Get the most recently created project."""
@@ -121,17 +424,155 @@ def get_all_projects() -> List[Dict]:
         return cur.fetchall()
 
 
+# Other replicas and workers listen on this channel to reload their project registry
+PROJECTS_CHANNEL = "projects_changed"
+
+
+def open_listener(channel: str):
+    """Dedicated (unpooled) autocommit connection that LISTENs on `channel`."""
+    con = psycopg2.connect(_dsn())
+    con.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+    with con.cursor() as cur:
+        cur.execute(f"LISTEN {channel}")
+    return con
+
+
+def _notify_projects(cur, project_id: int):
+    cur.execute("SELECT pg_notify(%s, %s)", (PROJECTS_CHANNEL, str(project_id)))
+
+
+def create_project(owner_username: str) -> int:
+    """Insert a placeholder project (network/contract are set later); returns its id."""
+    with db() as con, con.cursor() as cur:
+        cur.execute(
+            "INSERT INTO projects (owner_username, network, contract_address) VALUES (%s, %s, %s) RETURNING id",
+            (owner_username, "eth", "0x0"),
+        )
+        pid = cur.fetchone()[0]
+        _notify_projects(cur, pid)
+        return pid
+
+
+def set_project_contract(project_id: int, network: str, contract: str):
+    with db() as con, con.cursor() as cur:
+        cur.execute(
+            "UPDATE projects SET network=%s, contract_address=%s WHERE id=%s",
+            (network, contract, project_id),
+        )
+        _notify_projects(cur, project_id)
+
+
+def set_project_group(project_id: int, group_invite_link: str):
+    with db() as con, con.cursor() as cur:
+        cur.execute("UPDATE projects SET group_invite_link=%s WHERE id=%s", (group_invite_link, project_id))
+        _notify_projects(cur, project_id)
+
+
+def set_project_channel(project_id: int, channel_chat_id: str):
+    with db() as con, con.cursor() as cur:
+        cur.execute("UPDATE projects SET channel_chat_id=%s WHERE id=%s", (channel_chat_id, project_id))
+        _notify_projects(cur, project_id)
+
+
 # ===== Users =====
+# Shared with bot/adb.py; `{values}` is the backend's row source for v(...)
+SAVE_USERS_SQL = """
+    WITH v(telegram_id, username, project_id, wallet) AS ({values}),
+    old AS (
+        SELECT u.id, u.verified, u.wallet_address
+        FROM users u
+        JOIN v ON v.telegram_id = u.telegram_id AND v.project_id = u.project_id
+    ),
+    up AS (
+        INSERT INTO users AS u (
+            telegram_id, username, project_id, verified, wallet_address,
+            last_checked_at, last_verified_at
+        )
+        SELECT telegram_id, username, project_id, 1, wallet, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP
+        FROM v
+        ON CONFLICT (telegram_id, project_id) DO UPDATE
+        SET username = COALESCE(NULLIF(EXCLUDED.username, ''), u.username),
+            verified = 1,
+            wallet_address = EXCLUDED.wallet_address,
+            last_checked_at = EXCLUDED.last_checked_at,
+            last_verified_at = EXCLUDED.last_verified_at
+        RETURNING u.id, u.project_id, u.wallet_address
+    ),
+    -- Rows below the stats watermark are already summarised: apply
+    -- re-verifications and newly seen wallets as deltas.
+    counted AS (
+        SELECT up.id, up.project_id, up.wallet_address, old.verified
+        FROM up JOIN old ON old.id = up.id
+        WHERE up.id <= (SELECT last_user_id FROM stats_watermark)
+    ),
+    wallets AS (
+        INSERT INTO project_wallets (project_id, wallet_address)
+        SELECT DISTINCT project_id, wallet_address FROM counted WHERE wallet_address IS NOT NULL
+        ON CONFLICT DO NOTHING
+        RETURNING project_id
+    ),
+    -- A new row is counted once by refresh_project_stats() (by joined_at);
+    -- every verification of an existing row is an event of its own, now.
+    reverifications AS (
+        SELECT up.project_id, COUNT(*) AS n
+        FROM up JOIN old ON old.id = up.id
+        WHERE up.project_id IS NOT NULL
+        GROUP BY up.project_id
+    ),
+    hourly AS (
+        INSERT INTO project_stats_hourly (project_id, hour, verifications)
+        SELECT project_id, date_trunc('hour', now()), n FROM reverifications
+        ON CONFLICT (project_id, hour)
+        DO UPDATE SET verifications = project_stats_hourly.verifications + EXCLUDED.verifications
+    ),
+    d AS (
+        SELECT project_id, SUM(reverified) AS reverified, SUM(new_wallets) AS new_wallets,
+               SUM(verifications) AS verifications
+        FROM (
+            SELECT project_id, COUNT(*) FILTER (WHERE verified <> 1) AS reverified, 0 AS new_wallets,
+                   0 AS verifications
+            FROM counted GROUP BY project_id
+            UNION ALL
+            SELECT project_id, 0, COUNT(*), 0 FROM wallets GROUP BY project_id
+            UNION ALL
+            SELECT project_id, 0, 0, n FROM reverifications
+        ) x
+        GROUP BY project_id
+    )
+    -- Upsert: a project may have no summary row before its first refresh
+    INSERT INTO project_stats AS ps (project_id, verified_users, verifications, distinct_wallets)
+    SELECT project_id, reverified, verifications, new_wallets FROM d
+    ON CONFLICT (project_id) DO UPDATE
+    SET verified_users = ps.verified_users + EXCLUDED.verified_users,
+        verifications = ps.verifications + EXCLUDED.verifications,
+        distinct_wallets = ps.distinct_wallets + EXCLUDED.distinct_wallets
+"""
+
+
 def save_verified_user(telegram_id: int, username: str, project_id: int, wallet: str):
-    """Save a verified Telegram user."""
+    """Save (or refresh) a verified Telegram user."""
+    save_verified_users([(telegram_id, username, project_id, wallet)])
+
+
+def save_verified_users(rows: List[Tuple[int, str, int, str]]):
+    """
+    Upsert many verified users in one round-trip:
+    [(telegram_id, username, project_id, wallet), ...].
+    An existing (telegram_id, project_id) row gets the new wallet and a
+    fresh last_verified_at; re-verifying a revoked row updates the stats.
+    """
+    # ON CONFLICT cannot touch the same row twice in one statement
+    latest = {(r[0], r[2]): r for r in rows}
+    if not latest:
+        return
     with db() as con, con.cursor() as cur:
-        cur.execute(
-            """
-            INSERT INTO users (telegram_id, username, project_id, verified, wallet_address)
-            VALUES (%s, %s, %s, %s, %s)
-            ON CONFLICT DO NOTHING
-            """,
-            (telegram_id, username, project_id, 1, wallet),
+        cur.execute("SELECT last_user_id FROM stats_watermark FOR SHARE")
+        psycopg2.extras.execute_values(
+            cur,
+            SAVE_USERS_SQL.format(values="VALUES %s"),
+            list(latest.values()),
+            template="(%s::bigint, %s, %s::int, %s)",
+            page_size=len(latest),
         )
 
 
@@ -164,9 +605,537 @@ def get_verified_users(project_id: Optional[int] = None) -> List[Dict]:
         return cur.fetchall()
 
 
+VERIFIED_USER_COLUMNS = ("id", "telegram_id", "username", "wallet_address", "joined_at")
+
+
+def iter_verified_users(project_id: Optional[int] = None, itersize: int = EXPORT_ITERSIZE) -> Iterator[Tuple]:
+    """
+    Stream verified users as tuples in VERIFIED_USER_COLUMNS order.
+    Uses a named (server-side) cursor, so only `itersize` rows are held
+    client-side at a time. The pooled connection stays checked out until
+    the iterator is exhausted or closed.
+    """
+    where = "WHERE verified = 1" + (" AND project_id = %s" if project_id is not None else "")
+    with db() as con, con.cursor(name=f"export_{uuid.uuid4().hex}") as cur:
+        cur.itersize = itersize
+        cur.execute(
+            f"""
+            SELECT {", ".join(VERIFIED_USER_COLUMNS)}
+            FROM users
+            {where}
+            ORDER BY id
+            """,
+            (project_id,) if project_id is not None else None,
+        )
+        yield from cur
+
+
+def get_users_to_recheck(project_id: int, after_id: int, limit: int) -> List[Tuple[int, str]]:
+    """
+    One keyset page of verified users with a wallet: [(id, wallet_address), ...].
+    Pass the last id of the previous page as `after_id` (0 for the first page).
+    """
+    with db() as con, con.cursor() as cur:
+        cur.execute(
+            """
+            SELECT id, wallet_address
+            FROM users
+            WHERE project_id = %s AND verified = 1 AND id > %s AND wallet_address IS NOT NULL
+            ORDER BY id
+            LIMIT %s
+            """,
+            (project_id, after_id, limit),
+        )
+        return cur.fetchall()
+
+
+def record_holder_checks(results: List[Tuple[int, bool]]):
+    """Store re-verification results: [(user id, still holds), ...]."""
+    if not results:
+        return
+    with db() as con, con.cursor() as cur:
+        # Serialize with refresh_project_stats(): rows at or below the
+        # watermark are already counted, so their flips adjust the summary.
+        cur.execute("SELECT last_user_id FROM stats_watermark FOR SHARE")
+        psycopg2.extras.execute_values(
+            cur,
+            """
+            WITH v(id, holds) AS (VALUES %s),
+            old AS (
+                SELECT u.id, u.project_id, u.verified
+                FROM users u JOIN v ON v.id = u.id
+            ),
+            upd AS (
+                UPDATE users AS u
+                SET verified = CASE WHEN v.holds THEN 1 ELSE 0 END,
+                    last_checked_at = CURRENT_TIMESTAMP,
+                    last_verified_at = CASE WHEN v.holds THEN CURRENT_TIMESTAMP ELSE u.last_verified_at END
+                FROM v
+                WHERE u.id = v.id
+                RETURNING u.id, u.verified
+            ),
+            d AS (
+                SELECT old.project_id, SUM(upd.verified - old.verified) AS delta
+                FROM upd JOIN old ON old.id = upd.id
+                WHERE old.id <= (SELECT last_user_id FROM stats_watermark)
+                GROUP BY old.project_id
+            )
+            UPDATE project_stats ps
+            SET verified_users = ps.verified_users + d.delta
+            FROM d
+            WHERE ps.project_id = d.project_id AND d.delta <> 0
+            """,
+            results,
+            template="(%s::int, %s::bool)",
+        )
+
+
+# ===== Stats (summary tables) =====
+def refresh_project_stats(retention_days: int = 35) -> int:
+    """
+    Fold users added since the last refresh into the summary tables.
+    Only reads rows above the watermark; returns the new watermark.
+    """
+    with db() as con, con.cursor() as cur:
+        cur.execute("SELECT last_user_id FROM stats_watermark FOR UPDATE")
+        last = cur.fetchone()[0]
+        # Stop below rows from the last few seconds: a serial id can become
+        # visible after a higher one, so the newest ids are not settled yet.
+        cur.execute(
+            """
+            SELECT MAX(id), MIN(id) FILTER (WHERE joined_at >= now() - interval '10 seconds')
+            FROM users
+            WHERE id > %s
+            """,
+            (last,),
+        )
+        newest, unsettled = cur.fetchone()
+        upto = unsettled - 1 if unsettled else newest
+        if upto is not None and upto > last:
+            cur.execute("INSERT INTO project_stats (project_id) SELECT id FROM projects ON CONFLICT DO NOTHING")
+            cur.execute(
+                """
+                INSERT INTO project_stats_hourly (project_id, hour, verifications)
+                SELECT project_id, date_trunc('hour', joined_at), COUNT(*)
+                FROM users
+                WHERE id > %s AND id <= %s AND project_id IS NOT NULL
+                GROUP BY 1, 2
+                ON CONFLICT (project_id, hour)
+                DO UPDATE SET verifications = project_stats_hourly.verifications + EXCLUDED.verifications
+                """,
+                (last, upto),
+            )
+            cur.execute(
+                """
+                WITH fresh AS (
+                    SELECT project_id,
+                           COUNT(*) AS total,
+                           COUNT(*) FILTER (WHERE verified = 1) AS verified
+                    FROM users
+                    WHERE id > %(last)s AND id <= %(upto)s AND project_id IS NOT NULL
+                    GROUP BY project_id
+                ),
+                wallets AS (
+                    INSERT INTO project_wallets (project_id, wallet_address)
+                    SELECT DISTINCT project_id, wallet_address
+                    FROM users
+                    WHERE id > %(last)s AND id <= %(upto)s
+                      AND project_id IS NOT NULL AND wallet_address IS NOT NULL
+                    ON CONFLICT DO NOTHING
+                    RETURNING project_id
+                ),
+                new_wallets AS (
+                    SELECT project_id, COUNT(*) AS n FROM wallets GROUP BY project_id
+                )
+                UPDATE project_stats ps
+                SET verifications = ps.verifications + COALESCE(f.total, 0),
+                    verified_users = ps.verified_users + COALESCE(f.verified, 0),
+                    distinct_wallets = ps.distinct_wallets + COALESCE(w.n, 0)
+                FROM fresh f FULL JOIN new_wallets w USING (project_id)
+                WHERE ps.project_id = COALESCE(f.project_id, w.project_id)
+                """,
+                {"last": last, "upto": upto},
+            )
+            cur.execute("UPDATE stats_watermark SET last_user_id = %s", (upto,))
+        cur.execute(
+            "DELETE FROM project_stats_hourly WHERE hour < now() - make_interval(days => %s)",
+            (retention_days,),
+        )
+        cur.execute("UPDATE project_stats SET refreshed_at = CURRENT_TIMESTAMP")
+        return max(upto or 0, last)
+
+
+def get_project_stats() -> List[Dict]:
+    """Per-project summary rows plus 1h / 24h / 7d verification counts."""
+    with db() as con, con.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+        cur.execute(
+            """
+            SELECT p.id, p.network, p.contract_address,
+                   COALESCE(s.verified_users, 0) AS verified_users,
+                   COALESCE(s.verifications, 0) AS verifications,
+                   COALESCE(s.distinct_wallets, 0) AS distinct_wallets,
+                   s.refreshed_at,
+                   COALESCE(SUM(h.verifications) FILTER (WHERE h.hour >= date_trunc('hour', now())), 0) AS last_hour,
+                   COALESCE(SUM(h.verifications) FILTER (WHERE h.hour > now() - interval '24 hours'), 0) AS last_day,
+                   COALESCE(SUM(h.verifications), 0) AS last_week
+            FROM projects p
+            LEFT JOIN project_stats s ON s.project_id = p.id
+            LEFT JOIN project_stats_hourly h
+                   ON h.project_id = p.id AND h.hour > now() - interval '7 days'
+            GROUP BY p.id, s.project_id
+            ORDER BY p.id DESC
+            """
+        )
+        return cur.fetchall()
+
+
+# ===== Job queue =====
+# Workers LISTEN here to wake up as soon as a job is enqueued
+JOBS_CHANNEL = "jobs_ready"
+
+
+def enqueue_job(kind: str, payload: Dict, priority: int = 100, max_attempts: int = 5, delay: float = 0.0) -> int:
+    """Queue a job for the workers (lower priority runs first); returns its id."""
+    with db() as con, con.cursor() as cur:
+        cur.execute(
+            """
+            INSERT INTO jobs (kind, payload, priority, max_attempts, run_at)
+            VALUES (%s, %s, %s, %s, CURRENT_TIMESTAMP + make_interval(secs => %s))
+            RETURNING id
+            """,
+            (kind, psycopg2.extras.Json(payload), priority, max_attempts, delay),
+        )
+        job_id = cur.fetchone()[0]
+        cur.execute("SELECT pg_notify(%s, %s)", (JOBS_CHANNEL, kind))
+        return job_id
+
+
+def claim_jobs(worker: str, limit: int, visibility: float) -> List[Dict]:
+    """
+    Lock up to `limit` due jobs for `worker`, highest priority first.
+    SKIP LOCKED lets any number of workers claim concurrently; a claimed
+    job becomes visible again if it is not finished within `visibility`.
+    """
+    with db() as con, con.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+        cur.execute(
+            """
+            WITH next AS (
+                SELECT id FROM jobs
+                WHERE status = 'queued' AND run_at <= CURRENT_TIMESTAMP
+                ORDER BY priority, run_at, id
+                LIMIT %s
+                FOR UPDATE SKIP LOCKED
+            )
+            UPDATE jobs j
+            SET status = 'running',
+                attempts = j.attempts + 1,
+                locked_by = %s,
+                locked_until = CURRENT_TIMESTAMP + make_interval(secs => %s)
+            FROM next
+            WHERE j.id = next.id
+            RETURNING j.id, j.kind, j.payload, j.priority, j.attempts, j.max_attempts
+            """,
+            (limit, worker, visibility),
+        )
+        return sorted(cur.fetchall(), key=lambda j: (j["priority"], j["id"]))
+
+
+def complete_job(job_id: int, worker: str):
+    """Finished jobs are deleted; nothing happens if the lease was lost."""
+    with db() as con, con.cursor() as cur:
+        cur.execute("DELETE FROM jobs WHERE id = %s AND locked_by = %s", (job_id, worker))
+
+
+def fail_job(job_id: int, worker: str, error: str, retry_in: float) -> Optional[str]:
+    """Requeue after `retry_in` seconds, or dead-letter once out of attempts; returns the new status."""
+    with db() as con, con.cursor() as cur:
+        cur.execute(
+            """
+            UPDATE jobs
+            SET status = CASE WHEN attempts >= max_attempts THEN 'dead' ELSE 'queued' END,
+                finished_at = CASE WHEN attempts >= max_attempts THEN CURRENT_TIMESTAMP END,
+                run_at = CURRENT_TIMESTAMP + make_interval(secs => %s),
+                locked_by = NULL,
+                locked_until = NULL,
+                last_error = %s
+            WHERE id = %s AND locked_by = %s AND status = 'running'
+            RETURNING status
+            """,
+            (retry_in, error[:2000], job_id, worker),
+        )
+        row = cur.fetchone()
+        return row[0] if row else None
+
+
+def extend_job(job_id: int, worker: str, visibility: float) -> bool:
+    """Heartbeat: push the lease of a long-running job forward."""
+    with db() as con, con.cursor() as cur:
+        cur.execute(
+            """
+            UPDATE jobs SET locked_until = CURRENT_TIMESTAMP + make_interval(secs => %s)
+            WHERE id = %s AND locked_by = %s AND status = 'running'
+            """,
+            (visibility, job_id, worker),
+        )
+        return cur.rowcount == 1
+
+
+def requeue_expired_jobs() -> int:
+    """Release jobs whose worker died (lease expired); each expiry counts as an attempt."""
+    with db() as con, con.cursor() as cur:
+        cur.execute(
+            """
+            UPDATE jobs
+            SET status = CASE WHEN attempts >= max_attempts THEN 'dead' ELSE 'queued' END,
+                finished_at = CASE WHEN attempts >= max_attempts THEN CURRENT_TIMESTAMP END,
+                locked_by = NULL,
+                locked_until = NULL,
+                last_error = 'lease expired'
+            WHERE status = 'running' AND locked_until < CURRENT_TIMESTAMP
+            """
+        )
+        released = cur.rowcount
+        if released:
+            cur.execute("SELECT pg_notify(%s, %s)", (JOBS_CHANNEL, "requeued"))
+        return released
+
+
+def job_stats() -> Dict[str, int]:
+    """Job counts by status (queued / running / dead)."""
+    with db() as con, con.cursor() as cur:
+        cur.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status")
+        return dict(cur.fetchall())
+
+
+# ===== Broadcasts =====
+def create_broadcast(kind: str, project_id: Optional[int], text: Optional[str], admin_chat_id: int) -> int:
+    """
+    Create a broadcast ('dm': verified users of a project, 'pin': every
+    project channel) with its recipient total; returns its id.
+    """
+    with db() as con, con.cursor() as cur:
+        if kind == "dm":
+            cur.execute("SELECT COUNT(*) FROM users WHERE project_id = %s AND verified = 1", (project_id,))
+        else:
+            cur.execute("SELECT COUNT(*) FROM projects WHERE channel_chat_id IS NOT NULL AND channel_chat_id <> ''")
+        total = cur.fetchone()[0]
+        cur.execute(
+            """
+            INSERT INTO broadcasts (kind, project_id, text, admin_chat_id, total)
+            VALUES (%s, %s, %s, %s, %s)
+            RETURNING id
+            """,
+            (kind, project_id, text, admin_chat_id, total),
+        )
+        return cur.fetchone()[0]
+
+
+def get_broadcast(broadcast_id: int) -> Optional[Dict]:
+    with db() as con, con.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+        cur.execute("SELECT * FROM broadcasts WHERE id = %s", (broadcast_id,))
+        return cur.fetchone()
+
+
+def get_running_broadcasts() -> List[int]:
+    with db() as con, con.cursor() as cur:
+        cur.execute("SELECT id FROM broadcasts WHERE status = 'running' ORDER BY id")
+        return [r[0] for r in cur.fetchall()]
+
+
+def get_broadcast_recipients(kind: str, project_id: Optional[int], after_id: int, limit: int) -> List[Tuple[int, str]]:
+    """
+    One keyset page of (row id, chat id): verified users' Telegram ids for
+    'dm', project channels for 'pin'.
+    """
+    with db() as con, con.cursor() as cur:
+        if kind == "dm":
+            cur.execute(
+                """
+                SELECT id, telegram_id::text
+                FROM users
+                WHERE project_id = %s AND verified = 1 AND id > %s
+                ORDER BY id
+                LIMIT %s
+                """,
+                (project_id, after_id, limit),
+            )
+        else:
+            cur.execute(
+                """
+                SELECT id, channel_chat_id
+                FROM projects
+                WHERE channel_chat_id IS NOT NULL AND channel_chat_id <> '' AND id > %s
+                ORDER BY id
+                LIMIT %s
+                """,
+                (after_id, limit),
+            )
+        return cur.fetchall()
+
+
+def set_broadcast_message(broadcast_id: int, message_id: int):
+    with db() as con, con.cursor() as cur:
+        cur.execute("UPDATE broadcasts SET status_message_id = %s WHERE id = %s", (message_id, broadcast_id))
+
+
+def checkpoint_broadcast(broadcast_id: int, cursor: int, sent: int, failed: int, done: bool = False) -> str:
+    """Persist progress; returns the current status (an admin may have cancelled)."""
+    with db() as con, con.cursor() as cur:
+        cur.execute(
+            """
+            UPDATE broadcasts
+            SET cursor = %s, sent = %s, failed = %s, updated_at = CURRENT_TIMESTAMP,
+                status = CASE WHEN %s AND status = 'running' THEN 'done' ELSE status END,
+                finished_at = CASE WHEN %s THEN CURRENT_TIMESTAMP ELSE finished_at END
+            WHERE id = %s
+            RETURNING status
+            """,
+            (cursor, sent, failed, done, done, broadcast_id),
+        )
+        row = cur.fetchone()
+        return row[0] if row else "cancelled"
+
+
+def cancel_broadcast(broadcast_id: int):
+    with db() as con, con.cursor() as cur:
+        cur.execute(
+            """
+            UPDATE broadcasts SET status = 'cancelled', finished_at = CURRENT_TIMESTAMP
+            WHERE id = %s AND status = 'running'
+            """,
+            (broadcast_id,),
+        )
+
+
+# ===== Cache (second tier) =====
+def cache_get(key: str) -> Optional[str]:
+    """Return the cached JSON value for `key` unless it has expired."""
+    with db() as con, con.cursor() as cur:
+        cur.execute(
+            """
+            SELECT value FROM kv_cache
+            WHERE key = %s AND (expires_at IS NULL OR expires_at > CURRENT_TIMESTAMP)
+            """,
+            (key,),
+        )
+        row = cur.fetchone()
+        return row[0] if row else None
+
+
+def cache_put(key: str, value: str, ttl: Optional[float] = None):
+    """Store a JSON value; ttl=None never expires."""
+    with db() as con, con.cursor() as cur:
+        cur.execute(
+            """
+            INSERT INTO kv_cache (key, value, expires_at)
+            VALUES (%s, %s, CASE WHEN %s::float IS NULL THEN NULL
+                                 ELSE CURRENT_TIMESTAMP + make_interval(secs => %s::float) END)
+            ON CONFLICT (key)
+            DO UPDATE SET value = EXCLUDED.value, expires_at = EXCLUDED.expires_at
+            """,
+            (key, value, ttl, ttl),
+        )
+
+
+def cache_delete(keys: List[str]):
+    with db() as con, con.cursor() as cur:
+        cur.execute("DELETE FROM kv_cache WHERE key = ANY(%s)", (list(keys),))
+
+
+def cache_purge_expired() -> int:
+    with db() as con, con.cursor() as cur:
+        cur.execute("DELETE FROM kv_cache WHERE expires_at <= CURRENT_TIMESTAMP")
+        return cur.rowcount
+
+
+# ===== Holder index =====
+def write_holder_index(
+    chain: str,
+    contract: str,
+    balances: List[Tuple[bytes, int]],
+    head: int,
+    tip: int,
+    refreshed_at: float,
+    wipe: bool = False,
+):
+    """
+    Publish one holder index step: changed balances are COPYed into a temp
+    table and merged (zero balances deleted), and the head row is moved in
+    the same transaction, so readers never see balances ahead of it.
+    wipe=True drops the contract's rows first (rebuild after a deep reorg).
+    """
+    with db() as con, con.cursor() as cur:
+        if wipe:
+            cur.execute("DELETE FROM holder_index WHERE chain = %s AND contract = %s", (chain, contract))
+        if balances:
+            cur.execute(
+                "CREATE TEMP TABLE holder_index_in (address TEXT, balance NUMERIC(78, 0)) ON COMMIT DROP"
+            )
+            cur.copy_expert(
+                "COPY holder_index_in (address, balance) FROM STDIN",
+                io.StringIO("".join(f"{addr.hex()}\t{balance}\n" for addr, balance in balances)),
+            )
+            cur.execute(
+                """
+                DELETE FROM holder_index h
+                USING holder_index_in i
+                WHERE h.chain = %s AND h.contract = %s
+                  AND h.address = decode(i.address, 'hex') AND i.balance <= 0
+                """,
+                (chain, contract),
+            )
+            cur.execute(
+                """
+                INSERT INTO holder_index (chain, contract, address, balance)
+                SELECT %s, %s, decode(address, 'hex'), balance
+                FROM holder_index_in
+                WHERE balance > 0
+                ON CONFLICT (chain, contract, address)
+                DO UPDATE SET balance = EXCLUDED.balance
+                """,
+                (chain, contract),
+            )
+        cur.execute(
+            """
+            INSERT INTO holder_index_heads (chain, contract, head, tip, refreshed_at)
+            VALUES (%s, %s, %s, %s, to_timestamp(%s))
+            ON CONFLICT (chain, contract)
+            DO UPDATE SET head = EXCLUDED.head, tip = EXCLUDED.tip, refreshed_at = EXCLUDED.refreshed_at
+            """,
+            (chain, contract, head, tip, refreshed_at),
+        )
+
+
+def get_indexed_balance(chain: str, contract: str, address: bytes, max_lag: int, max_age: float) -> Optional[int]:
+    """Published balance of `address`, or None unless the index is caught up and fresh."""
+    with db() as con, con.cursor() as cur:
+        cur.execute(
+            """
+            SELECT COALESCE(b.balance, 0)
+            FROM holder_index_heads h
+            LEFT JOIN holder_index b
+              ON b.chain = h.chain AND b.contract = h.contract AND b.address = %s
+            WHERE h.chain = %s AND h.contract = %s
+              AND h.tip - h.head <= %s
+              AND h.refreshed_at > CURRENT_TIMESTAMP - make_interval(secs => %s::float)
+            """,
+            (psycopg2.Binary(address), chain, contract, max_lag, max_age),
+        )
+        row = cur.fetchone()
+        return int(row[0]) if row else None
+
+
 # ===== Project Deletion =====
 def delete_project(project_id: int):
     """Delete a project by ID along with its associated users (cascade)."""
     with db() as con, con.cursor() as cur:
         cur.execute("DELETE FROM projects WHERE id = %s", (project_id,))
+        _notify_projects(cur, project_id)
+
+
+# ===== Instrumentation =====
+# Every query function above reports to holderxr_db_query_seconds
+metrics.instrument_module(
+    globals(), "psycopg2", exclude=("db", "get_pool", "close_pool", "pool_stats", "open_listener")
+)
 
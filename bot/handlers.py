@@ -1,24 +1,33 @@
 from __future__ import annotations
+import re
 import json
 import random
+import asyncio
 import logging
+import functools
 
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, InputFile
 from telegram.ext import ContextTypes
 from telegram.error import BadRequest
 
-from .config import ADMIN_USERNAMES, NETWORKS, DEFAULT_MIN_AMOUNT, BOT_USERNAME
-from .db import (
-    db,
-    upsert_state,
-    get_state,
-    get_latest_project,
-    get_all_projects,
-    save_verified_user,
-    get_verified_users,
+from .config import ADMIN_USERNAMES, NETWORKS, PROFILER_ENABLED, PROFILER_MAX_SECONDS
+from . import db
+from .projects import (
+    registry as projects,
+    create_project,
+    set_project_contract,
+    set_project_group,
+    set_project_channel,
     delete_project,
 )
-from .blockchain import is_token_holder, get_token_meta
+from .state import upsert_state, get_state
+from .jobs import submit, distributed, INTERACTIVE, BATCH
+from .export import send_export
+from .stats import stats_text
+from .market import quote_lines
+from .metrics import HANDLER_SECONDS
+from .broadcast import pin_verification_post, progress_text, cancel_kb
+from . import profiling
 
 logger = logging.getLogger(__name__)
 
@@ -30,9 +39,10 @@ def is_admin(update: Update) -> bool:
     u = update.effective_user
     return bool(u and u.username and u.username in ADMIN_USERNAMES)
 
-def verify_kb():
+def verify_kb(project_id: int | None = None):
+    data = f"user_verify:{project_id}" if project_id else "user_verify"
     return InlineKeyboardMarkup(
-        [[InlineKeyboardButton("✅ Verify", callback_data="user_verify")]]
+        [[InlineKeyboardButton("✅ Verify", callback_data=data)]]
     )
 
 def admin_dashboard_kb():
@@ -40,14 +50,16 @@ def admin_dashboard_kb():
         [
             [InlineKeyboardButton("📊 Project Info", callback_data="admin_project")],
             [InlineKeyboardButton("👥 Verified Users", callback_data="admin_stats")],
+            [InlineKeyboardButton("📤 Export Users", callback_data="admin_export")],
+            [InlineKeyboardButton("📢 Broadcast", callback_data="admin_broadcast")],
             [InlineKeyboardButton("📣 Re-Pin Verification Ad", callback_data="admin_repin")],
             [InlineKeyboardButton("⚙️ Configure Project", callback_data="admin_config")],
         ]
     )
 
-def join_community_kb(group_link: str | None):
+def join_community_kb(group_link: str | None, project_id: int | None = None):
     if not group_link or group_link.upper() == "NO_LINK":
-        return verify_kb()
+        return verify_kb(project_id)
     return InlineKeyboardMarkup(
         [[InlineKeyboardButton("👥 Join Community", url=group_link)]]
     )
@@ -70,28 +82,54 @@ async def safe_edit(q, text, reply_markup=None, parse_mode=None):
         if "Message is not modified" not in str(e):
             raise
 
+def _step(update: Update) -> str:
+    """Metric label: the button action or the FSM state the update is handled in."""
+    if update.callback_query:
+        action = (update.callback_query.data or "").split(":")[0]
+        return action if re.fullmatch(r"[a-z_]{1,32}", action) else "other"
+    if update.message and (update.message.text or "").startswith("/"):
+        return "command"
+    if update.effective_user:
+        return get_state(update.effective_user.id)[0] or "none"
+    return "none"
+
+def instrumented(fn):
+    """Time a handler in holderxr_handler_seconds{handler, step, outcome}."""
+    @functools.wraps(fn)
+    async def run(update: Update, context: ContextTypes.DEFAULT_TYPE):
+        with HANDLER_SECONDS.time(handler=fn.__name__, step=_step(update)):
+            return await fn(update, context)
+    return run
+
 # ===========================
 # Commands
 # ===========================
 
+@instrumented
 async def cmd_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     args = context.args
-    if args and args[0] == "verify":
+    if args and args[0].startswith("verify"):
+        # Deep link from a channel pin: verify or verify_<project id>
+        _, _, pid = args[0].partition("_")
         await update.message.reply_text(
             "🚀 <b>Token Holder Verification</b>\n\nTap below to start.",
-            reply_markup=verify_kb(),
+            reply_markup=verify_kb(int(pid) if pid.isdigit() else None),
             parse_mode="HTML",
         )
         return
     if is_admin(update):
         await cmd_admin(update, context)
         return
-    project = get_latest_project()
+    project = projects.latest()
     await update.message.reply_text(
         "🚀 Welcome! Verify to join the community.",
-        reply_markup=join_community_kb(project.get("group_invite_link") if project else None),
+        reply_markup=join_community_kb(
+            project.get("group_invite_link") if project else None,
+            project["id"] if project else None,
+        ),
     )
 
+@instrumented
 async def cmd_admin(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text(
         "🧠 <b>Admin Dashboard</b>",
@@ -99,39 +137,65 @@ async def cmd_admin(update: Update, context: ContextTypes.DEFAULT_TYPE):
         parse_mode="HTML",
     )
 
+async def cmd_profile(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """/profile [seconds]: sample every thread's stack and send the hottest functions."""
+    if not is_admin(update) or not PROFILER_ENABLED:
+        return
+    arg = context.args[0] if context.args else "30"
+    if not arg.isdigit() or not 1 <= int(arg) <= PROFILER_MAX_SECONDS:
+        await update.message.reply_text(f"Usage: /profile <seconds, 1-{PROFILER_MAX_SECONDS}>")
+        return
+    seconds = int(arg)
+    chat_id = update.effective_chat.id
+    await update.message.reply_text(f"🔬 Sampling stacks for {seconds}s…")
+    # Runs after this update finishes so the sampler sees normal traffic
+    context.application.create_task(_run_profile(context.bot, chat_id, seconds))
+
+async def _run_profile(bot, chat_id: int, seconds: int):
+    try:
+        sampler = await asyncio.to_thread(profiling.sample, seconds)
+    except RuntimeError as e:
+        await bot.send_message(chat_id, f"❌ {e}")
+        return
+    await bot.send_message(chat_id, sampler.summary(), parse_mode="HTML")
+    if sampler.stacks:
+        await bot.send_document(
+            chat_id,
+            InputFile(sampler.collapsed().encode(), filename="profile.collapsed"),
+            caption="Collapsed stacks (flamegraph.pl / speedscope)",
+        )
+
 # ===========================
 # Channel Pin
 # ===========================
 
 async def send_channel_pin(context: ContextTypes.DEFAULT_TYPE):
-    project = get_latest_project()
+    """Pin the verify post for `context.job.data` (a project id) or the latest project."""
+    pid = context.job.data if context.job else None
+    project = projects.get(pid) if pid else projects.latest()
     if not project or not project.get("channel_chat_id"):
         return
-    text = (
-        "🚀 <b>HOLDERS-ONLY ACCESS</b>\n\n"
-        f"🌐 <b>Network:</b> {NETWORKS.get(project['network'])}\n"
-        f"📄 <b>Contract:</b> <code>{project['contract_address']}</code>\n\n"
-        "👇 Click below to verify"
-    )
-    kb = InlineKeyboardMarkup(
-        [[InlineKeyboardButton("✅ Verify Now", url=f"https://t.me/{BOT_USERNAME}?start=verify")]]
-    )
+    await pin_verification_post(context.bot, project)
+
+async def start_broadcast(context: ContextTypes.DEFAULT_TYPE, chat_id: int, kind: str,
+                          project_id: int | None = None, text: str | None = None):
+    """Record a broadcast, post its progress message and hand it to the job queue."""
+    bid = await asyncio.to_thread(db.create_broadcast, kind, project_id, text, chat_id)
+    b = await asyncio.to_thread(db.get_broadcast, bid)
     msg = await context.bot.send_message(
-        chat_id=project["channel_chat_id"],
-        text=text,
-        reply_markup=kb,
-        parse_mode="HTML",
+        chat_id, progress_text(b, 0, 0, 0.0, "running"), reply_markup=cancel_kb(bid), parse_mode="HTML"
     )
-    await context.bot.pin_chat_message(
-        chat_id=project["channel_chat_id"],
-        message_id=msg.message_id,
-        disable_notification=True,
+    await asyncio.to_thread(db.set_broadcast_message, bid, msg.message_id)
+    # Don't hold up this update while an inline-mode broadcast runs
+    context.application.create_task(
+        submit("broadcast", {"broadcast_id": bid}, priority=BATCH, bot=context.bot)
     )
 
 # ===========================
 # Button Handlers
 # ===========================
 
+@instrumented
 async def on_button(update: Update, context: ContextTypes.DEFAULT_TYPE):
     q = update.callback_query
     await q.answer()
@@ -156,11 +220,7 @@ async def on_button(update: Update, context: ContextTypes.DEFAULT_TYPE):
         state, payload = get_state(uid)
         p = json.loads(payload)
         try:
-            with db() as con, con.cursor() as cur:
-                cur.execute(
-                    "UPDATE projects SET network=%s, contract_address=%s WHERE id=%s",
-                    (p["network"], p["contract"], p["project_id"]),
-                )
+            await set_project_contract(p["project_id"], p["network"], p["contract"])
         except Exception as e:
             await safe_edit(q, f"❌ Could not save contract: {e}")
             return
@@ -180,14 +240,17 @@ async def on_button(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 f"{NETWORKS.get(p['network'])} • {p['contract_address'][:6]}…",
                 callback_data=f"project:{p['id']}"
             )]
-            for p in get_all_projects()
+            for p in projects.all()
         ]
         await safe_edit(q, "Select a project:", reply_markup=InlineKeyboardMarkup(rows))
         return
 
     if data.startswith("project:"):
         pid = int(data.split(":")[1])
-        p = next(p for p in get_all_projects() if p["id"] == pid)
+        p = projects.get(pid)
+        if not p:
+            await safe_edit(q, "Project not found.", reply_markup=admin_dashboard_kb())
+            return
         text = (
             "<b>📊 Project Info</b>\n\n"
             f"• <b>Owner:</b> @{p['owner_username']}\n"
@@ -196,6 +259,9 @@ async def on_button(update: Update, context: ContextTypes.DEFAULT_TYPE):
             f"• <b>Group:</b> {p.get('group_invite_link') or 'Not set'}\n"
             f"• <b>Channel:</b> {p.get('channel_chat_id') or 'Not set'}\n"
         )
+        market = quote_lines(p)
+        if market:
+            text += "\n" + market
         kb = InlineKeyboardMarkup([
             [InlineKeyboardButton("🗑 Delete", callback_data=f"delete:{pid}")],
             [InlineKeyboardButton("⬅ Back", callback_data="admin_project")],
@@ -204,19 +270,85 @@ async def on_button(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
 
     if data.startswith("delete:"):
-        delete_project(int(data.split(":")[1]))
+        await delete_project(int(data.split(":")[1]))
         await safe_edit(q, "✅ Project deleted.", reply_markup=admin_dashboard_kb())
         return
 
+    # ---------- STATS ----------
+    if data == "admin_stats":
+        await safe_edit(q, await stats_text(), reply_markup=admin_dashboard_kb(), parse_mode="HTML")
+        return
+
+    # ---------- EXPORT ----------
+    if data == "admin_export":
+        rows = [
+            [
+                InlineKeyboardButton(
+                    f"{NETWORKS.get(p['network'])} • {p['contract_address'][:6]}… • {fmt.upper()}",
+                    callback_data=f"export:{p['id']}:{fmt}",
+                )
+                for fmt in ("csv", "ndjson")
+            ]
+            for p in projects.all()
+        ]
+        await safe_edit(q, "Export verified users of:", reply_markup=InlineKeyboardMarkup(rows))
+        return
+
+    if data.startswith("export:"):
+        if not is_admin(update):
+            return
+        _, pid, fmt = data.split(":")
+        await safe_edit(q, "⏳ Preparing export…")
+        try:
+            await send_export(context.bot, q.message.chat_id, int(pid), fmt)
+        except Exception as e:
+            logger.exception("Export failed for project %s", pid)
+            await safe_edit(q, f"❌ Export failed: {e}", reply_markup=admin_dashboard_kb())
+            return
+        await safe_edit(q, "✅ Export sent.", reply_markup=admin_dashboard_kb())
+        return
+
     if data == "admin_repin":
-        await send_channel_pin(context)
-        await safe_edit(q, "📌 Verification post re-pinned.", reply_markup=admin_dashboard_kb())
+        if not is_admin(update):
+            return
+        await start_broadcast(context, q.message.chat_id, "pin")
+        await safe_edit(q, "📌 Re-pinning the verification post in every channel.", reply_markup=admin_dashboard_kb())
+        return
+
+    # ---------- BROADCAST ----------
+    if data == "admin_broadcast":
+        rows = [
+            [InlineKeyboardButton(
+                f"{NETWORKS.get(p['network'])} • {p['contract_address'][:6]}…",
+                callback_data=f"bcast:{p['id']}"
+            )]
+            for p in projects.all()
+        ]
+        await safe_edit(q, "Message the verified holders of:", reply_markup=InlineKeyboardMarkup(rows))
+        return
+
+    if data.startswith("bcast:"):
+        if not is_admin(update):
+            return
+        upsert_state(uid, "BROADCAST_TEXT", json.dumps({"project_id": int(data.split(":")[1])}))
+        await safe_edit(q, "Send the message to broadcast:")
+        return
+
+    if data.startswith("bcast_cancel:"):
+        if not is_admin(update):
+            return
+        await asyncio.to_thread(db.cancel_broadcast, int(data.split(":")[1]))
+        await q.edit_message_reply_markup(None)
         return
 
     # ---------- VERIFY ----------
-    if data == "user_verify":
+    if data == "user_verify" or data.startswith("user_verify:"):
         a, b = random.randint(2, 9), random.randint(2, 9)
-        upsert_state(uid, "VERIFY_MATH", json.dumps({"answer": a + b}))
+        pid = data.partition(":")[2]
+        upsert_state(uid, "VERIFY_MATH", json.dumps({
+            "answer": a + b,
+            "project_id": int(pid) if pid.isdigit() else None,
+        }))
         await safe_edit(q, f"🧠 Human check: {a} + {b} ?")
         return
 
@@ -224,6 +356,7 @@ async def on_button(update: Update, context: ContextTypes.DEFAULT_TYPE):
 # Message Handlers
 # ===========================
 
+@instrumented
 async def on_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
     uid = update.effective_user.id
     text = (update.message.text or "").strip()
@@ -231,13 +364,7 @@ async def on_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     # ---------- CONFIG FLOW ----------
     if state == "CFG_OWNER":
-        with db() as con, con.cursor() as cur:
-            # Insert default values for required fields
-            cur.execute(
-                "INSERT INTO projects (owner_username, network, contract_address) VALUES (%s, %s, %s) RETURNING id",
-                (text, "eth", "0x0"),
-            )
-            pid = cur.fetchone()[0]
+        pid = await create_project(text)
 
         upsert_state(uid, "CFG_NETWORK", json.dumps({"project_id": pid}))
         await update.message.reply_text("Select network:", reply_markup=network_select_kb())
@@ -247,66 +374,76 @@ async def on_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
         data_json = json.loads(payload)
         pid = data_json["project_id"]
         network = data_json.get("network", "eth")
-        meta = get_token_meta(network, text)
-        if not meta:
-            await update.message.reply_text("❌ Invalid contract. Send again:")
-            return
-
+        # The lookup job answers with Confirm / Re-enter buttons
         upsert_state(
             uid,
             "CFG_CONTRACT_CONFIRM",
-            json.dumps({"project_id": pid, "contract": text, "network": network, "meta": meta}),
+            json.dumps({"project_id": pid, "contract": text, "network": network}),
         )
-        kb = InlineKeyboardMarkup([
-            [InlineKeyboardButton("✅ Confirm", callback_data="confirm_contract")],
-            [InlineKeyboardButton("❌ Re-enter", callback_data="retry_contract")],
-        ])
-        await update.message.reply_text(
-            f"🔎 <b>Token Found</b>\n\n"
-            f"Name: <b>{meta['name']}</b>\n"
-            f"Symbol: <b>{meta['symbol']}</b>\n\nConfirm this contract?",
-            reply_markup=kb,
-            parse_mode="HTML",
+        await submit(
+            "token_meta",
+            {"chat_id": update.effective_chat.id, "network": network, "contract": text},
+            priority=INTERACTIVE,
+            bot=context.bot,
         )
         return
 
     if state == "CFG_GROUP":
         pid = json.loads(payload)["project_id"]
-        with db() as con, con.cursor() as cur:
-            cur.execute("UPDATE projects SET group_invite_link=%s WHERE id=%s", (text, pid))
+        await set_project_group(pid, text)
         upsert_state(uid, "CFG_CHANNEL", json.dumps({"project_id": pid}))
         await update.message.reply_text("Send channel chat_id or @channelusername:")
         return
 
     if state == "CFG_CHANNEL":
         pid = json.loads(payload)["project_id"]
-        with db() as con, con.cursor() as cur:
-            cur.execute("UPDATE projects SET channel_chat_id=%s WHERE id=%s", (text, pid))
+        await set_project_channel(pid, text)
         upsert_state(uid, None, None)
         await update.message.reply_text("🎉 Project fully configured!", reply_markup=admin_dashboard_kb())
         return
 
+    # ---------- BROADCAST ----------
+    if state == "BROADCAST_TEXT":
+        upsert_state(uid, None, None)
+        if not is_admin(update) or not text:
+            return
+        await start_broadcast(
+            context, update.effective_chat.id, "dm", json.loads(payload)["project_id"], update.message.text
+        )
+        return
+
     # ---------- VERIFY ----------
     if state == "VERIFY_MATH":
-        if text.isdigit() and int(text) == json.loads(payload)["answer"]:
-            upsert_state(uid, "VERIFY_WALLET", "{}")
+        p = json.loads(payload)
+        if text.isdigit() and int(text) == p["answer"]:
+            upsert_state(uid, "VERIFY_WALLET", json.dumps({"project_id": p.get("project_id")}))
             await update.message.reply_text("Send wallet address:")
         else:
             upsert_state(uid, None, None)
-            await update.message.reply_text("❌ Wrong answer.", reply_markup=verify_kb())
+            await update.message.reply_text("❌ Wrong answer.", reply_markup=verify_kb(p.get("project_id")))
         return
 
     if state == "VERIFY_WALLET":
-        project = get_latest_project()
-        if not is_token_holder(
-            project["network"], text, project["contract_address"], DEFAULT_MIN_AMOUNT
-        ):
-            await update.message.reply_text("❌ You do not hold the token.")
+        pid = json.loads(payload or "{}").get("project_id")
+        project = (projects.get(pid) if pid else None) or projects.latest()
+        if not project:
+            upsert_state(uid, None, None)
+            await update.message.reply_text("❌ No project is configured yet.")
             return
-        save_verified_user(uid, update.effective_user.username or "", project["id"], text)
-        upsert_state(uid, None, None)
-        await update.message.reply_text(
-            "🎉 Verified!",
-            reply_markup=join_community_kb(project.get("group_invite_link")),
+        # The check job replies with the invite link and ends VERIFY_WALLET;
+        # until then the user can send another address.
+        if distributed():
+            await update.message.reply_text("⏳ Checking your wallet…")
+        await submit(
+            "holder_check",
+            {
+                "chat_id": update.effective_chat.id,
+                "telegram_id": uid,
+                "username": update.effective_user.username or "",
+                "project_id": project["id"],
+                "wallet": text,
+            },
+            priority=INTERACTIVE,
+            bot=context.bot,
         )
         return
@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import time
+import asyncio
+import logging
+import threading
+import weakref
+import hashlib
+from typing import Any, Awaitable, Dict, Optional, Tuple, TypeVar
+from urllib.parse import parse_qsl, urlsplit
+
+import httpx
+
+from .ratelimit import ProviderUnavailable, admit
+from .metrics import HTTP_SECONDS
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+try:  # HTTP/2 needs the optional `h2` package
+    import h2  # noqa: F401
+    HTTP2_ENABLED = True
+except ImportError:  # pragma: no cover - depends on environment
+    HTTP2_ENABLED = False
+
+DEFAULT_TIMEOUT = httpx.Timeout(10.0, connect=5.0)
+DEFAULT_LIMITS = httpx.Limits(
+    max_connections=50,
+    max_keepalive_connections=20,
+    keepalive_expiry=30.0,
+)
+
+# loop -> { "https://host:port": AsyncClient }
+# httpx connection pools are bound to the loop that created them, so every
+# loop (PTB's loop, the sync-wrapper loop) gets its own set of clients.
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, httpx.AsyncClient]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _origin(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+def client_for(url: str) -> httpx.AsyncClient:
+    """Return the keep-alive client for the provider host of `url`."""
+    loop = asyncio.get_running_loop()
+    per_loop = _clients.setdefault(loop, {})
+    origin = _origin(url)
+    client = per_loop.get(origin)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            http2=HTTP2_ENABLED,
+            timeout=DEFAULT_TIMEOUT,
+            limits=DEFAULT_LIMITS,
+            headers={"User-Agent": "holderxr-bot"},
+        )
+        per_loop[origin] = client
+    return client
+
+
+def _limit_key(url: str, params: Optional[Dict[str, Any]]) -> Tuple[str, str]:
+    """(bucket key, host): one bucket per provider host and API key."""
+    parts = urlsplit(url)
+    host = parts.hostname or ""
+    secret = ""
+    for name, value in list(parse_qsl(parts.query)) + list((params or {}).items()):
+        if name.lower().replace("-", "").replace("_", "") == "apikey":
+            secret = str(value)
+    if not secret and host.endswith("alchemy.com"):
+        secret = parts.path.rsplit("/", 1)[-1]  # key lives in the path: /v2/<key>
+    if not secret:
+        return host, host
+    return f"{host}#{hashlib.sha1(secret.encode()).hexdigest()[:8]}", host
+
+
+def _retry_after(r: httpx.Response) -> Optional[float]:
+    try:
+        return float(r.headers.get("Retry-After", ""))
+    except ValueError:
+        return None
+
+
+async def _request(method: str, url: str, timeout: Optional[float] = None, **kwargs: Any) -> Any:
+    """
+    Rate-limited request. 429s, 5xx and transport errors feed the provider's
+    circuit breaker and surface as ProviderUnavailable.
+    """
+    key, host = _limit_key(url, kwargs.get("params"))
+    breaker = await admit(key, host)
+    started = time.perf_counter()
+    try:
+        r = await client_for(url).request(method, url, timeout=timeout or DEFAULT_TIMEOUT, **kwargs)
+    except asyncio.CancelledError:
+        breaker.abandon()
+        HTTP_SECONDS.observe(time.perf_counter() - started, host=host, outcome="cancelled")
+        raise
+    except httpx.HTTPError as exc:
+        breaker.record_failure()
+        HTTP_SECONDS.observe(time.perf_counter() - started, host=host, outcome="error")
+        raise ProviderUnavailable(f"{host}: {exc!r}") from exc
+    HTTP_SECONDS.observe(time.perf_counter() - started, host=host, outcome=str(r.status_code))
+
+    if r.status_code == 429 or r.status_code >= 500:
+        breaker.record_failure(_retry_after(r))
+        raise ProviderUnavailable(f"{host} returned HTTP {r.status_code}")
+
+    breaker.record_success()
+    r.raise_for_status()
+    return r.json()
+
+
+async def get_json(url: str, params: Optional[Dict[str, Any]] = None, timeout: Optional[float] = None) -> Any:
+    return await _request("GET", url, timeout=timeout, params=params)
+
+
+async def post_json(url: str, payload: Any, timeout: Optional[float] = None) -> Any:
+    return await _request("POST", url, timeout=timeout, json=payload)
+
+
+async def aclose():
+    """Close every client owned by the running loop (call on shutdown)."""
+    loop = asyncio.get_running_loop()
+    for client in list(_clients.pop(loop, {}).values()):
+        await client.aclose()
+
+
+# ===========================
+# Sync bridge
+# ===========================
+
+_bg_loop: Optional[asyncio.AbstractEventLoop] = None
+_bg_lock = threading.Lock()
+
+
+def _background_loop() -> asyncio.AbstractEventLoop:
+    global _bg_loop
+    with _bg_lock:
+        if _bg_loop is None:
+            _bg_loop = asyncio.new_event_loop()
+            threading.Thread(
+                target=_bg_loop.run_forever, name="httpclient-sync", daemon=True
+            ).start()
+    return _bg_loop
+
+
+def run_sync(coro: Awaitable[T]) -> T:
+    """Run `coro` on a private background loop and block until it finishes."""
+    return asyncio.run_coroutine_threadsafe(coro, _background_loop()).result()
@@ -0,0 +1,277 @@
+from __future__ import annotations
+
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set, Tuple
+
+from telegram.ext import ContextTypes
+
+from .config import (
+    HOLDER_INDEX_PROJECTS,
+    INDEX_REORG_DEPTH,
+    INDEX_MAX_AGE,
+    INDEX_MAX_LAG_BLOCKS,
+    INDEX_MAX_RANGES_PER_STEP,
+)
+from . import db
+from .blockchain import JsonRpcClient, RpcError, evm_rpc_url
+from .jobs import distributed
+from .projects import registry as projects
+
+logger = logging.getLogger(__name__)
+
+# keccak256("Transfer(address,address,uint256)")
+TRANSFER_TOPIC = "0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef"
+ZERO = bytes(20)
+
+MIN_RANGE = 1
+MAX_RANGE = 50_000
+INITIAL_RANGE = 2_000
+# Grow the window while a range returns fewer logs than this
+GROW_BELOW_LOGS = 2_000
+
+
+class HolderIndex:
+    """
+    ERC20 balances rebuilt from Transfer logs.
+
+    Balances are keyed by the raw 20-byte address. Per-block deltas are kept
+    for the last `reorg_depth` blocks together with the hashes we indexed,
+    so a reorg inside that window is undone by replaying the deltas
+    backwards; a deeper reorg triggers a full rebuild.
+
+    With publish=True the balances changed by each step are written to
+    Postgres (publish()), so job workers in other processes can use them.
+    """
+
+    def __init__(
+        self,
+        chain: str,
+        contract: str,
+        start_block: int = 0,
+        reorg_depth: int = INDEX_REORG_DEPTH,
+        project_id: Optional[int] = None,
+        publish: bool = False,
+    ):
+        self.project_id = project_id
+        self.publish_changes = publish
+        self.chain = chain
+        self.contract = contract.lower()
+        self.start_block = start_block
+        self.reorg_depth = reorg_depth
+        self.client = JsonRpcClient(evm_rpc_url(chain) or "")
+        self.range = INITIAL_RANGE
+        self.tip = 0                  # latest chain block seen
+        self.refreshed_at = 0.0       # wall-clock time of the last successful tip refresh
+        self._reset()
+
+    def _reset(self):
+        self.balances: Dict[bytes, int] = {}
+        self.head = self.start_block - 1      # last fully indexed block
+        self._deltas: "OrderedDict[int, Dict[bytes, int]]" = OrderedDict()
+        self._hashes: "OrderedDict[int, str]" = OrderedDict()
+        self.logs_applied = 0
+        self._changed: Set[bytes] = set()     # addresses not yet published
+        self._wiped = True                    # published rows must be dropped first
+
+    # ===== Lookups =====
+    @property
+    def caught_up(self) -> bool:
+        # A failing tip refresh freezes `tip`, so lag alone cannot tell we are behind
+        return (
+            self.tip > 0
+            and self.tip - self.head <= INDEX_MAX_LAG_BLOCKS
+            and time.time() - self.refreshed_at <= INDEX_MAX_AGE
+        )
+
+    def balance(self, address: str) -> Optional[int]:
+        """Indexed balance, or None while the index is behind the chain."""
+        if not self.caught_up:
+            return None
+        return self.balances.get(bytes.fromhex(address[2:].lower()), 0)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "head": self.head,
+            "tip": self.tip,
+            "holders": sum(1 for v in self.balances.values() if v > 0),
+            "logs_applied": self.logs_applied,
+            "range": self.range,
+        }
+
+    # ===== Ingestion =====
+    def _apply(self, logs: List[Dict], track_from: int):
+        for log in logs:
+            topics = log.get("topics") or []
+            if len(topics) != 3 or topics[0] != TRANSFER_TOPIC:
+                continue  # not an ERC20 Transfer (e.g. ERC721 has 4 topics)
+            src = bytes.fromhex(topics[1][-40:])
+            dst = bytes.fromhex(topics[2][-40:])
+            value = int(log.get("data") or "0x0", 16)
+            block = int(log["blockNumber"], 16)
+            delta = self._deltas.setdefault(block, {}) if block >= track_from else None
+            for addr, amount in ((src, -value), (dst, value)):
+                if addr == ZERO:
+                    continue
+                self.balances[addr] = self.balances.get(addr, 0) + amount
+                if self.publish_changes:
+                    self._changed.add(addr)
+                if delta is not None:
+                    delta[addr] = delta.get(addr, 0) + amount
+            self.logs_applied += 1
+
+    def _rollback_to(self, block: int):
+        for number in [n for n in self._deltas if n > block]:
+            for addr, amount in self._deltas.pop(number).items():
+                self.balances[addr] = self.balances.get(addr, 0) - amount
+                if self.publish_changes:
+                    self._changed.add(addr)
+        for number in [n for n in self._hashes if n > block]:
+            del self._hashes[number]
+        self.head = block
+
+    def _prune(self):
+        floor = self.tip - self.reorg_depth
+        while self._deltas and next(iter(self._deltas)) < floor:
+            self._deltas.popitem(last=False)
+        while self._hashes and next(iter(self._hashes)) < floor:
+            self._hashes.popitem(last=False)
+
+    async def _block_hash(self, number: int) -> Optional[str]:
+        block = await self.client.call("eth_getBlockByNumber", [hex(number), False])
+        return block.get("hash") if block else None
+
+    async def _check_reorg(self):
+        """Walk our recorded hashes back until one still matches the chain."""
+        if not self._hashes:
+            return
+        last = next(reversed(self._hashes))
+        if await self._block_hash(last) == self._hashes[last]:
+            return
+        for number in reversed(list(self._hashes)):
+            if await self._block_hash(number) == self._hashes[number]:
+                logger.warning("Reorg on %s:%s, rolling back to block %d", self.chain, self.contract, number)
+                self._rollback_to(number)
+                return
+        logger.warning("Reorg deeper than %d blocks on %s:%s, rebuilding", self.reorg_depth, self.chain, self.contract)
+        self._reset()
+
+    async def _get_logs(self, start: int, end: int) -> Optional[List[Dict]]:
+        try:
+            return await self.client.call("eth_getLogs", [{
+                "address": self.contract,
+                "topics": [TRANSFER_TOPIC],
+                "fromBlock": hex(start),
+                "toBlock": hex(end),
+            }])
+        except RpcError as err:
+            # Too many results / range too large: shrink the window and retry
+            if self.range <= MIN_RANGE:
+                raise
+            self.range = max(MIN_RANGE, self.range // 2)
+            logger.debug("eth_getLogs %d-%d failed (%s), range → %d", start, end, err, self.range)
+            return None
+
+    async def step(self, max_ranges: int = INDEX_MAX_RANGES_PER_STEP):
+        """Index up to `max_ranges` log windows towards the chain tip."""
+        self.tip = int(await self.client.call("eth_blockNumber", []), 16)
+        self.refreshed_at = time.time()
+        await self._check_reorg()
+
+        for _ in range(max_ranges):
+            start = self.head + 1
+            if start > self.tip:
+                break
+            end = min(start + self.range - 1, self.tip)
+            logs = await self._get_logs(start, end)
+            if logs is None:
+                continue
+            self._apply(logs, track_from=self.tip - self.reorg_depth)
+            self.head = end
+            if end >= self.tip - self.reorg_depth:
+                block_hash = await self._block_hash(end)
+                if block_hash:
+                    self._hashes[end] = block_hash
+            if len(logs) < GROW_BELOW_LOGS:
+                self.range = min(MAX_RANGE, self.range * 2)
+        self._prune()
+
+    async def publish(self):
+        """Write the balances changed since the last publish, plus our head, to Postgres."""
+        changed, wiped = self._changed, self._wiped
+        self._changed, self._wiped = set(), False
+        rows = [(addr, self.balances.get(addr, 0)) for addr in changed]
+        try:
+            await asyncio.to_thread(
+                db.write_holder_index,
+                self.chain, self.contract, rows, self.head, self.tip, self.refreshed_at, wiped,
+            )
+        except Exception:
+            # Retry with the next step; a rebuild meanwhile needs the wipe anyway
+            self._changed |= changed
+            self._wiped = self._wiped or wiped
+            raise
+
+
+# (chain, contract) -> index
+_indexes: Dict[Tuple[str, str], HolderIndex] = {}
+
+
+async def indexed_balance(chain: str, contract: str, address: str) -> Optional[int]:
+    """
+    Balance from the holder index, or None (→ ask the RPC providers).
+
+    The bot process answers from its own index; job workers read the copy
+    the bot process publishes, for the projects in HOLDER_INDEX_PROJECTS.
+    """
+    index = _indexes.get((chain, contract.lower()))
+    if index is not None:
+        return index.balance(address)
+    if not HOLDER_INDEX_PROJECTS or not distributed():
+        return None
+    project = await asyncio.to_thread(projects.by_contract, chain, contract)
+    if not project or project["id"] not in HOLDER_INDEX_PROJECTS:
+        return None
+    try:
+        return await asyncio.to_thread(
+            db.get_indexed_balance,
+            chain, contract.lower(), bytes.fromhex(address[2:].lower()), INDEX_MAX_LAG_BLOCKS, INDEX_MAX_AGE,
+        )
+    except Exception as exc:
+        logger.warning("Holder index lookup failed for %s:%s: %s", chain, contract, exc)
+        return None
+
+
+def index_stats() -> Dict[str, Dict[str, int]]:
+    return {f"{chain}:{contract}": idx.stats() for (chain, contract), idx in _indexes.items()}
+
+
+async def index_holders(context: ContextTypes.DEFAULT_TYPE):
+    """Job-queue task: advance every configured project's holder index."""
+    started = time.monotonic()
+    for project_id, start_block in HOLDER_INDEX_PROJECTS.items():
+        project = await asyncio.to_thread(projects.get, project_id)
+        if not project or project["network"] not in ("eth", "base", "bsc"):
+            continue
+        key = (project["network"], project["contract_address"].lower())
+        index = _indexes.get(key)
+        if index is None:
+            # Drop a stale index if the project's contract was changed
+            for old in [k for k, v in _indexes.items() if v.project_id == project_id]:
+                del _indexes[old]
+            index = _indexes[key] = HolderIndex(
+                project["network"], project["contract_address"], start_block,
+                project_id=project_id, publish=distributed(),
+            )
+        try:
+            await index.step()
+        except Exception as exc:
+            logger.warning("Holder index step failed for project %s: %s", project_id, exc)
+        if index.publish_changes:
+            try:
+                await index.publish()
+            except Exception as exc:
+                logger.warning("Holder index publish failed for project %s: %s", project_id, exc)
+    logger.debug("Holder index pass took %.2fs", time.monotonic() - started)
@@ -0,0 +1,272 @@
+from __future__ import annotations
+
+import os
+import time
+import socket
+import asyncio
+import logging
+import traceback
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from telegram import Bot
+
+from .config import (
+    BOT_TOKEN,
+    JOB_QUEUE,
+    JOB_MAX_ATTEMPTS,
+    JOB_VISIBILITY_TIMEOUT,
+    JOB_POLL_INTERVAL,
+    WORKER_CONCURRENCY,
+    WORKER_PROCESSES,
+)
+from . import db, adb
+
+logger = logging.getLogger(__name__)
+
+# Priorities: lower runs first
+INTERACTIVE = 10
+BATCH = 100
+
+
+class JobContext:
+    """What a job handler gets besides its payload."""
+
+    def __init__(self, bot: Bot, job_id: Optional[int], attempt: int, max_attempts: int):
+        self.bot = bot
+        self.job_id = job_id
+        self.attempt = attempt
+        self.max_attempts = max_attempts
+
+    @property
+    def final_attempt(self) -> bool:
+        return self.attempt >= self.max_attempts
+
+
+Handler = Callable[[JobContext, Dict[str, Any]], Awaitable[None]]
+
+# kind -> (handler, max attempts)
+_handlers: Dict[str, Tuple[Handler, int]] = {}
+
+
+def job(kind: str, max_attempts: int = JOB_MAX_ATTEMPTS):
+    """Register an async `handler(ctx, payload)` for a job kind."""
+    def register(fn: Handler) -> Handler:
+        _handlers[kind] = (fn, max_attempts)
+        return fn
+    return register
+
+
+def distributed() -> bool:
+    """True when jobs run outside the bot process (worker tier or process pool)."""
+    return JOB_QUEUE in ("postgres", "local")
+
+
+def _backoff(attempt: int) -> float:
+    return min(2.0 ** attempt, 300.0)
+
+
+async def _run_with_retries(bot: Bot, kind: str, payload: Dict[str, Any]):
+    """Run a job in this process, retrying with backoff (inline / local modes)."""
+    handler, max_attempts = _handlers[kind]
+    for attempt in range(1, max_attempts + 1):
+        try:
+            await handler(JobContext(bot, None, attempt, max_attempts), payload)
+            return
+        except Exception:
+            if attempt >= max_attempts:
+                logger.exception("Job %s failed after %d attempts (dropped)", kind, attempt)
+                return
+            logger.warning("Job %s attempt %d failed, retrying", kind, attempt, exc_info=True)
+            await asyncio.sleep(_backoff(attempt))
+
+
+# ===========================
+# Submitting
+# ===========================
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _run_in_child(kind: str, payload: Dict[str, Any]):
+    """Process-pool entry point: fresh loop and Bot per job."""
+    from . import tasks  # noqa: F401  (registers job kinds in the child)
+    from .projects import registry as projects
+
+    projects.start_listener()  # once per child; keeps project edits visible to later jobs
+
+    async def run():
+        async with Bot(BOT_TOKEN) as bot:
+            await _run_with_retries(bot, kind, payload)
+
+    asyncio.run(run())
+
+
+def _child_done(fut):
+    if fut.exception():
+        logger.error("Process-pool job crashed: %r", fut.exception())
+
+
+async def submit(kind: str, payload: Dict[str, Any], priority: int = BATCH, bot: Optional[Bot] = None):
+    """
+    Run a job according to JOB_QUEUE:
+    - inline: right here, awaited (needs `bot`)
+    - postgres: enqueue for worker.py processes
+    - local: hand it to a local process pool (dev / tests, no worker tier)
+    """
+    if kind not in _handlers:
+        raise KeyError(f"Unknown job kind: {kind}")
+    if JOB_QUEUE == "postgres":
+        await adb.enqueue_job(kind, payload, priority, _handlers[kind][1])
+    elif JOB_QUEUE == "local":
+        global _pool
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=WORKER_PROCESSES, mp_context=multiprocessing.get_context("spawn"))
+        asyncio.get_running_loop().run_in_executor(_pool, _run_in_child, kind, payload).add_done_callback(_child_done)
+    else:
+        await _run_with_retries(bot, kind, payload)
+
+
+def shutdown_pool():
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+
+
+# ===========================
+# Postgres worker
+# ===========================
+
+class Worker:
+    """
+    Claims jobs with FOR UPDATE SKIP LOCKED and runs up to `concurrency` at
+    once. Wakes on NOTIFY jobs_ready, polls every JOB_POLL_INTERVAL as a
+    fallback, heartbeats running jobs and releases expired leases.
+    """
+
+    def __init__(self, bot: Bot, concurrency: int = WORKER_CONCURRENCY, name: Optional[str] = None):
+        self.bot = bot
+        self.concurrency = concurrency
+        self.name = name or f"{socket.gethostname()}:{os.getpid()}"
+        self._slots = asyncio.Semaphore(concurrency)
+        self._wake = asyncio.Event()
+        self._tasks: set = set()
+        self.done = 0
+        self.failed = 0
+        self.dead = 0
+
+    # ----- wake-ups -----
+    def _listen(self):
+        """Register the LISTEN connection with the loop; returns it (or None)."""
+        try:
+            con = db.open_listener(db.JOBS_CHANNEL)
+        except Exception as exc:
+            logger.warning("Job listener unavailable, polling only: %s", exc)
+            return None
+
+        def on_notify():
+            try:
+                con.poll()
+            except Exception:
+                return
+            if con.notifies:
+                con.notifies.clear()
+                self._wake.set()
+
+        asyncio.get_running_loop().add_reader(con.fileno(), on_notify)
+        return con
+
+    # ----- running -----
+    async def _heartbeat(self, job_id: int):
+        while True:
+            await asyncio.sleep(JOB_VISIBILITY_TIMEOUT / 3)
+            if not await asyncio.to_thread(db.extend_job, job_id, self.name, JOB_VISIBILITY_TIMEOUT):
+                logger.warning("Lost lease on job %s", job_id)
+                return
+
+    async def _execute(self, row: Dict[str, Any]):
+        kind, job_id = row["kind"], row["id"]
+        heartbeat = asyncio.create_task(self._heartbeat(job_id))
+        started = time.monotonic()
+        try:
+            entry = _handlers.get(kind)
+            if entry is None:
+                raise KeyError(f"No handler for job kind {kind!r}")
+            ctx = JobContext(self.bot, job_id, row["attempts"], row["max_attempts"])
+            await entry[0](ctx, row["payload"] or {})
+        except Exception as exc:
+            self.failed += 1
+            status = await asyncio.to_thread(
+                db.fail_job, job_id, self.name, "".join(traceback.format_exception_only(exc)).strip(),
+                _backoff(row["attempts"]),
+            )
+            if status == "dead":
+                self.dead += 1
+                logger.error("Job %s (%s) dead-lettered after %d attempts: %s", job_id, kind, row["attempts"], exc)
+            else:
+                logger.warning("Job %s (%s) attempt %d failed: %s", job_id, kind, row["attempts"], exc)
+        else:
+            self.done += 1
+            await asyncio.to_thread(db.complete_job, job_id, self.name)
+            logger.debug("Job %s (%s) done in %.2fs", job_id, kind, time.monotonic() - started)
+        finally:
+            heartbeat.cancel()
+            self._slots.release()
+
+    async def run(self, stop: asyncio.Event):
+        listener = self._listen()
+        last_reap = 0.0
+        logger.info("Worker %s started (%d slots)", self.name, self.concurrency)
+        try:
+            while not stop.is_set():
+                if time.monotonic() - last_reap > JOB_VISIBILITY_TIMEOUT / 2:
+                    last_reap = time.monotonic()
+                    try:
+                        released = await asyncio.to_thread(db.requeue_expired_jobs)
+                        if released:
+                            logger.warning("Released %d jobs with expired leases", released)
+                    except Exception as exc:
+                        logger.warning("Lease reaper failed: %s", exc)
+
+                # Wait for a free slot, then claim as many jobs as there are slots
+                await self._slots.acquire()
+                free = 1
+                while free < self.concurrency and not self._slots.locked():
+                    await self._slots.acquire()
+                    free += 1
+
+                self._wake.clear()
+                try:
+                    rows = await asyncio.to_thread(db.claim_jobs, self.name, free, JOB_VISIBILITY_TIMEOUT)
+                except Exception as exc:
+                    logger.warning("Claiming jobs failed: %s", exc)
+                    rows = []
+                for _ in range(free - len(rows)):
+                    self._slots.release()
+                for row in rows:
+                    task = asyncio.create_task(self._execute(row))
+                    self._tasks.add(task)
+                    task.add_done_callback(self._tasks.discard)
+
+                if not rows:
+                    # Idle: sleep until NOTIFY, the poll interval or shutdown
+                    waiters = [asyncio.ensure_future(self._wake.wait()), asyncio.ensure_future(stop.wait())]
+                    await asyncio.wait(waiters, timeout=JOB_POLL_INTERVAL, return_when=asyncio.FIRST_COMPLETED)
+                    for w in waiters:
+                        w.cancel()
+        finally:
+            if self._tasks:
+                logger.info("Worker %s draining %d running jobs", self.name, len(self._tasks))
+                await asyncio.gather(*self._tasks, return_exceptions=True)
+            if listener is not None:
+                asyncio.get_running_loop().remove_reader(listener.fileno())
+                listener.close()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "running": len(self._tasks),
+            "concurrency": self.concurrency,
+            "done": self.done,
+            "failed": self.failed,
+            "dead": self.dead,
+        }
@@ -1,19 +1,63 @@
 from __future__ import annotations
-import requests
+import time
+import asyncio
 import logging
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .config import (
+    CACHE_PG_ENABLED,
+    MARKET_FRESH_TTL,
+    MARKET_MAX_AGE,
+    MARKET_COINGECKO_BATCH,
+)
+from .cache import MISSING, LRUCache, PgCache
+from .httpclient import get_json, run_sync
+from .singleflight import SingleFlight
+from .ratelimit import ProviderUnavailable
+from .projects import registry as projects
+from .jobs import submit, BATCH
+from .metrics import PROVIDER_SECONDS
 
 logger = logging.getLogger(__name__)
 
 DEXSCREENER_URL = "https://api.dexscreener.com/latest/dex/tokens/"
 COINGECKO_SIMPLE = "https://api.coingecko.com/api/v3/simple/token_price/{platform}?contract_addresses={contract}&vs_currencies=usd&include_market_cap=true"
 
+# The tokens endpoint takes up to 30 comma-separated addresses
+DEXSCREENER_BATCH = 30
 
-def get_dexscreener_info(contract: str) -> dict | None:
-    """Fetch token info from Dexscreener API"""
+# Project network -> Dexscreener chainId / CoinGecko asset platform
+DEXSCREENER_CHAINS = {"eth": "ethereum", "base": "base", "bsc": "bsc", "sol": "solana", "pumpfun": "solana", "sui": "sui"}
+COINGECKO_PLATFORMS = {
+    "eth": "ethereum",
+    "base": "base",
+    "bsc": "binance-smart-chain",
+    "sol": "solana",
+    "pumpfun": "solana",
+    "sui": "sui",
+}
+
+
+_dexscreener_flights = SingleFlight("dexscreener")
+_coingecko_flights = SingleFlight("coingecko")
+
+
+async def get_dexscreener_info_async(contract: str) -> dict | None:
+    """Fetch token info from Dexscreener API (concurrent calls are coalesced)"""
+    return await _dexscreener_flights.do(contract.lower(), lambda: _fetch_dexscreener(contract))
+
+
+async def get_coingecko_info_async(platform: str, contract: str) -> dict | None:
+    """Fetch token price and market cap from CoinGecko (concurrent calls are coalesced)"""
+    return await _coingecko_flights.do(
+        (platform, contract.lower()), lambda: _fetch_coingecko(platform, contract)
+    )
+
+
+@PROVIDER_SECONDS.timed(chain="market", provider="dexscreener")
+async def _fetch_dexscreener(contract: str) -> dict | None:
     try:
-        r = requests.get(DEXSCREENER_URL + contract, timeout=10)
-        r.raise_for_status()
-        data = r.json()
+        data = await get_json(DEXSCREENER_URL + contract)
         pairs = data.get("pairs") or []
         if not pairs:
             return None
@@ -29,18 +73,18 @@ def get_dexscreener_info(contract: str) -> dict | None:
             "dex": top.get("dexId"),
         }
 
+    except ProviderUnavailable:
+        raise
     except Exception as e:
         logger.warning("Dexscreener fetch failed for %s: %s", contract, e)
         return None
 
 
-def get_coingecko_info(platform: str, contract: str) -> dict | None:
-    """Fetch token price and market cap from CoinGecko"""
+@PROVIDER_SECONDS.timed(chain="market", provider="coingecko")
+async def _fetch_coingecko(platform: str, contract: str) -> dict | None:
     try:
         url = COINGECKO_SIMPLE.format(platform=platform, contract=contract)
-        r = requests.get(url, timeout=10)
-        r.raise_for_status()
-        data = r.json()
+        data = await get_json(url)
         obj = data.get(contract.lower())
         if not obj:
             return None
@@ -50,6 +94,252 @@ def get_coingecko_info(platform: str, contract: str) -> dict | None:
             "marketCap": obj.get("usd_market_cap"),
         }
 
+    except ProviderUnavailable:
+        raise
     except Exception as e:
         logger.warning("CoinGecko fetch failed for %s on %s: %s", contract, platform, e)
         return None
+
+
+# ===========================
+# Batched fetches
+# ===========================
+
+def _norm(network: str, contract: str) -> str:
+    return contract.lower() if network in ("eth", "base", "bsc") else contract
+
+
+def _chunks(items: List[str], size: int) -> Iterable[List[str]]:
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _float(value) -> Optional[float]:
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+@PROVIDER_SECONDS.timed(chain="market", provider="dexscreener")
+async def fetch_dexscreener_batch(tokens: List[Tuple[str, str]]) -> Dict[Tuple[str, str], dict]:
+    """
+    Quotes for (network, contract) pairs, 30 addresses per request. Each
+    token gets its most liquid pair on the project's chain.
+    """
+    # Match response addresses case-insensitively, but query Solana / Sui
+    # addresses exactly as configured
+    by_addr: Dict[str, List[Tuple[str, str]]] = {}
+    for network, contract in tokens:
+        by_addr.setdefault(contract.lower(), []).append((network, contract))
+
+    best: Dict[Tuple[str, str], dict] = {}
+    for chunk in _chunks([entries[0][1] for entries in by_addr.values()], DEXSCREENER_BATCH):
+        data = await get_json(DEXSCREENER_URL + ",".join(chunk))
+        for pair in data.get("pairs") or []:
+            base = pair.get("baseToken") or {}
+            for network, contract in by_addr.get((base.get("address") or "").lower(), []):
+                if pair.get("chainId") != DEXSCREENER_CHAINS.get(network):
+                    continue
+                liquidity = _float((pair.get("liquidity") or {}).get("usd")) or 0.0
+                key = (network, _norm(network, contract))
+                if key in best and best[key]["liquidity"] >= liquidity:
+                    continue
+                best[key] = {
+                    "token": base.get("name"),
+                    "symbol": base.get("symbol"),
+                    "priceUsd": _float(pair.get("priceUsd")),
+                    "fdv": _float(pair.get("fdv")),
+                    "marketCap": _float(pair.get("marketCap")),
+                    "liquidity": liquidity,
+                    "dex": pair.get("dexId"),
+                    "source": "dexscreener",
+                }
+    return best
+
+
+@PROVIDER_SECONDS.timed(chain="market", provider="coingecko")
+async def fetch_coingecko_batch(tokens: List[Tuple[str, str]]) -> Dict[Tuple[str, str], dict]:
+    """Price and market cap for (network, contract) pairs, grouped per platform."""
+    by_platform: Dict[str, Dict[str, Tuple[str, str]]] = {}
+    for network, contract in tokens:
+        platform = COINGECKO_PLATFORMS.get(network)
+        if platform:
+            by_platform.setdefault(platform, {})[contract.lower()] = (network, contract)
+
+    out: Dict[Tuple[str, str], dict] = {}
+    for platform, wanted in by_platform.items():
+        for chunk in _chunks([contract for _, contract in wanted.values()], MARKET_COINGECKO_BATCH):
+            data = await get_json(COINGECKO_SIMPLE.format(platform=platform, contract=",".join(chunk)))
+            for addr, obj in (data or {}).items():
+                if addr.lower() not in wanted or not obj:
+                    continue
+                network, contract = wanted[addr.lower()]
+                out[(network, _norm(network, contract))] = {
+                    "priceUsd": _float(obj.get("usd")),
+                    "marketCap": _float(obj.get("usd_market_cap")),
+                    "source": "coingecko",
+                }
+    return out
+
+
+# ===========================
+# Market data service
+# ===========================
+
+# Quotes carry their wall-clock `fetched_at` so entries written by a worker
+# process (through kv_cache) age the same way everywhere. Entries older than
+# MARKET_FRESH_TTL are still served, up to MARKET_MAX_AGE, while one
+# background refresh fetches new ones.
+_quotes = LRUCache("market", max_entries=10_000)
+_pg_cache = PgCache(enabled=CACHE_PG_ENABLED)
+_pending: set = set()
+_revalidator: Optional[asyncio.Task] = None
+_revalidations = 0
+
+
+def _key(network: str, contract: str) -> str:
+    return f"market:{network}:{_norm(network, contract)}"
+
+
+def _tokens(projects: Iterable[Dict]) -> List[Tuple[str, str]]:
+    seen = {}
+    for p in projects:
+        if p.get("contract_address") and p.get("network") in DEXSCREENER_CHAINS:
+            seen[(p["network"], _norm(p["network"], p["contract_address"]))] = None
+    return list(seen)
+
+
+async def refresh_quotes(projects: Iterable[Dict]) -> int:
+    """
+    Fetch quotes for every project's token in the fewest requests: Dexscreener
+    first, CoinGecko only for tokens Dexscreener has no pair for. Stores them
+    in memory and kv_cache; returns how many tokens got a quote.
+    """
+    tokens = _tokens(projects)
+    if not tokens:
+        return 0
+    quotes: Dict[Tuple[str, str], dict] = {}
+    try:
+        quotes.update(await fetch_dexscreener_batch(tokens))
+    except Exception as e:
+        logger.warning("Dexscreener batch failed: %s", e)
+    missing = [t for t in tokens if t not in quotes]
+    if missing:
+        try:
+            quotes.update(await fetch_coingecko_batch(missing))
+        except Exception as e:
+            logger.warning("CoinGecko batch failed: %s", e)
+
+    now = time.time()
+    for (network, contract), q in quotes.items():
+        q["fetched_at"] = now
+        key = _key(network, contract)
+        _quotes.set(key, q, MARKET_MAX_AGE)
+        await _pg_cache.set(key, q, MARKET_MAX_AGE)
+    return len(quotes)
+
+
+async def _revalidate(projects: List[Dict]):
+    """Refill stale quotes from kv_cache (a worker may have refreshed them), else from the APIs."""
+    stale = []
+    for p in projects:
+        key = _key(p["network"], p["contract_address"])
+        q = await _pg_cache.get(key)
+        if q is not MISSING and time.time() - q.get("fetched_at", 0) < MARKET_FRESH_TTL:
+            _quotes.set(key, q, MARKET_MAX_AGE - (time.time() - q["fetched_at"]))
+        else:
+            stale.append(p)
+    if stale:
+        await refresh_quotes(stale)
+
+
+async def _drain_pending():
+    """Revalidate queued projects in batches until none are left."""
+    global _revalidations
+    await asyncio.sleep(0)  # let other readers in this tick queue their projects
+    while _pending:
+        batch = [p for p in (projects.get(pid) for pid in list(_pending)) if p and p.get("contract_address")]
+        _pending.clear()
+        _revalidations += 1
+        try:
+            await _revalidate(batch)
+        except Exception as e:
+            logger.warning("Market data revalidation failed: %s", e)
+
+
+def _schedule_revalidate(project: Dict):
+    global _revalidator
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return  # sync caller: the background refresh job keeps the cache warm
+    _pending.add(project["id"])
+    if _revalidator is None or _revalidator.done():
+        _revalidator = loop.create_task(_drain_pending())
+
+
+def quote(project: Dict) -> Optional[dict]:
+    """
+    Cached quote for a project's token without waiting on the network: fresh
+    or stale (a background revalidation is started) or None when nothing is
+    cached yet.
+    """
+    if not project or not project.get("contract_address") or project.get("network") not in DEXSCREENER_CHAINS:
+        return None
+    q = _quotes.get(_key(project["network"], project["contract_address"]))
+    if q is MISSING:
+        _schedule_revalidate(project)
+        return None
+    if time.time() - q.get("fetched_at", 0) > MARKET_FRESH_TTL:
+        _schedule_revalidate(project)
+    return q
+
+
+def _usd(value: Optional[float]) -> str:
+    if value is None:
+        return "–"
+    for limit, suffix in ((1e9, "B"), (1e6, "M"), (1e3, "K")):
+        if abs(value) >= limit:
+            return f"${value / limit:.2f}{suffix}"
+    if abs(value) >= 1:
+        return f"${value:,.2f}"
+    return f"${value:.6g}"
+
+
+def quote_lines(project: Dict) -> str:
+    """HTML lines for project views and pin posts ('' when no quote is cached)."""
+    q = quote(project)
+    if not q or q.get("priceUsd") is None:
+        return ""
+    lines = [f"💲 <b>Price:</b> {_usd(q['priceUsd'])}"]
+    if q.get("fdv") is not None:
+        lines.append(f"🏦 <b>FDV:</b> {_usd(q['fdv'])}")
+    elif q.get("marketCap") is not None:
+        lines.append(f"🏦 <b>Market cap:</b> {_usd(q['marketCap'])}")
+    if q.get("liquidity"):
+        lines.append(f"💧 <b>Liquidity:</b> {_usd(q['liquidity'])}")
+    return "\n".join(lines) + "\n"
+
+
+def market_stats() -> Dict[str, int]:
+    return {"quotes": _quotes.stats()["entries"], "revalidations": _revalidations, "pending": len(_pending)}
+
+
+async def refresh_market(context):
+    """Job-queue task: refresh every project's quote on the job queue (batch priority)."""
+    await submit("market_refresh", {}, priority=BATCH, bot=context.bot)
+
+
+# ===========================
+# Sync wrappers
+# ===========================
+
+def get_dexscreener_info(contract: str) -> dict | None:
+    """Blocking wrapper around get_dexscreener_info_async."""
+    return run_sync(get_dexscreener_info_async(contract))
+
+
+def get_coingecko_info(platform: str, contract: str) -> dict | None:
+    """Blocking wrapper around get_coingecko_info_async."""
+    return run_sync(get_coingecko_info_async(platform, contract))
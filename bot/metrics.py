@@ -0,0 +1,270 @@
+from __future__ import annotations
+
+import time
+import asyncio
+import inspect
+import logging
+import functools
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from . import profiling
+
+logger = logging.getLogger(__name__)
+
+# Latency buckets (seconds) shared by every histogram
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _fmt_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    body = ",".join('{}="{}"'.format(k, v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")) for k, v in pairs)
+    return "{" + body + "}"
+
+
+class Counter:
+    """Monotonic counter with labels."""
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self._values: Dict[LabelKey, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: Any):
+        key = _key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in self._values.items():
+                lines.append(f"{self.name}{_fmt_labels(key)} {value:g}")
+        return lines
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram with labels; time() / timed() add an `outcome`
+    label and, with `span` set (a format string over the labels), also record
+    a span on the current slow-update trace.
+    """
+
+    def __init__(self, name: str, help: str, buckets: Iterable[float] = BUCKETS, span: Optional[str] = None):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self.span = span
+        # key -> [bucket counts..., sum, count]
+        self._values: Dict[LabelKey, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: Any):
+        key = _key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [0.0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[i] += 1
+            entry[-2] += value
+            entry[-1] += 1
+
+    @contextmanager
+    def time(self, **labels: Any):
+        started = time.perf_counter()
+        outcome = "ok"
+        try:
+            yield labels
+        except asyncio.CancelledError:
+            outcome = "cancelled"
+            raise
+        except Exception:
+            outcome = "error"
+            raise
+        finally:
+            ended = time.perf_counter()
+            labels.setdefault("outcome", outcome)
+            self.observe(ended - started, **labels)
+            trace = profiling.current() if self.span else None
+            if trace is not None:
+                trace.add(self.span.format(**labels), started, ended, str(labels["outcome"]))
+
+    def timed(self, **labels: Any) -> Callable:
+        """Decorator timing every call of a sync or async function."""
+        def wrap(fn: Callable) -> Callable:
+            if asyncio.iscoroutinefunction(fn):
+                @functools.wraps(fn)
+                async def run_async(*args, **kwargs):
+                    with self.time(**labels):
+                        return await fn(*args, **kwargs)
+                return run_async
+
+            @functools.wraps(fn)
+            def run(*args, **kwargs):
+                with self.time(**labels):
+                    return fn(*args, **kwargs)
+            return run
+        return wrap
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, entry in self._values.items():
+                for bound, count in zip(self.buckets, entry):
+                    lines.append(f"{self.name}_bucket{_fmt_labels(key, ('le', f'{bound:g}'))} {count:g}")
+                lines.append(f"{self.name}_bucket{_fmt_labels(key, ('le', '+Inf'))} {entry[-1]:g}")
+                lines.append(f"{self.name}_sum{_fmt_labels(key)} {entry[-2]:.6f}")
+                lines.append(f"{self.name}_count{_fmt_labels(key)} {entry[-1]:g}")
+        return lines
+
+
+# ===========================
+# Registry
+# ===========================
+
+_metrics: Dict[str, Any] = {}
+# name -> callable returning {label dict as tuple: value} for gauges read at scrape time
+_gauges: Dict[str, Tuple[str, Callable[[], Dict[LabelKey, float]]]] = {}
+
+
+def counter(name: str, help: str) -> Counter:
+    return _metrics.setdefault(name, Counter(name, help))
+
+
+def histogram(name: str, help: str, span: Optional[str] = None) -> Histogram:
+    return _metrics.setdefault(name, Histogram(name, help, span=span))
+
+
+def gauge(name: str, help: str, collect: Callable[[], Dict[str, float]], label: str = "key"):
+    """
+    Register a gauge family read at scrape time. `collect()` returns a flat
+    {label value: number} dict (e.g. one of the existing *_stats() helpers).
+    """
+    def read() -> Dict[LabelKey, float]:
+        return {((label, str(k)),): v for k, v in collect().items() if isinstance(v, (int, float))}
+    _gauges[name] = (help, read)
+
+
+def render() -> str:
+    """Every metric in Prometheus text exposition format."""
+    lines: List[str] = []
+    for metric in list(_metrics.values()):
+        lines.extend(metric.render())
+    for name, (help, read) in list(_gauges.items()):
+        try:
+            values = read()
+        except Exception as exc:
+            logger.debug("Gauge %s unavailable: %s", name, exc)
+            continue
+        lines.append(f"# HELP {name} {help}")
+        lines.append(f"# TYPE {name} gauge")
+        for key, value in values.items():
+            lines.append(f"{name}{_fmt_labels(key)} {float(value):g}")
+    return "\n".join(lines) + "\n"
+
+
+def flatten(stats: Dict[str, Any], prefix: str = "") -> Dict[str, float]:
+    """{"queue": {"queued": 3}} -> {"queue_queued": 3} for gauge()."""
+    flat: Dict[str, float] = {}
+    for k, v in stats.items():
+        name = f"{prefix}{k}"
+        if isinstance(v, dict):
+            flat.update(flatten(v, f"{name}_"))
+        elif isinstance(v, (int, float)) and not isinstance(v, bool):
+            flat[name] = v
+    return flat
+
+
+# ===========================
+# Hot-path metrics
+# ===========================
+
+DB_SECONDS = histogram("holderxr_db_query_seconds", "Database call latency by function and backend",
+                       span="db.{function}")
+PROVIDER_SECONDS = histogram("holderxr_provider_request_seconds", "Balance / market provider call latency",
+                             span="provider.{chain}.{provider}")
+HTTP_SECONDS = histogram("holderxr_http_request_seconds", "Outbound HTTP request latency by host")
+HANDLER_SECONDS = histogram("holderxr_handler_seconds", "Telegram handler latency by handler and step",
+                            span="handler.{handler}")
+TELEGRAM_SECONDS = histogram("holderxr_telegram_request_seconds", "Bot API call latency by method",
+                             span="telegram.{method}")
+UPDATE_SECONDS = histogram("holderxr_update_seconds", "End-to-end processing time of one update")
+UPDATES = counter("holderxr_updates_total", "Updates processed by type")
+
+
+def instrument_module(namespace: Dict[str, Any], backend: str, exclude: Iterable[str] = ()):
+    """
+    Wrap every public function defined in a module (pass its globals()) with
+    holderxr_db_query_seconds{function, backend, outcome}. Generators and
+    `exclude` are left alone.
+    """
+    module = namespace["__name__"]
+    for name, fn in list(namespace.items()):
+        if (
+            name.startswith("_")
+            or name in exclude
+            or not inspect.isfunction(fn)
+            or fn.__module__ != module
+            or inspect.isgeneratorfunction(fn)
+        ):
+            continue
+        namespace[name] = DB_SECONDS.timed(function=name, backend=backend)(fn)
+
+
+# ===========================
+# Update timing (PTB)
+# ===========================
+
+def _update_type(update: object) -> str:
+    for attr in ("callback_query", "message", "edited_message", "channel_post", "my_chat_member", "chat_member"):
+        if getattr(update, attr, None) is not None:
+            return attr
+    return "other"
+
+
+async def _update_started(update: object, context):
+    context.update_started = time.perf_counter()
+
+
+async def _update_finished(update: object, context):
+    started = getattr(context, "update_started", None)
+    kind = _update_type(update)
+    UPDATES.inc(type=kind)
+    if started is not None:
+        UPDATE_SECONDS.observe(time.perf_counter() - started, type=kind)
+
+
+def install(app) -> None:
+    """Time every update end to end: a TypeHandler runs first and another one last."""
+    from telegram import Update
+    from telegram.ext import TypeHandler
+
+    app.add_handler(TypeHandler(Update, _update_started), group=-1000)
+    app.add_handler(TypeHandler(Update, _update_finished), group=1000)
+
+
+def instrumented_request(**kwargs):
+    """
+    HTTPXRequest for the Application's bot that times every Bot API call in
+    holderxr_telegram_request_seconds{method, outcome} (and the update trace).
+    """
+    from telegram.request import HTTPXRequest
+
+    class InstrumentedRequest(HTTPXRequest):
+        async def do_request(self, url: str, method: str, *args, **kw):
+            with TELEGRAM_SECONDS.time(method=url.rsplit("/", 1)[-1]):
+                return await super().do_request(url, method, *args, **kw)
+
+    return InstrumentedRequest(**kwargs)
@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+from typing import List, Optional, Sequence, Tuple
+
+# Multicall3 `aggregate3` ABI helpers.
+# Multicall3 is deployed at the same address on Ethereum, Base and BSC:
+# https://www.multicall3.com/deployments
+MULTICALL3_ADDRESS = "0xcA11bde05977b3631167028862bE2a173976CA11"
+
+# aggregate3((address,bool,bytes)[]) → 0x82ad56cb
+SEL_AGGREGATE3 = "0x82ad56cb"
+
+# Chunking budgets. Providers cap eth_call gas (Alchemy: 550M, public BSC
+# nodes: 50M) and request bodies; stay well below both.
+MAX_CALLDATA_BYTES = 96_000
+MAX_GAS = 30_000_000
+GAS_PER_BALANCE_OF = 40_000
+
+Call3 = Tuple[str, bool, bytes]  # (target, allowFailure, callData)
+
+
+def _word(n: int) -> bytes:
+    return n.to_bytes(32, "big")
+
+
+def _padded(data: bytes) -> bytes:
+    return data + b"\x00" * (-len(data) % 32)
+
+
+def _encode_call3(call: Call3) -> bytes:
+    target, allow_failure, data = call
+    return (
+        _word(int(target, 16))
+        + _word(1 if allow_failure else 0)
+        + _word(0x60)             # offset of `bytes` inside the tuple
+        + _word(len(data))
+        + _padded(data)
+    )
+
+
+def encoded_size(call: Call3) -> int:
+    """Bytes one Call3 adds to aggregate3 calldata (tuple + its head offset)."""
+    return 32 + 4 * 32 + len(_padded(call[2]))
+
+
+def encode_aggregate3(calls: Sequence[Call3]) -> str:
+    """ABI-encode aggregate3(calls) calldata as a 0x-prefixed hex string."""
+    tuples = [_encode_call3(c) for c in calls]
+    offsets, pos = [], 32 * len(tuples)
+    for t in tuples:
+        offsets.append(_word(pos))
+        pos += len(t)
+    body = _word(0x20) + _word(len(tuples)) + b"".join(offsets) + b"".join(tuples)
+    return SEL_AGGREGATE3 + body.hex()
+
+
+def decode_aggregate3(result: str) -> List[Tuple[bool, bytes]]:
+    """Decode aggregate3's `(bool success, bytes returnData)[]` return value."""
+    raw = bytes.fromhex(result[2:] if result.startswith("0x") else result)
+
+    def word(at: int) -> int:
+        return int.from_bytes(raw[at:at + 32], "big")
+
+    array_at = word(0)
+    count = word(array_at)
+    heads = array_at + 32
+    out: List[Tuple[bool, bytes]] = []
+    for i in range(count):
+        tuple_at = heads + word(heads + 32 * i)
+        success = word(tuple_at) != 0
+        data_at = tuple_at + word(tuple_at + 32)
+        length = word(data_at)
+        out.append((success, raw[data_at + 32:data_at + 32 + length]))
+    return out
+
+
+def chunk_calls(
+    calls: Sequence[Call3],
+    max_calldata: int = MAX_CALLDATA_BYTES,
+    max_gas: int = MAX_GAS,
+    gas_per_call: int = GAS_PER_BALANCE_OF,
+) -> List[List[Call3]]:
+    """Split calls into aggregate3 batches that respect calldata and gas budgets."""
+    chunks: List[List[Call3]] = []
+    current: List[Call3] = []
+    size = 4 + 64  # selector + array offset + length
+    gas = 0
+    for call in calls:
+        add = encoded_size(call)
+        if current and (size + add > max_calldata or gas + gas_per_call > max_gas):
+            chunks.append(current)
+            current, size, gas = [], 4 + 64, 0
+        current.append(call)
+        size += add
+        gas += gas_per_call
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def decode_uint256(data: bytes) -> Optional[int]:
+    return int.from_bytes(data[:32], "big") if len(data) >= 32 else None
@@ -0,0 +1,194 @@
+from __future__ import annotations
+
+import time
+import logging
+import threading
+from collections import deque
+from typing import Dict, List, Tuple
+
+import psycopg2
+from psycopg2.pool import PoolError
+
+logger = logging.getLogger(__name__)
+
+
+class PgPool:
+    """
+    Thread-safe psycopg2 connection pool.
+
+    - keeps between `minconn` and `maxconn` connections open
+    - callers block up to `timeout` seconds when every connection is in use
+    - connections older than `max_age` seconds are recycled on checkout/checkin
+    - connections idle longer than `check_idle` seconds are pinged before reuse
+    """
+
+    def __init__(
+        self,
+        dsn: str,
+        minconn: int = 1,
+        maxconn: int = 10,
+        timeout: float = 10.0,
+        max_age: float = 1800.0,
+        check_idle: float = 30.0,
+    ):
+        if minconn < 0 or maxconn < 1 or minconn > maxconn:
+            raise ValueError("invalid pool size: min=%s max=%s" % (minconn, maxconn))
+
+        self.dsn = dsn
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.max_age = max_age
+        self.check_idle = check_idle
+
+        # Re-entrant, so helpers can take it whether or not the caller holds it
+        self._cond = threading.Condition(threading.RLock())
+        self._idle: List[Tuple[object, float, float]] = []  # (con, created_at, returned_at)
+        self._born: Dict[int, float] = {}                   # id(con) -> created_at
+        self._in_use = 0
+        self._waiting = 0
+        self._closed = False
+
+        self._latencies = deque(maxlen=1024)
+        self._counters = {
+            "checkouts": 0,
+            "timeouts": 0,
+            "created": 0,
+            "recycled": 0,
+            "health_check_failures": 0,
+        }
+
+        for _ in range(minconn):
+            con = self._connect()
+            self._idle.append((con, self._born[id(con)], time.monotonic()))
+
+    # ===== Internals =====
+    def _connect(self):
+        con = psycopg2.connect(self.dsn)
+        with self._cond:
+            self._born[id(con)] = time.monotonic()
+            self._counters["created"] += 1
+        return con
+
+    def _discard(self, con):
+        with self._cond:
+            self._born.pop(id(con), None)
+        try:
+            con.close()
+        except Exception:
+            pass
+
+    def _healthy(self, con, returned_at: float) -> bool:
+        if con.closed:
+            return False
+        if time.monotonic() - returned_at < self.check_idle:
+            return True
+        try:
+            with con.cursor() as cur:
+                cur.execute("SELECT 1")
+            con.rollback()
+            return True
+        except Exception:
+            with self._cond:
+                self._counters["health_check_failures"] += 1
+            return False
+
+    # ===== Public API =====
+    def getconn(self):
+        """Check out a connection, waiting up to `timeout` seconds for a free slot."""
+        started = time.monotonic()
+        deadline = started + self.timeout
+
+        while True:
+            with self._cond:
+                if self._closed:
+                    raise PoolError("connection pool is closed")
+
+                candidate = None
+                if self._idle:
+                    candidate = self._idle.pop()
+                    self._in_use += 1
+                elif self._in_use < self.maxconn:
+                    self._in_use += 1
+                else:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._counters["timeouts"] += 1
+                        raise PoolError("timed out waiting for a database connection")
+                    self._waiting += 1
+                    try:
+                        self._cond.wait(remaining)
+                    finally:
+                        self._waiting -= 1
+                    continue
+
+            # Network work happens outside the lock
+            try:
+                if candidate is not None:
+                    con, created_at, returned_at = candidate
+                    if time.monotonic() - created_at > self.max_age:
+                        with self._cond:
+                            self._counters["recycled"] += 1
+                        self._discard(con)
+                        con = self._connect()
+                    elif not self._healthy(con, returned_at):
+                        self._discard(con)
+                        con = self._connect()
+                else:
+                    con = self._connect()
+            except Exception:
+                with self._cond:
+                    self._in_use -= 1
+                    self._cond.notify()
+                raise
+
+            with self._cond:
+                self._counters["checkouts"] += 1
+                self._latencies.append(time.monotonic() - started)
+            return con
+
+    def putconn(self, con, discard: bool = False):
+        """Return a connection to the pool; broken or stale connections are closed."""
+        with self._cond:
+            created_at = self._born.get(id(con), 0.0)
+        if not discard and not con.closed:
+            try:
+                if con.status != psycopg2.extensions.STATUS_READY:
+                    con.rollback()
+            except Exception:
+                discard = True
+
+        with self._cond:
+            self._in_use -= 1
+            if self._closed or discard or con.closed:
+                self._discard(con)
+            elif time.monotonic() - created_at > self.max_age:
+                self._counters["recycled"] += 1
+                self._discard(con)
+            else:
+                self._idle.append((con, created_at, time.monotonic()))
+            self._cond.notify()
+
+    def closeall(self):
+        with self._cond:
+            self._closed = True
+            for con, _, _ in self._idle:
+                self._discard(con)
+            self._idle.clear()
+            self._cond.notify_all()
+
+    def stats(self) -> Dict[str, float]:
+        """Snapshot of pool gauges, counters and checkout latency (seconds)."""
+        with self._cond:
+            lat = sorted(self._latencies)
+            out = dict(self._counters)
+            out.update(
+                size=self._in_use + len(self._idle),
+                idle=len(self._idle),
+                in_use=self._in_use,
+                waiting=self._waiting,
+                checkout_p50=lat[len(lat) // 2] if lat else 0.0,
+                checkout_p95=lat[int(len(lat) * 0.95)] if lat else 0.0,
+                checkout_max=lat[-1] if lat else 0.0,
+            )
+            return out
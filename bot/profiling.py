@@ -0,0 +1,254 @@
+from __future__ import annotations
+
+import os
+import sys
+import json
+import time
+import logging
+import threading
+import contextvars
+import logging.handlers
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+from .config import (
+    TRACE_SLOW_UPDATE_MS,
+    TRACE_FILE,
+    TRACE_FILE_MAX_BYTES,
+    TRACE_FILE_BACKUPS,
+    PROFILER_INTERVAL,
+)
+
+logger = logging.getLogger(__name__)
+
+# ===========================
+# Slow-update traces
+# ===========================
+
+# Spans beyond this are counted but not kept (runaway loops, big sweeps)
+MAX_SPANS = 200
+
+
+class Trace:
+    """Spans recorded while one update is processed (shared by its child tasks and threads)."""
+
+    __slots__ = ("started", "spans", "dropped")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans: List[Tuple[str, float, float, str]] = []
+        self.dropped = 0
+
+    def add(self, name: str, started: float, ended: float, outcome: str = "ok"):
+        if len(self.spans) >= MAX_SPANS:
+            self.dropped += 1
+            return
+        self.spans.append((name, started - self.started, ended - started, outcome))
+
+
+_current: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar("holderxr_trace", default=None)
+
+
+def current() -> Optional[Trace]:
+    return _current.get()
+
+
+@contextmanager
+def span(name: str):
+    """Record a span on the current update's trace (no-op when none is active)."""
+    trace = _current.get()
+    if trace is None:
+        yield
+        return
+    started = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield
+    except BaseException:
+        outcome = "error"
+        raise
+    finally:
+        trace.add(name, started, time.perf_counter(), outcome)
+
+
+_trace_log: Optional[logging.Logger] = None
+slow_updates = 0
+
+
+def _writer() -> logging.Logger:
+    """Logger writing bare JSON lines to the rotating trace file."""
+    global _trace_log
+    if _trace_log is None:
+        os.makedirs(os.path.dirname(os.path.abspath(TRACE_FILE)), exist_ok=True)
+        handler = logging.handlers.RotatingFileHandler(
+            TRACE_FILE, maxBytes=TRACE_FILE_MAX_BYTES, backupCount=TRACE_FILE_BACKUPS, encoding="utf-8"
+        )
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        _trace_log = logging.getLogger("holderxr.slow_updates")
+        _trace_log.propagate = False
+        _trace_log.setLevel(logging.INFO)
+        _trace_log.addHandler(handler)
+    return _trace_log
+
+
+def _describe(update: Any) -> Dict[str, Any]:
+    info: Dict[str, Any] = {"update_id": getattr(update, "update_id", None)}
+    user = getattr(update, "effective_user", None)
+    if user:
+        info["user"] = user.id
+    query = getattr(update, "callback_query", None)
+    if query is not None:
+        info["button"] = (query.data or "").split(":")[0]
+    elif getattr(update, "message", None) is not None:
+        text = update.message.text or ""
+        info["command"] = text.split()[0] if text.startswith("/") else None
+    return info
+
+
+async def _trace_started(update: object, context):
+    _current.set(Trace())
+
+
+async def _trace_finished(update: object, context):
+    global slow_updates
+    trace = _current.get()
+    _current.set(None)
+    if trace is None:
+        return
+    total_ms = (time.perf_counter() - trace.started) * 1000
+    if total_ms < TRACE_SLOW_UPDATE_MS:
+        return
+    slow_updates += 1
+    record = {
+        "ts": round(time.time(), 3),
+        **_describe(update),
+        "ms": round(total_ms, 1),
+        # [name, start offset ms, duration ms, outcome]
+        "spans": [[name, round(start * 1000, 1), round(dur * 1000, 1), outcome]
+                  for name, start, dur, outcome in trace.spans],
+    }
+    if trace.dropped:
+        record["dropped_spans"] = trace.dropped
+    try:
+        _writer().info(json.dumps(record, separators=(",", ":"), ensure_ascii=False))
+    except OSError as exc:
+        logger.warning("Could not write slow-update trace: %s", exc)
+
+
+def install(app) -> None:
+    """Trace updates slower than TRACE_SLOW_UPDATE_MS into TRACE_FILE (no-op when 0)."""
+    if TRACE_SLOW_UPDATE_MS <= 0:
+        return
+    from telegram import Update
+    from telegram.ext import TypeHandler
+
+    app.add_handler(TypeHandler(Update, _trace_started), group=-999)
+    app.add_handler(TypeHandler(Update, _trace_finished), group=999)
+    logger.info("Tracing updates slower than %.0f ms to %s", TRACE_SLOW_UPDATE_MS, TRACE_FILE)
+
+
+# ===========================
+# Stack sampler
+# ===========================
+
+# Innermost frames in these files mean the thread is waiting, not working
+_IDLE_FILES = ("selectors.py", "threading.py", "queue.py", "thread.py")
+
+
+class StackSampler:
+    """
+    Statistical profiler: a thread snapshots every other thread's stack each
+    `interval` seconds and counts collapsed stacks ("thread;file:func;...").
+    Waiting threads (event loop in select, idle executor workers) are only
+    counted as idle.
+    """
+
+    def __init__(self, interval: float = PROFILER_INTERVAL):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.idle = 0
+        self.elapsed = 0.0
+
+    def _collapse(self, frame) -> Optional[List[str]]:
+        if frame.f_code.co_filename.endswith(_IDLE_FILES):
+            return None
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+            frame = frame.f_back
+        names.reverse()
+        return names
+
+    def run(self, seconds: float):
+        """Sample for `seconds` (blocks; run it in a thread)."""
+        me = threading.get_ident()
+        names = {t.ident: t.name for t in threading.enumerate()}
+        started = time.perf_counter()
+        deadline = started + seconds
+        while time.perf_counter() < deadline:
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                self.samples += 1
+                stack = self._collapse(frame)
+                if stack is None:
+                    self.idle += 1
+                    continue
+                thread = names.get(ident)
+                if thread is None:
+                    names = {t.ident: t.name for t in threading.enumerate()}
+                    thread = names.get(ident, str(ident))
+                self.stacks[";".join([thread] + stack)] += 1
+            time.sleep(self.interval)
+        self.elapsed = time.perf_counter() - started
+
+    def top(self, limit: int = 15) -> Tuple[List[Tuple[str, int]], List[Tuple[str, int]]]:
+        """(functions by self samples, functions by inclusive samples), line numbers dropped."""
+        own: Counter = Counter()
+        inclusive: Counter = Counter()
+        for stack, count in self.stacks.items():
+            frames = [f.rsplit(":", 1)[0] for f in stack.split(";")[1:]]
+            own[frames[-1]] += count
+            for name in set(frames):
+                inclusive[name] += count
+        return own.most_common(limit), inclusive.most_common(limit)
+
+    def collapsed(self) -> str:
+        """Brendan Gregg collapsed-stack format (flamegraph.pl, speedscope)."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def summary(self, limit: int = 12) -> str:
+        busy = self.samples - self.idle
+        own, inclusive = self.top(limit)
+        lines = [
+            f"🔬 <b>Profile</b>: {self.elapsed:.0f}s, {self.samples} thread samples, "
+            f"{busy / max(self.samples, 1):.0%} busy",
+            "",
+            "<b>Self time</b>",
+        ]
+        lines += [f"{count / max(busy, 1):6.1%}  <code>{name}</code>" for name, count in own]
+        lines += ["", "<b>Inclusive</b>"]
+        lines += [f"{count / max(busy, 1):6.1%}  <code>{name}</code>" for name, count in inclusive]
+        return "\n".join(lines)
+
+
+_sampling = threading.Lock()
+
+
+def sample(seconds: float) -> StackSampler:
+    """Run the stack sampler for `seconds`; raises RuntimeError if one is already running."""
+    if not _sampling.acquire(blocking=False):
+        raise RuntimeError("a profile is already running")
+    try:
+        sampler = StackSampler()
+        sampler.run(seconds)
+        return sampler
+    finally:
+        _sampling.release()
+
+
+def profiling_stats() -> Dict[str, Any]:
+    return {"slow_updates": slow_updates, "sampling": _sampling.locked()}
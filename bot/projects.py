@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import time
+import select
+import logging
+import threading
+from typing import Dict, List, Optional
+
+from . import db, adb
+
+logger = logging.getLogger(__name__)
+
+
+def _channel_key(chat_id) -> str:
+    text = str(chat_id or "").strip()
+    return text.lower() if text.startswith("@") else text
+
+
+class _Snapshot:
+    """One consistent generation of the lookup maps, swapped in as a whole."""
+
+    __slots__ = ("ordered", "by_id", "by_channel", "by_contract", "latest")
+
+    def __init__(self, rows: List[Dict]):
+        self.ordered = rows
+        self.by_id = {p["id"]: p for p in rows}
+        self.by_channel = {_channel_key(p["channel_chat_id"]): p for p in rows if p.get("channel_chat_id")}
+        self.by_contract = {(p["network"], p["contract_address"].lower()): p for p in rows}
+        self.latest = self.by_id[max(self.by_id)] if self.by_id else None
+
+
+class ProjectRegistry:
+    """
+    In-memory project table with O(1) lookups by id, by channel chat id and
+    by (network, contract). Local writes reload through the async DB layer;
+    `projects_changed` notifications from other replicas are reloaded on
+    the listener thread. Lookups never query the database except for the
+    very first load of a process that has not loaded yet.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snap: Optional[_Snapshot] = None
+        self.reloads = 0
+        self._listener: Optional[threading.Thread] = None
+
+    def _current(self) -> _Snapshot:
+        snap = self._snap
+        if snap is not None:
+            return snap
+        with self._lock:
+            if self._snap is None:
+                self._load([dict(r) for r in db.get_all_projects()])
+            return self._snap
+
+    def _load(self, rows: List[Dict]):
+        self._snap = _Snapshot(rows)
+        self.reloads += 1
+
+    def reload_blocking(self):
+        """Reload with the blocking DB layer (listener thread, scripts)."""
+        rows = [dict(r) for r in db.get_all_projects()]
+        with self._lock:
+            self._load(rows)
+
+    async def reload(self):
+        """Reload through the async DB layer, so the event loop is never blocked."""
+        rows = [dict(r) for r in await adb.get_all_projects()]
+        with self._lock:
+            self._load(rows)
+
+    # ===== Lookups =====
+    def get(self, project_id: int) -> Optional[Dict]:
+        return self._current().by_id.get(project_id)
+
+    def by_channel(self, chat_id) -> Optional[Dict]:
+        return self._current().by_channel.get(_channel_key(chat_id))
+
+    def by_contract(self, network: str, contract: str) -> Optional[Dict]:
+        return self._current().by_contract.get(((network or "").lower(), (contract or "").lower()))
+
+    def latest(self) -> Optional[Dict]:
+        """The most recently created project (highest id)."""
+        return self._current().latest
+
+    def all(self) -> List[Dict]:
+        """All projects, newest first."""
+        return list(self._current().ordered)
+
+    # ===== Cross-replica invalidation =====
+    def start_listener(self):
+        """Reload on NOTIFY projects_changed (sent by every project write)."""
+        if self._listener is None:
+            self._listener = threading.Thread(target=self._listen, name="projects-listener", daemon=True)
+            self._listener.start()
+
+    def _listen(self):
+        backoff = 1.0
+        while True:
+            try:
+                con = db.open_listener(db.PROJECTS_CHANNEL)
+            except Exception as exc:
+                logger.warning("Project listener connect failed: %s", exc)
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 60.0)
+                continue
+            backoff = 1.0
+            try:
+                # We may have missed notifications while disconnected
+                self.reload_blocking()
+                while True:
+                    if select.select([con], [], [], 60) == ([], [], []):
+                        continue
+                    con.poll()
+                    if con.notifies:
+                        # A burst of writes costs one reload
+                        con.notifies.clear()
+                        self.reload_blocking()
+            except Exception as exc:
+                logger.warning("Project listener lost connection: %s", exc)
+            finally:
+                try:
+                    con.close()
+                except Exception:
+                    pass
+
+
+registry = ProjectRegistry()
+
+
+# ===== Writes (reload locally right away; replicas via NOTIFY) =====
+async def create_project(owner_username: str) -> int:
+    pid = await adb.create_project(owner_username)
+    await registry.reload()
+    return pid
+
+
+async def set_project_contract(project_id: int, network: str, contract: str):
+    await adb.set_project_contract(project_id, network, contract)
+    await registry.reload()
+
+
+async def set_project_group(project_id: int, group_invite_link: str):
+    await adb.set_project_group(project_id, group_invite_link)
+    await registry.reload()
+
+
+async def set_project_channel(project_id: int, channel_chat_id: str):
+    await adb.set_project_channel(project_id, channel_chat_id)
+    await registry.reload()
+
+
+async def delete_project(project_id: int):
+    await adb.delete_project(project_id)
+    await registry.reload()
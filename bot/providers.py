@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from .config import HEDGE_MIN_DELAY, HEDGE_MAX_DELAY
+from .ratelimit import ProviderUnavailable
+from .metrics import PROVIDER_SECONDS
+
+logger = logging.getLogger(__name__)
+
+EWMA_ALPHA = 0.2
+# Latency charged to a provider for an error / empty answer, so that
+# failing providers sink to the back of the order.
+FAILURE_PENALTY = 5.0
+DEFAULT_HEDGE_DELAY = 0.5
+
+
+class Provider:
+    """One upstream (Alchemy, an explorer API, Helius, ...) for one chain."""
+
+    def __init__(self, name: str, chain: str, fetch: Callable[..., Awaitable[Any]]):
+        self.name = name
+        self.chain = chain
+        self.fetch = fetch
+        self.ewma: Optional[float] = None
+        self._samples: deque = deque(maxlen=200)
+        self.requests = 0
+        self.failures = 0
+
+    def record(self, latency: float, ok: bool):
+        self.requests += 1
+        if ok:
+            self._samples.append(latency)
+        else:
+            self.failures += 1
+            latency = max(latency, FAILURE_PENALTY)
+        self.ewma = latency if self.ewma is None else EWMA_ALPHA * latency + (1 - EWMA_ALPHA) * self.ewma
+
+    def record_lower_bound(self, latency: float):
+        """A cancelled hedge loser took *at least* `latency`; only ever raises the EWMA."""
+        if self.ewma is None or latency > self.ewma:
+            self.ewma = latency if self.ewma is None else EWMA_ALPHA * latency + (1 - EWMA_ALPHA) * self.ewma
+
+    def p95(self) -> Optional[float]:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[int(len(ordered) * 0.95)]
+
+    def hedge_delay(self) -> float:
+        p95 = self.p95()
+        if p95 is None:
+            return DEFAULT_HEDGE_DELAY
+        return min(max(p95, HEDGE_MIN_DELAY), HEDGE_MAX_DELAY)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "ewma": self.ewma,
+            "p95": self.p95(),
+            "requests": self.requests,
+            "failures": self.failures,
+        }
+
+
+class ProviderRegistry:
+    """Providers per chain, ordered by latency EWMA (unmeasured ones first)."""
+
+    def __init__(self):
+        self._by_chain: Dict[str, List[Provider]] = {}
+
+    def register(self, provider: Provider):
+        self._by_chain.setdefault(provider.chain, []).append(provider)
+
+    def providers(self, chain: str) -> List[Provider]:
+        return sorted(
+            self._by_chain.get(chain, []),
+            key=lambda p: -1.0 if p.ewma is None else p.ewma,
+        )
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            f"{chain}:{p.name}": p.stats()
+            for chain, providers in self._by_chain.items()
+            for p in providers
+        }
+
+    async def hedged(self, chain: str, *args: Any) -> Any:
+        """
+        Ask the fastest provider first; if it has not answered after its
+        p95-derived hedge delay (or it failed), fire the next one. The first
+        non-None answer wins and the remaining requests are cancelled.
+        Returns None when providers answered but had nothing; raises
+        ProviderUnavailable when every provider errored.
+        """
+        queue = self.providers(chain)
+        if not queue:
+            raise ProviderUnavailable(f"no providers configured for {chain}")
+        errors: List[str] = []
+        answered = False
+
+        pending: Dict[asyncio.Task, Provider] = {}
+
+        def launch():
+            provider = queue.pop(0)
+            pending[asyncio.ensure_future(_timed(provider, provider.fetch(*args)))] = provider
+            return provider
+
+        try:
+            delay = launch().hedge_delay()
+            while pending:
+                done, _ = await asyncio.wait(
+                    pending, timeout=delay if queue else None, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    # Primary is slow: hedge with the next provider
+                    delay = launch().hedge_delay()
+                    continue
+                for task in done:
+                    provider = pending.pop(task)
+                    if task.exception() is not None:
+                        errors.append(f"{provider.name}: {task.exception()}")
+                        continue
+                    answered = True
+                    result = task.result()
+                    if result is not None:
+                        return result
+                    logger.debug("Provider %s:%s gave no answer", chain, provider.name)
+                if queue and not pending:
+                    delay = launch().hedge_delay()
+            if not answered:
+                raise ProviderUnavailable(f"all {chain} providers failed: " + "; ".join(errors))
+            return None
+        finally:
+            for task in pending:
+                task.cancel()
+
+
+async def _timed(provider: Provider, coro: Awaitable[Any]) -> Any:
+    started = time.monotonic()
+    with PROVIDER_SECONDS.time(chain=provider.chain, provider=provider.name) as labels:
+        try:
+            result = await coro
+        except asyncio.CancelledError:
+            # Losing a hedge race is not a failure, but it was at least this slow
+            provider.record_lower_bound(time.monotonic() - started)
+            raise
+        except Exception as exc:
+            provider.record(time.monotonic() - started, ok=False)
+            logger.warning("Provider %s:%s failed: %s", provider.chain, provider.name, exc)
+            raise
+        if result is None:
+            labels["outcome"] = "empty"
+    provider.record(time.monotonic() - started, ok=result is not None)
+    return result
@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+import time
+import weakref
+import asyncio
+import logging
+from typing import Dict, Optional, Tuple
+
+from .config import (
+    PROVIDER_RATE_LIMITS,
+    DEFAULT_RATE_LIMIT,
+    RATE_LIMIT_MAX_WAIT,
+    BREAKER_THRESHOLD,
+    BREAKER_COOLDOWN,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class ProviderUnavailable(Exception):
+    """
+    The provider is throttling us, erroring or its circuit is open.
+    Callers should ask the user to retry rather than treat this as a negative answer.
+    """
+
+
+class TokenBucket:
+    """
+    Async token bucket: `rate` tokens per second, up to `burst` stored.
+    Waiters are served in FIFO order; a waiter whose turn would come after
+    its deadline fails fast with ProviderUnavailable instead of queueing.
+    """
+
+    def __init__(self, rate: float, burst: float = 1.0):
+        self.rate = rate
+        self.burst = max(burst, 1.0)
+        self._tokens = self.burst
+        self._stamp = time.monotonic()
+        self._lock = asyncio.Lock()
+        self.waited = 0.0
+        self.rejected = 0
+
+    def _refill(self, now: float):
+        self._tokens = min(self.burst, self._tokens + (now - self._stamp) * self.rate)
+        self._stamp = now
+
+    async def acquire(self, cost: float = 1.0, max_wait: Optional[float] = None):
+        deadline = None if max_wait is None else time.monotonic() + max_wait
+        try:
+            await asyncio.wait_for(self._lock.acquire(), max_wait)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise ProviderUnavailable(f"rate limit queue exceeds {max_wait:.1f}s") from None
+        try:
+            now = time.monotonic()
+            self._refill(now)
+            wait = max(0.0, (cost - self._tokens) / self.rate)
+            if deadline is not None and now + wait > deadline:
+                self.rejected += 1
+                raise ProviderUnavailable(f"rate limit queue exceeds {max_wait:.1f}s")
+            if wait > 0:
+                await asyncio.sleep(wait)
+                self.waited += wait
+                self._refill(time.monotonic())
+            self._tokens -= cost
+        finally:
+            self._lock.release()
+
+    def pause(self, seconds: float):
+        """Hand out no tokens for `seconds` (e.g. after a server-side Retry-After)."""
+        self._refill(time.monotonic())
+        self._tokens = min(self._tokens, -seconds * self.rate)
+
+    def set_rate(self, rate: float):
+        self._refill(time.monotonic())
+        self.rate = rate
+
+    def stats(self) -> Dict[str, float]:
+        return {"rate": self.rate, "tokens": self._tokens, "waited": self.waited, "rejected": self.rejected}
+
+
+class CircuitBreaker:
+    """
+    Opens after `threshold` consecutive failures (429 / 5xx / transport errors)
+    and rejects calls for `cooldown` seconds (or the provider's Retry-After).
+    After that one probe is let through (half-open); success closes it again.
+    """
+
+    def __init__(self, threshold: int = 5, cooldown: float = 30.0):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_until = 0.0
+        self._probing = False
+        self.trips = 0
+
+    @property
+    def state(self) -> str:
+        if self.failures < self.threshold and self.opened_until == 0.0:
+            return "closed"
+        return "open" if time.monotonic() < self.opened_until else "half_open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_until = 0.0
+        self._probing = False
+
+    def abandon(self):
+        """The admitted call was cancelled before it produced an outcome."""
+        self._probing = False
+
+    def record_failure(self, retry_after: Optional[float] = None):
+        self.failures += 1
+        self._probing = False
+        if self.failures >= self.threshold or retry_after or self.opened_until:
+            if time.monotonic() >= self.opened_until:
+                self.trips += 1
+            self.opened_until = time.monotonic() + max(self.cooldown, retry_after or 0.0)
+
+
+# Breakers are shared process-wide; buckets hold an asyncio.Lock, which is
+# bound to one event loop, so they are kept per loop. Keyed by the loop
+# object (not its id, which a later loop may reuse) and dropped with it.
+_breakers: Dict[str, CircuitBreaker] = {}
+_buckets: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, TokenBucket]]" = weakref.WeakKeyDictionary()
+
+
+def _limits_for(host: str) -> Tuple[float, float]:
+    for suffix, limits in PROVIDER_RATE_LIMITS.items():
+        if host == suffix or host.endswith("." + suffix):
+            return limits
+    return DEFAULT_RATE_LIMIT
+
+
+def limiter(key: str, host: str) -> Tuple[TokenBucket, CircuitBreaker]:
+    """Bucket + breaker for one provider / API key combination."""
+    breaker = _breakers.get(key)
+    if breaker is None:
+        breaker = _breakers[key] = CircuitBreaker(BREAKER_THRESHOLD, BREAKER_COOLDOWN)
+    buckets = _buckets.setdefault(asyncio.get_running_loop(), {})
+    bucket = buckets.get(key)
+    if bucket is None:
+        bucket = buckets[key] = TokenBucket(*_limits_for(host))
+    return bucket, breaker
+
+
+async def admit(key: str, host: str, max_wait: Optional[float] = RATE_LIMIT_MAX_WAIT) -> CircuitBreaker:
+    """Wait for a token and check the breaker; raises ProviderUnavailable otherwise."""
+    bucket, breaker = limiter(key, host)
+    if not breaker.allow():
+        raise ProviderUnavailable(f"{host} circuit open")
+    try:
+        await bucket.acquire(max_wait=max_wait)
+    except BaseException:
+        # Rejected or cancelled while queueing: release a half-open probe slot
+        breaker.abandon()
+        raise
+    return breaker
+
+
+def ratelimit_stats() -> Dict[str, Dict[str, object]]:
+    out: Dict[str, Dict[str, object]] = {
+        key: {"breaker": breaker.state, "trips": breaker.trips} for key, breaker in _breakers.items()
+    }
+    for key, bucket in [item for buckets in list(_buckets.values()) for item in buckets.items()]:
+        entry = out.setdefault(key, {})
+        entry["waited"] = entry.get("waited", 0.0) + bucket.waited
+        entry["rejected"] = entry.get("rejected", 0) + bucket.rejected
+    return out
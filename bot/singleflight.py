@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import weakref
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, TypeVar
+
+T = TypeVar("T")
+
+# Every group registers itself here so metrics can be collected in one place
+_groups: Dict[str, "SingleFlight"] = {}
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent identical calls.
+
+    While a call for `key` is in flight, further calls with the same key wait
+    for it and receive the same result (or exception) instead of issuing
+    their own provider request. The shared call runs as its own task, so a
+    cancelled caller does not cancel the others. Flights are kept per event
+    loop (keyed by the loop object, whose id a later loop may reuse).
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Hashable, asyncio.Task]]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+        _groups[name] = self
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        self.calls += 1
+        inflight = self._inflight.setdefault(asyncio.get_running_loop(), {})
+        task = inflight.get(key)
+        if task is None:
+            self.executions += 1
+            task = asyncio.ensure_future(fn())
+            inflight[key] = task
+            task.add_done_callback(lambda t: self._done(inflight, key, t))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _done(self, inflight: Dict[Hashable, asyncio.Task], key: Hashable, task: asyncio.Task):
+        if inflight.get(key) is task:
+            del inflight[key]
+        if not task.cancelled():
+            task.exception()  # mark retrieved even if every caller went away
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "calls": self.calls,
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "in_flight": sum(len(tasks) for tasks in list(self._inflight.values())),
+        }
+
+
+def singleflight_stats() -> Dict[str, Dict[str, Any]]:
+    return {name: group.stats() for name, group in _groups.items()}
@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import base64
+import hashlib
+import functools
+from typing import NamedTuple, Optional, Sequence
+
+# Solana account helpers: base58 keys, program-derived addresses (associated
+# token accounts) and the SPL Token / Token-2022 account layout, so holder
+# checks can read token accounts by address instead of scanning by owner.
+
+TOKEN_PROGRAM_ID = "TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA"
+TOKEN_2022_PROGRAM_ID = "TokenzQdBNbLqP5VEhdkAS6EPFLC1PHnBqCXEpPxuEb"
+ASSOCIATED_TOKEN_PROGRAM_ID = "ATokenGPvbdGVxr1b2hvZbsiqW5xWH25efTNsLJA8knL"
+TOKEN_PROGRAMS = (TOKEN_PROGRAM_ID, TOKEN_2022_PROGRAM_ID)
+
+# getMultipleAccounts accepts at most this many keys per call
+MAX_MULTIPLE_ACCOUNTS = 100
+
+# ===========================
+# Base58
+# ===========================
+
+B58_ALPHABET = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+_B58_INDEX = {c: i for i, c in enumerate(B58_ALPHABET)}
+
+
+def b58decode(value: str) -> bytes:
+    """Decode base58 (Bitcoin alphabet); raises ValueError on foreign characters."""
+    n = 0
+    for c in value:
+        digit = _B58_INDEX.get(c)
+        if digit is None:
+            raise ValueError(f"invalid base58 character {c!r}")
+        n = n * 58 + digit
+    body = n.to_bytes((n.bit_length() + 7) // 8, "big") if n else b""
+    return b"\x00" * (len(value) - len(value.lstrip("1"))) + body
+
+
+def b58encode(raw: bytes) -> str:
+    n = int.from_bytes(raw, "big")
+    out = []
+    while n:
+        n, rem = divmod(n, 58)
+        out.append(B58_ALPHABET[rem])
+    return "1" * (len(raw) - len(raw.lstrip(b"\x00"))) + "".join(reversed(out))
+
+
+def pubkey_bytes(key: str) -> Optional[bytes]:
+    """The 32 raw bytes of a base58 public key, or None if it is not one."""
+    if not 32 <= len(key or "") <= 44:
+        return None
+    try:
+        raw = b58decode(key)
+    except ValueError:
+        return None
+    return raw if len(raw) == 32 else None
+
+
+def is_pubkey(key: str) -> bool:
+    return pubkey_bytes(key) is not None
+
+
+# ===========================
+# Program-derived addresses
+# ===========================
+
+# ed25519: -x^2 + y^2 = 1 + d x^2 y^2 over GF(2^255 - 19)
+_P = 2**255 - 19
+_D = -121665 * pow(121666, _P - 2, _P) % _P
+
+
+def is_on_curve(key: bytes) -> bool:
+    """
+    Whether 32 bytes decompress to an ed25519 point (same rule as the
+    runtime: y is reduced mod p, the sign bit is ignored), i.e. whether
+    x^2 = u / v = (y^2 - 1) / (d y^2 + 1) has a square root. u / v is a
+    square exactly when u * v is, which saves the modular inverse.
+    """
+    y = int.from_bytes(key, "little") & ((1 << 255) - 1)
+    y2 = y * y % _P
+    uv = (y2 - 1) * (_D * y2 + 1) % _P
+    return uv == 0 or pow(uv, (_P - 1) // 2, _P) == 1
+
+
+def find_program_address(seeds: Sequence[bytes], program_id: str) -> str:
+    """First off-curve sha256(seeds | bump | program | marker), bump from 255 down."""
+    program = b58decode(program_id)
+    prefix = b"".join(seeds)
+    for bump in range(255, -1, -1):
+        candidate = hashlib.sha256(prefix + bytes([bump]) + program + b"ProgramDerivedAddress").digest()
+        if not is_on_curve(candidate):
+            return b58encode(candidate)
+    raise ValueError("no viable program address bump")
+
+
+@functools.lru_cache(maxsize=65536)
+def associated_token_address(owner: str, mint: str, token_program: str = TOKEN_PROGRAM_ID) -> Optional[str]:
+    """The owner's associated token account for `mint`, or None for malformed keys."""
+    owner_raw, mint_raw = pubkey_bytes(owner), pubkey_bytes(mint)
+    if owner_raw is None or mint_raw is None:
+        return None
+    return find_program_address([owner_raw, b58decode(token_program), mint_raw], ASSOCIATED_TOKEN_PROGRAM_ID)
+
+
+# ===========================
+# Token account layout
+# ===========================
+
+# SPL Token `Account`: mint (32) | owner (32) | amount (u64 LE) | delegate
+# (COption<Pubkey>, 36) | state (u8) | is_native (12) | delegated_amount (8)
+# | close_authority (36) = 165 bytes. Token-2022 appends an account-type
+# byte (2 = Account) and TLV extensions after those 165 bytes.
+TOKEN_ACCOUNT_LEN = 165
+_STATE_OFFSET = 108
+_ACCOUNT_TYPE_ACCOUNT = 2
+
+
+class TokenAccount(NamedTuple):
+    mint: str
+    owner: str
+    amount: int
+    frozen: bool
+
+
+def decode_token_account(data: bytes) -> Optional[TokenAccount]:
+    """Decode SPL Token / Token-2022 account bytes; None for mints, uninitialized or foreign data."""
+    if len(data) < TOKEN_ACCOUNT_LEN:
+        return None
+    if len(data) > TOKEN_ACCOUNT_LEN and data[TOKEN_ACCOUNT_LEN] != _ACCOUNT_TYPE_ACCOUNT:
+        return None
+    state = data[_STATE_OFFSET]
+    if state not in (1, 2):  # 0 = uninitialized
+        return None
+    return TokenAccount(
+        mint=b58encode(data[0:32]),
+        owner=b58encode(data[32:64]),
+        amount=int.from_bytes(data[64:72], "little"),
+        frozen=state == 2,
+    )
+
+
+def account_data(account: dict) -> bytes:
+    """Raw bytes of an RPC account object fetched with encoding=base64."""
+    data = account.get("data")
+    if isinstance(data, list) and data and data[-1] == "base64":
+        return base64.b64decode(data[0])
+    return b""
@@ -0,0 +1,222 @@
+from __future__ import annotations
+
+import time
+import select
+import asyncio
+import logging
+import threading
+from typing import Dict, Optional, Tuple
+
+from .config import STATE_TTLS, STATE_DEFAULT_TTL, STATE_OWNER_WAIT
+from . import db
+from .db import load_states, write_states
+from .profiling import span
+
+logger = logging.getLogger(__name__)
+
+# Marks a pending delete in the dirty map
+_DELETE = None
+
+
+class StateStore:
+    """
+    In-memory FSM state store in front of the `states` table.
+
+    - every state is loaded once at startup, so a user without a pending
+      state costs no database query at all
+    - each state expires after its TTL (e.g. abandoned VERIFY_MATH captchas)
+    - writes are coalesced per user and flushed to Postgres in batches
+
+    Memory is the source of truth, so exactly one bot front end may run:
+    claim() takes a Postgres advisory lock and refuses a second one. Jobs in
+    worker processes end flows through db.clear_state_if() instead.
+    """
+
+    def __init__(self):
+        self._states: Dict[int, Tuple[str, str, float]] = {}   # uid -> (state, payload, expires_at)
+        self._dirty: Dict[int, Optional[Tuple[str, str]]] = {}
+        self._lock = threading.Lock()
+        self._loaded = False
+        self.flushes = 0
+        self.flushed_rows = 0
+        self._listener: Optional[threading.Thread] = None
+        self._owner = None  # connection holding the state-owner lock
+
+    @staticmethod
+    def _ttl(state: str) -> float:
+        return STATE_TTLS.get(state, STATE_DEFAULT_TTL)
+
+    def claim(self, wait: float = STATE_OWNER_WAIT):
+        """Become the only front end owning the `states` table, or raise RuntimeError."""
+        deadline = time.monotonic() + wait
+        while self._owner is None:
+            self._owner = db.try_claim_state_owner()
+            if self._owner is not None:
+                break
+            if time.monotonic() >= deadline:
+                raise RuntimeError(
+                    "Another bot front end owns the FSM state store; run a single main.py / "
+                    "run_web.py instance and scale with worker.py."
+                )
+            logger.info("Waiting for the previous bot front end to exit…")
+            time.sleep(2.0)
+
+    def load(self):
+        """Rehydrate from the states table (drops rows that already expired)."""
+        rows = load_states()
+        now = time.monotonic()
+        with self._lock:
+            for uid, state, payload, age in rows:
+                remaining = self._ttl(state) - age
+                if remaining <= 0:
+                    self._dirty[uid] = _DELETE
+                    continue
+                if uid not in self._dirty:  # a newer in-memory write wins
+                    self._states[uid] = (state, payload or "", now + remaining)
+            self._loaded = True
+        logger.info("State store loaded %d states", len(self._states))
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            self.load()
+
+    def get(self, uid: int) -> Tuple[Optional[str], Optional[str]]:
+        self._ensure_loaded()
+        with self._lock:
+            entry = self._states.get(uid)
+            if entry is None:
+                return None, None
+            state, payload, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._states[uid]
+                self._dirty[uid] = _DELETE
+                return None, None
+            return state, payload
+
+    def set(self, uid: int, state: Optional[str], payload: Optional[str]):
+        self._ensure_loaded()
+        with self._lock:
+            if state is None:
+                self._states.pop(uid, None)
+                self._dirty[uid] = _DELETE
+            else:
+                self._states[uid] = (state, payload or "", time.monotonic() + self._ttl(state))
+                self._dirty[uid] = (state, payload or "")
+
+    def clear_if(self, uid: int, state: str) -> bool:
+        """Clear the user's state only if it is still `state` (they may have moved on)."""
+        with self._lock:
+            entry = self._states.get(uid)
+            if entry is None or entry[0] != state:
+                return False
+            del self._states[uid]
+            self._dirty[uid] = _DELETE
+            return True
+
+    def expire(self) -> int:
+        """Drop every expired state; returns how many were removed."""
+        now = time.monotonic()
+        with self._lock:
+            expired = [uid for uid, (_, _, exp) in self._states.items() if exp <= now]
+            for uid in expired:
+                del self._states[uid]
+                self._dirty[uid] = _DELETE
+        return len(expired)
+
+    def flush(self) -> int:
+        """Write pending changes in one batch; failed batches are retried next flush."""
+        with self._lock:
+            dirty, self._dirty = self._dirty, {}
+        if not dirty:
+            return 0
+
+        upserts = [(uid, st[0], st[1]) for uid, st in dirty.items() if st is not _DELETE]
+        deletes = [uid for uid, st in dirty.items() if st is _DELETE]
+        try:
+            write_states(upserts, deletes)
+        except Exception:
+            with self._lock:
+                for uid, st in dirty.items():
+                    self._dirty.setdefault(uid, st)
+            raise
+
+        self.flushes += 1
+        self.flushed_rows += len(dirty)
+        return len(dirty)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "states": len(self._states),
+                "pending_writes": len(self._dirty),
+                "flushes": self.flushes,
+                "flushed_rows": self.flushed_rows,
+            }
+
+    # ===== Clears from job processes =====
+    def start_listener(self):
+        """Apply db.clear_state_if() calls made by worker processes (NOTIFY states_cleared)."""
+        if self._listener is None:
+            self._listener = threading.Thread(target=self._listen, name="states-listener", daemon=True)
+            self._listener.start()
+
+    def _apply(self, payload: str):
+        uid, _, state = payload.partition(":")
+        try:
+            self.clear_if(int(uid), state)
+        except ValueError:
+            logger.warning("Ignoring malformed %s payload: %r", db.STATES_CHANNEL, payload)
+
+    def _listen(self):
+        backoff = 1.0
+        while True:
+            try:
+                con = db.open_listener(db.STATES_CHANNEL)
+            except Exception as exc:
+                logger.warning("State listener connect failed: %s", exc)
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 60.0)
+                continue
+            backoff = 1.0
+            try:
+                while True:
+                    if select.select([con], [], [], 60) == ([], [], []):
+                        continue
+                    con.poll()
+                    while con.notifies:
+                        self._apply(con.notifies.pop(0).payload)
+            except Exception as exc:
+                logger.warning("State listener lost connection: %s", exc)
+            finally:
+                try:
+                    con.close()
+                except Exception:
+                    pass
+
+
+store = StateStore()
+
+
+def get_state(telegram_id: int) -> Tuple[Optional[str], Optional[str]]:
+    """Get FSM state for a user (memory only, no DB round-trip)."""
+    with span("state.load"):
+        return store.get(telegram_id)
+
+
+def upsert_state(telegram_id: int, state: Optional[str], payload: Optional[str]):
+    """Set (or clear, with state=None) a user's FSM state; persisted by the next flush."""
+    store.set(telegram_id, state, payload)
+
+
+def clear_state_if(telegram_id: int, state: str):
+    """Clear a user's FSM state if it is still `state` (bot process only)."""
+    store.clear_if(telegram_id, state)
+
+
+async def flush_states(context=None):
+    """Job-queue task: expire stale states and write pending changes to Postgres."""
+    store.expire()
+    try:
+        await asyncio.to_thread(store.flush)
+    except Exception as exc:
+        logger.warning("State flush failed, will retry: %s", exc)
@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+
+from telegram.ext import ContextTypes
+
+from .config import NETWORKS, STATS_RETENTION_DAYS
+from .db import refresh_project_stats, get_project_stats
+
+logger = logging.getLogger(__name__)
+
+
+async def refresh_stats(context: ContextTypes.DEFAULT_TYPE = None):
+    """Job-queue task: fold new users into the dashboard summary tables."""
+    try:
+        await asyncio.to_thread(refresh_project_stats, STATS_RETENTION_DAYS)
+    except Exception as exc:
+        logger.warning("Stats refresh failed, will retry: %s", exc)
+
+
+async def stats_text() -> str:
+    """Dashboard text, rendered from the summary tables only."""
+    rows = await asyncio.to_thread(get_project_stats)
+    if not rows:
+        return "<b>👥 Verified Users</b>\n\nNo data yet."
+    lines = ["<b>👥 Verified Users</b>"]
+    for r in rows:
+        lines.append(
+            f"\n<b>{NETWORKS.get(r['network'], r['network'])}</b> • <code>{r['contract_address'][:10]}…</code>\n"
+            f"• Verified now: <b>{r['verified_users']}</b> ({r['distinct_wallets']} wallets)\n"
+            f"• Verifications: {r['last_hour']} this hour / {r['last_day']} 24h / "
+            f"{r['last_week']} 7d / {r['verifications']} total"
+        )
+    refreshed = max((r["refreshed_at"] for r in rows if r["refreshed_at"]), default=None)
+    if refreshed:
+        lines.append(f"\n<i>Updated {refreshed:%Y-%m-%d %H:%M %Z}</i>")
+    return "\n".join(lines)
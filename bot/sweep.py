@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import time
+import weakref
+import asyncio
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from telegram.ext import ContextTypes
+
+from .config import (
+    DEFAULT_MIN_AMOUNT,
+    SWEEP_PAGE_SIZE,
+    SWEEP_CONCURRENCY,
+    SWEEP_PROVIDER_RPS,
+)
+from .db import get_users_to_recheck, record_holder_checks
+from .projects import registry as projects
+from .blockchain import bulk_token_balances_async, forget_holders
+from .ratelimit import TokenBucket
+from .jobs import submit, distributed, BATCH
+
+logger = logging.getLogger(__name__)
+
+# Sui wallets are sent as JSON-RPC batches of at most this many calls; EVM
+# pages go out as Multicall3 aggregate3 calls and Solana pages as
+# getMultipleAccounts calls instead, so those are sent whole.
+RPC_BATCH = 100
+
+EVM_NETWORKS = ("eth", "base", "bsc")
+SOLANA_NETWORKS = ("sol", "solana", "pumpfun")
+
+
+def _provider_key(network: str) -> str:
+    network = (network or "").lower()
+    if network in EVM_NETWORKS:
+        return f"evm:{network}"
+    if network in SOLANA_NETWORKS:
+        return "solana"
+    return network
+
+
+# Buckets hold an asyncio.Lock bound to one event loop; with JOB_QUEUE=local
+# each sweep job runs in a fresh loop, so budgets are kept per loop.
+_budgets: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, TokenBucket]]" = weakref.WeakKeyDictionary()
+
+# Last sweep report, e.g. for the admin dashboard
+last_report: Dict[str, float] = {}
+
+
+def _budget(network: str) -> TokenBucket:
+    """Sweep-only budget on top of the shared provider limits, so users keep headroom."""
+    budgets = _budgets.setdefault(asyncio.get_running_loop(), {})
+    key = _provider_key(network)
+    if key not in budgets:
+        budgets[key] = TokenBucket(SWEEP_PROVIDER_RPS)
+    return budgets[key]
+
+
+async def _check_page(project: Dict, page: List[Tuple[int, str]], min_amount: int) -> Tuple[int, int]:
+    """Re-check one page of (user id, wallet); returns (checked, revoked)."""
+    network = project["network"]
+    contract = project["contract_address"]
+    batches = [page] if network in EVM_NETWORKS + SOLANA_NETWORKS else [
+        page[i:i + RPC_BATCH] for i in range(0, len(page), RPC_BATCH)
+    ]
+
+    results: List[Tuple[int, bool]] = []
+    sold: List[str] = []
+    for batch in batches:
+        await _budget(network).acquire()
+        try:
+            balances = await bulk_token_balances_async(network, contract, [w for _, w in batch], min_amount)
+        except Exception as exc:
+            logger.warning("Sweep batch failed for project %s: %s", project["id"], exc)
+            continue
+        for uid, wallet in batch:
+            balance: Optional[int] = balances.get(wallet)
+            if balance is None:
+                continue  # unknown → leave the user as is
+            results.append((uid, balance >= min_amount))
+            if balance < min_amount:
+                sold.append(wallet)
+
+    await asyncio.to_thread(record_holder_checks, results)
+    # A cached positive answer would let a revoked wallet re-verify at once
+    await forget_holders(network, contract, sold, min_amount)
+    return len(results), sum(1 for _, holds in results if not holds)
+
+
+async def sweep_project(project: Dict, min_amount: int = DEFAULT_MIN_AMOUNT) -> Dict[str, float]:
+    """Walk a project's verified users page by page and re-check their balances."""
+    started = time.monotonic()
+    sem = asyncio.Semaphore(SWEEP_CONCURRENCY)
+    tasks: List[asyncio.Task] = []
+
+    async def run(page):
+        try:
+            return await _check_page(project, page, min_amount)
+        finally:
+            sem.release()
+
+    after_id = 0
+    while True:
+        page = await asyncio.to_thread(get_users_to_recheck, project["id"], after_id, SWEEP_PAGE_SIZE)
+        if not page:
+            break
+        after_id = page[-1][0]
+        await sem.acquire()
+        tasks.append(asyncio.create_task(run(page)))
+
+    checked = revoked = 0
+    for outcome in await asyncio.gather(*tasks, return_exceptions=True):
+        if isinstance(outcome, BaseException):
+            logger.warning("Sweep page failed for project %s: %s", project["id"], outcome)
+            continue
+        checked += outcome[0]
+        revoked += outcome[1]
+
+    elapsed = max(time.monotonic() - started, 1e-9)
+    return {"checked": checked, "revoked": revoked, "seconds": elapsed, "wallets_per_sec": checked / elapsed}
+
+
+async def reverify_holders(context: ContextTypes.DEFAULT_TYPE):
+    """Job-queue task: re-verify every project's holders and revoke sellers."""
+    if distributed():
+        # One batch job per project, spread over the worker tier
+        for project in await asyncio.to_thread(projects.all):
+            await submit("reverify_project", {"project_id": project["id"]}, priority=BATCH)
+        return
+
+    started = time.monotonic()
+    checked = revoked = 0
+
+    for project in await asyncio.to_thread(projects.all):
+        try:
+            report = await sweep_project(project)
+        except Exception:
+            logger.exception("Sweep failed for project %s", project["id"])
+            continue
+        checked += report["checked"]
+        revoked += report["revoked"]
+        logger.info(
+            "Sweep project %s: %d checked, %d revoked, %.1f wallets/s",
+            project["id"], report["checked"], report["revoked"], report["wallets_per_sec"],
+        )
+
+    elapsed = max(time.monotonic() - started, 1e-9)
+    last_report.update(
+        finished_at=time.time(),
+        checked=checked,
+        revoked=revoked,
+        seconds=elapsed,
+        wallets_per_sec=checked / elapsed,
+    )
+    logger.info("Sweep done: %d wallets in %.1fs (%.1f wallets/s), %d revoked",
+                checked, elapsed, checked / elapsed, revoked)
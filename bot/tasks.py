@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Any, Dict
+
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+
+from .config import DEFAULT_MIN_AMOUNT
+from . import db
+from .jobs import job, JobContext, distributed
+from .state import clear_state_if
+from .adb import save_verified_user
+from .projects import registry as projects
+from .blockchain import is_token_holder_async, get_token_meta_async
+from .ratelimit import ProviderUnavailable
+from .handlers import verify_kb, join_community_kb
+from .sweep import sweep_project
+from .broadcast import run_broadcast
+from .market import refresh_quotes
+
+logger = logging.getLogger(__name__)
+
+# Job kinds. The bot process submits these (bot.jobs.submit); depending on
+# JOB_QUEUE they run inline, in worker.py processes or in a local process
+# pool, and report back to the user through the Bot API.
+
+
+async def _end_wallet_prompt(telegram_id: int):
+    """Leave VERIFY_WALLET; the bot process owns the state store, so other processes go through Postgres."""
+    if distributed():
+        await asyncio.to_thread(db.clear_state_if, telegram_id, "VERIFY_WALLET")
+    else:
+        clear_state_if(telegram_id, "VERIFY_WALLET")
+
+
+@job("holder_check", max_attempts=3)
+async def holder_check(ctx: JobContext, p: Dict[str, Any]):
+    """
+    Verify a user's wallet and send the invite. The user stays in
+    VERIFY_WALLET until this succeeds, so after a failure they can simply
+    send another address.
+    """
+    project = await asyncio.to_thread(projects.get, p["project_id"])
+    if not project:
+        await _end_wallet_prompt(p["telegram_id"])
+        await ctx.bot.send_message(p["chat_id"], "❌ This project no longer exists.")
+        return
+    try:
+        holds = await is_token_holder_async(
+            project["network"], p["wallet"], project["contract_address"], DEFAULT_MIN_AMOUNT
+        )
+    except ProviderUnavailable:
+        if not ctx.final_attempt:
+            raise  # retried with backoff
+        await ctx.bot.send_message(
+            p["chat_id"],
+            "⏳ Balance check is busy right now. Please send your wallet address again in a minute.",
+            reply_markup=verify_kb(project["id"]),
+        )
+        return
+    if not holds:
+        await ctx.bot.send_message(
+            p["chat_id"],
+            "❌ You do not hold the token. Send another wallet address to try again.",
+            reply_markup=verify_kb(project["id"]),
+        )
+        return
+    await save_verified_user(p["telegram_id"], p.get("username") or "", project["id"], p["wallet"])
+    await _end_wallet_prompt(p["telegram_id"])
+    await ctx.bot.send_message(
+        p["chat_id"],
+        "🎉 Verified!",
+        reply_markup=join_community_kb(project.get("group_invite_link"), project["id"]),
+    )
+
+
+@job("token_meta", max_attempts=3)
+async def token_meta(ctx: JobContext, p: Dict[str, Any]):
+    """Look up a contract during project setup and ask the admin to confirm it."""
+    retry_kb = InlineKeyboardMarkup([[InlineKeyboardButton("❌ Re-enter", callback_data="retry_contract")]])
+    try:
+        meta = await get_token_meta_async(p["network"], p["contract"])
+    except ProviderUnavailable:
+        if not ctx.final_attempt:
+            raise
+        await ctx.bot.send_message(p["chat_id"], "⏳ Token lookup is busy right now.", reply_markup=retry_kb)
+        return
+    if not meta:
+        await ctx.bot.send_message(p["chat_id"], "❌ Invalid contract.", reply_markup=retry_kb)
+        return
+    kb = InlineKeyboardMarkup([
+        [InlineKeyboardButton("✅ Confirm", callback_data="confirm_contract")],
+        [InlineKeyboardButton("❌ Re-enter", callback_data="retry_contract")],
+    ])
+    await ctx.bot.send_message(
+        p["chat_id"],
+        f"🔎 <b>Token Found</b>\n\n"
+        f"Name: <b>{meta['name']}</b>\n"
+        f"Symbol: <b>{meta['symbol']}</b>\n\nConfirm this contract?",
+        reply_markup=kb,
+        parse_mode="HTML",
+    )
+
+
+@job("reverify_project", max_attempts=2)
+async def reverify_project(ctx: JobContext, p: Dict[str, Any]):
+    """Re-check one project's verified holders (batch priority)."""
+    project = await asyncio.to_thread(projects.get, p["project_id"])
+    if not project:
+        return
+    report = await sweep_project(project)
+    logger.info(
+        "Sweep project %s: %d checked, %d revoked, %.1f wallets/s",
+        project["id"], report["checked"], report["revoked"], report["wallets_per_sec"],
+    )
+
+
+@job("broadcast", max_attempts=5)
+async def broadcast(ctx: JobContext, p: Dict[str, Any]):
+    """Send a broadcast, resuming from its last checkpoint on retry."""
+    await run_broadcast(ctx.bot, p["broadcast_id"])
+
+
+@job("market_refresh", max_attempts=1)
+async def market_refresh(ctx: JobContext, p: Dict[str, Any]):
+    """Refresh price / FDV / liquidity for every project (batched provider calls)."""
+    quoted = await refresh_quotes(projects.all())
+    logger.info("Market data refreshed for %d tokens", quoted)
@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import time
+import asyncio
+import logging
+from typing import Any, Awaitable, Dict, Hashable, List, Optional
+
+from telegram import Update
+from telegram.ext import ApplicationBuilder, BaseUpdateProcessor
+
+from .config import UPDATE_CONCURRENCY, UPDATE_QUEUE_LIMIT
+
+logger = logging.getLogger(__name__)
+
+# Warn at most this often while producers are blocked on a full queue
+SATURATION_LOG_EVERY = 60.0
+
+
+class BoundedUpdateQueue(asyncio.Queue):
+    """
+    Update queue that applies backpressure: put() waits while `limit` updates
+    are queued *or still being processed* (the Application calls task_done()
+    only after an update's handlers finish). The webhook handler and the
+    polling loop both await put(), so Telegram deliveries slow down instead
+    of piling up in memory.
+    """
+
+    def __init__(self, limit: int):
+        super().__init__()
+        self.limit = limit
+        self._room: Optional[asyncio.Semaphore] = None
+        self.max_depth = 0
+        self.blocked_puts = 0
+        self.blocked_seconds = 0.0
+        self._last_warning = 0.0
+
+    def _slots(self) -> asyncio.Semaphore:
+        if self._room is None:
+            self._room = asyncio.Semaphore(self.limit)
+        return self._room
+
+    async def put(self, item: Any):
+        room = self._slots()
+        if room.locked():
+            started = time.monotonic()
+            await room.acquire()
+            waited = time.monotonic() - started
+            self.blocked_puts += 1
+            self.blocked_seconds += waited
+            if started - self._last_warning > SATURATION_LOG_EVERY:
+                self._last_warning = started
+                logger.warning("Update queue full (%d pending), producer waited %.2fs", self.limit, waited)
+        else:
+            await room.acquire()
+        super().put_nowait(item)
+        self.max_depth = max(self.max_depth, self._unfinished_tasks)
+
+    def task_done(self):
+        super().task_done()  # raises ValueError without a matching put: no release then
+        self._slots().release()
+
+    def stats(self) -> Dict[str, float]:
+        pending = self._unfinished_tasks
+        queued = self.qsize()
+        return {
+            "queued": queued,
+            "processing": pending - queued,
+            "limit": self.limit,
+            "max_depth": self.max_depth,
+            "blocked_puts": self.blocked_puts,
+            "blocked_seconds": round(self.blocked_seconds, 3),
+        }
+
+
+def _ordering_key(update: object) -> Optional[Hashable]:
+    """Updates with the same key run one at a time, in arrival order."""
+    if not isinstance(update, Update):
+        return None
+    if update.effective_user:
+        return ("user", update.effective_user.id)
+    if update.effective_chat:
+        return ("chat", update.effective_chat.id)
+    return None
+
+
+class PerUserUpdateProcessor(BaseUpdateProcessor):
+    """
+    Processes up to `concurrency` updates at once while keeping every user's
+    updates strictly ordered, so the FSM in on_message/on_button never sees
+    two steps of one user interleave.
+
+    PTB's own semaphore is sized to `max_pending` (the queue limit) so that
+    an update waiting behind the same user's previous one does not occupy
+    one of the `concurrency` processing slots.
+    """
+
+    def __init__(self, concurrency: int, max_pending: int):
+        super().__init__(max(concurrency, max_pending))
+        self.concurrency = concurrency
+        self._slots: Optional[asyncio.Semaphore] = None
+        # key -> [lock, updates holding or waiting for it]
+        self._locks: Dict[Hashable, List[Any]] = {}
+        self.processed = 0
+        self.in_flight = 0
+        self.waiting_on_user = 0
+
+    async def initialize(self):
+        self._slots = asyncio.Semaphore(self.concurrency)
+
+    async def shutdown(self):
+        pass
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]):
+        key = _ordering_key(update)
+        if key is None:
+            await self._run(coroutine)
+            return
+
+        entry = self._locks.get(key)
+        if entry is None:
+            entry = self._locks[key] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            if entry[0].locked():
+                self.waiting_on_user += 1
+                try:
+                    await entry[0].acquire()
+                finally:
+                    self.waiting_on_user -= 1
+            else:
+                await entry[0].acquire()
+            try:
+                await self._run(coroutine)
+            finally:
+                entry[0].release()
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._locks[key]
+
+    async def _run(self, coroutine: Awaitable[Any]):
+        async with self._slots:
+            self.in_flight += 1
+            try:
+                await coroutine
+            finally:
+                self.in_flight -= 1
+                self.processed += 1
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "concurrency": self.concurrency,
+            "in_flight": self.in_flight,
+            "waiting_on_user": self.waiting_on_user,
+            "active_users": len(self._locks),
+            "processed": self.processed,
+        }
+
+
+_queue: Optional[BoundedUpdateQueue] = None
+_processor: Optional[PerUserUpdateProcessor] = None
+
+
+def configure(builder: ApplicationBuilder) -> ApplicationBuilder:
+    """Enable concurrent, per-user ordered processing when UPDATE_CONCURRENCY > 1."""
+    global _queue, _processor
+    if UPDATE_CONCURRENCY <= 1:
+        return builder
+    _queue = BoundedUpdateQueue(UPDATE_QUEUE_LIMIT)
+    _processor = PerUserUpdateProcessor(UPDATE_CONCURRENCY, UPDATE_QUEUE_LIMIT)
+    return builder.update_queue(_queue).concurrent_updates(_processor)
+
+
+def update_stats() -> Dict[str, Dict[str, float]]:
+    """Queue depth and processor gauges (empty in sequential mode)."""
+    stats: Dict[str, Dict[str, float]] = {}
+    if _queue is not None:
+        stats["queue"] = _queue.stats()
+    if _processor is not None:
+        stats["processor"] = _processor.stats()
+    return stats
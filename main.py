@@ -1,9 +1,36 @@
 import logging
 import os
 from telegram.ext import Application, CommandHandler, MessageHandler, CallbackQueryHandler, filters
-from bot.config import BOT_TOKEN
-from bot.db import init_db
-from bot.handlers import cmd_start, cmd_admin, on_button, on_message, send_channel_pin
+from bot.config import (
+    BOT_TOKEN,
+    SWEEP_INTERVAL,
+    CACHE_PG_ENABLED,
+    STATE_FLUSH_INTERVAL,
+    HOLDER_INDEX_PROJECTS,
+    INDEX_POLL_INTERVAL,
+    STATS_REFRESH_INTERVAL,
+    JOB_QUEUE,
+    MARKET_REFRESH_INTERVAL,
+)
+from bot.db import init_db, pool_stats
+from bot.adb import close_pool as close_db_pool
+from bot.httpclient import aclose as close_http_clients
+from bot.cache import purge_expired
+from bot.state import store as state_store, flush_states
+from bot.blockchain import cache_stats
+from bot.ratelimit import ratelimit_stats
+from bot.singleflight import singleflight_stats
+from bot.projects import registry as project_registry
+from bot.handlers import cmd_start, cmd_admin, cmd_profile, on_button, on_message, send_channel_pin
+from bot.sweep import reverify_holders
+from bot.indexer import index_holders, index_stats
+from bot.stats import refresh_stats
+from bot.broadcast import resume_broadcasts, broadcast_stats
+from bot.market import refresh_market, market_stats
+from bot import metrics, profiling
+from bot.updates import configure as configure_updates, update_stats
+from bot.jobs import shutdown_pool as shutdown_job_pool
+from bot import tasks  # noqa: F401  (registers job kinds)
 
 logging.basicConfig(
     format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
@@ -13,23 +40,89 @@ logging.basicConfig(
 log = logging.getLogger("bot")
 
 
+async def on_shutdown(app: Application):
+    await flush_states()
+    await close_http_clients()
+    await close_db_pool()
+    shutdown_job_pool()
+
+
+def register_gauges():
+    """Expose the in-process *_stats() counters as Prometheus gauges."""
+    metrics.gauge("holderxr_update_queue", "Update queue and processor gauges", lambda: metrics.flatten(update_stats()))
+    metrics.gauge("holderxr_db_pool", "Postgres connection pool", pool_stats)
+    metrics.gauge("holderxr_cache", "Holder / token metadata cache counters", lambda: metrics.flatten(cache_stats()))
+    metrics.gauge("holderxr_ratelimit", "Provider token buckets and breakers", lambda: metrics.flatten(ratelimit_stats()))
+    metrics.gauge("holderxr_singleflight", "Coalesced provider calls", lambda: metrics.flatten(singleflight_stats()))
+    metrics.gauge("holderxr_state_store", "In-memory FSM state store", state_store.stats)
+    metrics.gauge("holderxr_broadcast", "Broadcast sender", broadcast_stats)
+    metrics.gauge("holderxr_market", "Market data cache", market_stats)
+    metrics.gauge("holderxr_holder_index", "Local holder index", lambda: metrics.flatten(index_stats()))
+    metrics.gauge("holderxr_profiling", "Slow-update traces written and sampler state", profiling.profiling_stats)
+
+
 def create_bot_app():
     token = BOT_TOKEN or os.getenv("TELEGRAM_BOT_TOKEN")
     if not token:
         raise RuntimeError("TELEGRAM_BOT_TOKEN not set. Put it in .env or Render Environment Variables.")
 
     init_db()
+    state_store.claim()
+    state_store.load()
+    state_store.start_listener()
+    project_registry.reload_blocking()
+    project_registry.start_listener()
+
+    # Concurrent updates with per-user ordering and a bounded update queue
+    builder = (
+        Application.builder()
+        .token(token)
+        .request(metrics.instrumented_request(connection_pool_size=256))
+        .post_shutdown(on_shutdown)
+    )
+    app = configure_updates(builder).build()
 
-    app = Application.builder().token(token).build()
+    # Time every update end to end (first and last handler groups)
+    metrics.install(app)
+    register_gauges()
+    # Opt-in JSON-line traces of slow updates (TRACE_SLOW_UPDATE_MS)
+    profiling.install(app)
 
     # Register handlers
     app.add_handler(CommandHandler("start", cmd_start))
     app.add_handler(CommandHandler("admin", cmd_admin))
+    app.add_handler(CommandHandler("profile", cmd_profile))
     app.add_handler(CallbackQueryHandler(on_button))
     app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, on_message))
 
+    # Write FSM state changes to Postgres in batches
+    app.job_queue.run_repeating(flush_states, interval=STATE_FLUSH_INTERVAL, first=STATE_FLUSH_INTERVAL)
+
     # Schedule pin message
     app.job_queue.run_once(send_channel_pin, when=5)
 
+    # Pick up broadcasts interrupted by a restart (queued jobs resume on their own)
+    if JOB_QUEUE != "postgres":
+        app.job_queue.run_once(resume_broadcasts, when=10)
+
+    # Periodically re-verify holders and revoke wallets that sold
+    if SWEEP_INTERVAL > 0:
+        app.job_queue.run_repeating(reverify_holders, interval=SWEEP_INTERVAL, first=60)
+
+    # Fold new verifications into the admin dashboard summary tables
+    app.job_queue.run_repeating(refresh_stats, interval=STATS_REFRESH_INTERVAL, first=15)
+
+    # Transfer-log holder index for the configured projects (published to
+    # Postgres for the job workers when JOB_QUEUE=postgres|local)
+    if HOLDER_INDEX_PROJECTS:
+        app.job_queue.run_repeating(index_holders, interval=INDEX_POLL_INTERVAL, first=10)
+
+    # Keep price / FDV / liquidity warm for project views and pin posts
+    if MARKET_REFRESH_INTERVAL > 0:
+        app.job_queue.run_repeating(refresh_market, interval=MARKET_REFRESH_INTERVAL, first=5)
+
+    if CACHE_PG_ENABLED:
+        app.job_queue.run_repeating(purge_expired, interval=3600, first=300)
+
     log.info("🤖 Bot is ready (returning Application)...")
     return app
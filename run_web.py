@@ -1,12 +1,81 @@
 # run_web.py
 import os
+import json
+import signal
+import asyncio
 import logging
+
+import tornado.web
+from telegram import Update
+from telegram.ext import Application
+
 from main import create_bot_app
-from bot.config import BOT_TOKEN
+from bot.config import BOT_TOKEN, METRICS_PORT, METRICS_TOKEN
+from bot import metrics
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+
+# PTB's run_webhook() owns its tornado server, so the webhook endpoint is
+# served here instead, next to /metrics on the same port.
+class WebhookHandler(tornado.web.RequestHandler):
+    def initialize(self, app: Application, secret: str):
+        self.app = app
+        self.secret = secret
+
+    async def post(self):
+        if self.secret and self.request.headers.get("X-Telegram-Bot-Api-Secret-Token") != self.secret:
+            raise tornado.web.HTTPError(403)
+        try:
+            update = Update.de_json(json.loads(self.request.body), self.app.bot)
+        except (ValueError, TypeError):
+            raise tornado.web.HTTPError(400)
+        # Waits while the bounded update queue is full (backpressure to Telegram)
+        await self.app.update_queue.put(update)
+
+
+class MetricsHandler(tornado.web.RequestHandler):
+    def get(self):
+        if METRICS_TOKEN and self.request.headers.get("Authorization") != f"Bearer {METRICS_TOKEN}":
+            raise tornado.web.HTTPError(401)
+        self.set_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.write(metrics.render())
+
+
+async def serve(app: Application, port: int = 0, webhook_url: str = ""):
+    """Run the bot (webhook when `webhook_url` is set, else polling) and serve /metrics on `port`."""
+    routes = [(r"/metrics", MetricsHandler)]
+    if webhook_url:
+        secret = os.environ.get("WEBHOOK_SECRET", "")
+        routes.append((rf"/{BOT_TOKEN}/?", WebhookHandler, {"app": app, "secret": secret}))
+    server = tornado.web.Application(routes).listen(port, address="0.0.0.0") if port else None
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    try:
+        async with app:
+            if webhook_url:
+                await app.bot.set_webhook(
+                    webhook_url, allowed_updates=Update.ALL_TYPES, secret_token=secret or None
+                )
+            else:
+                await app.updater.start_polling(allowed_updates=Update.ALL_TYPES)
+            await app.start()
+            await stop.wait()
+            if not webhook_url:
+                await app.updater.stop()
+            await app.stop()
+        if app.post_shutdown:
+            await app.post_shutdown(app)
+    finally:
+        if server is not None:
+            server.stop()
+
+
 if __name__ == "__main__":
     app = create_bot_app()
     token = BOT_TOKEN
@@ -21,13 +90,12 @@ if __name__ == "__main__":
             "WEBHOOK_URL",
             f"https://{service_name}.onrender.com/{token}"
         )
-        logger.info("Starting webhook mode on port %s with URL %s", port, webhook_url)
-        app.run_webhook(
-            listen="0.0.0.0",
-            port=port,
-            url_path=token,
-            webhook_url=webhook_url,
-        )
+        logger.info("Starting webhook mode on port %s with URL %s (metrics at /metrics)", port, webhook_url)
+        asyncio.run(serve(app, port, webhook_url))
+    elif METRICS_PORT:
+        # Local dev (polling) with a metrics endpoint
+        logger.info("Starting polling mode with metrics on port %s", METRICS_PORT)
+        asyncio.run(serve(app, METRICS_PORT))
     else:
         # Local dev (polling)
         logger.info("Starting polling mode (local development)")
@@ -0,0 +1,95 @@
+import asyncio
+import base64
+
+from bot import blockchain, solana
+from tests.test_solana import ATA, MINT, OWNER, TOKEN_ACCOUNT
+
+OTHER_ACCOUNT = "3ZpD2tKV8cZTGWhB7W5rYyYeTKRVMapBTmnRwaZ8cBsR"
+
+
+class FakeRpc:
+    """JsonRpcClient stand-in answering from a {method: handler(params)} table."""
+
+    calls = []
+
+    def __init__(self, url, handlers):
+        self.url = url
+        self.handlers = handlers
+
+    async def call(self, method, params):
+        return (await self.batch([(method, params)]))[0]
+
+    async def batch(self, calls):
+        FakeRpc.calls.extend(method for method, _ in calls)
+        await asyncio.sleep(0)  # let concurrent callers join in-flight requests
+        return [self.handlers[method](params) for method, params in calls]
+
+
+def _token_account(amount):
+    raw = bytearray(solana.account_data(TOKEN_ACCOUNT))
+    raw[64:72] = amount.to_bytes(8, "little")
+    return {"owner": solana.TOKEN_PROGRAM_ID, "data": [base64.b64encode(bytes(raw)).decode(), "base64"]}
+
+
+def _solana(monkeypatch, ata_amount, other_amount):
+    handlers = {
+        "getAccountInfo": lambda params: {"value": {"owner": solana.TOKEN_PROGRAM_ID}},
+        "getMultipleAccounts": lambda params: {
+            "value": [_token_account(ata_amount) if key == ATA else None for key in params[0]]
+        },
+        "getTokenAccountsByOwner": lambda params: {"value": [
+            {"pubkey": ATA, "account": _token_account(ata_amount)},
+            {"pubkey": OTHER_ACCOUNT, "account": _token_account(other_amount)},
+        ]},
+    }
+    FakeRpc.calls = []
+    monkeypatch.setattr(blockchain, "JsonRpcClient", lambda url: FakeRpc(url, handlers))
+    blockchain._mint_programs.clear()
+
+
+def test_solana_ata_enough_skips_owner_scan(monkeypatch):
+    _solana(monkeypatch, ata_amount=500, other_amount=1000)
+    balance = asyncio.run(blockchain._solana_balance("stub", OWNER, MINT, 100))
+    assert balance == 500
+    assert "getTokenAccountsByOwner" not in FakeRpc.calls
+
+
+def test_solana_empty_ata_scans_other_accounts(monkeypatch):
+    _solana(monkeypatch, ata_amount=0, other_amount=1000)
+    assert asyncio.run(blockchain._solana_balance("stub", OWNER, MINT)) == 1000
+    assert "getTokenAccountsByOwner" in FakeRpc.calls
+
+
+def test_solana_short_ata_scans_other_accounts(monkeypatch):
+    _solana(monkeypatch, ata_amount=5, other_amount=100)
+    balances = asyncio.run(blockchain._solana_balances("stub", [(OWNER, MINT)], min_amount=50))
+    assert balances == {(OWNER, MINT): 105}
+
+
+SUI_WALLET = "0x" + "ab" * 32
+SUI_COIN = "0x2::sui::SUI"
+
+
+def test_sui_shared_flight_ignores_address_casing(monkeypatch):
+    handlers = {"suix_getAllBalances": lambda params: [{"coinType": SUI_COIN, "totalBalance": "7"}]}
+    FakeRpc.calls = []
+    monkeypatch.setattr(blockchain, "JsonRpcClient", lambda url: FakeRpc(url, handlers))
+    blockchain._sui_wallets.clear()
+
+    async def run():
+        return await asyncio.gather(
+            blockchain._sui_balance("stub", SUI_WALLET, SUI_COIN),
+            blockchain._sui_balance("stub", SUI_WALLET.upper().replace("0X", "0x"), SUI_COIN),
+        )
+
+    assert asyncio.run(run()) == [7, 7]
+    assert FakeRpc.calls == ["suix_getAllBalances"]
+
+
+def test_sui_bulk_balances_by_caller_casing(monkeypatch):
+    handlers = {"suix_getAllBalances": lambda params: [{"coinType": SUI_COIN, "totalBalance": "3"}]}
+    monkeypatch.setattr(blockchain, "JsonRpcClient", lambda url: FakeRpc(url, handlers))
+    monkeypatch.setattr(blockchain, "SUI_RPC_URL", "stub")
+    blockchain._sui_wallets.clear()
+    owners = [SUI_WALLET, SUI_WALLET.upper().replace("0X", "0x")]
+    assert asyncio.run(blockchain.bulk_balances_sui_async("0x2::sui::SUI", owners)) == dict.fromkeys(owners, 3)
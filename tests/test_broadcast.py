@@ -0,0 +1,66 @@
+import asyncio
+
+from bot import broadcast
+
+
+def test_pacers_are_per_event_loop():
+    async def contend():
+        bucket = broadcast._pacer().global_bucket
+        assert broadcast._pacer().global_bucket is bucket
+        bucket.set_rate(1000.0)
+        await asyncio.gather(*(bucket.acquire() for _ in range(3)))
+        return bucket
+
+    first = asyncio.run(contend())
+    second = asyncio.run(contend())  # a shared bucket's lock is bound to the first loop
+    assert first is not second
+
+
+class _Projects:
+    def __init__(self, rows):
+        self.rows = {p["id"]: p for p in rows}
+
+    def get(self, project_id):
+        return self.rows.get(project_id)
+
+    def by_channel(self, chat_id):
+        return next(p for p in self.rows.values() if p["channel_chat_id"] == chat_id)
+
+
+def test_pin_posts_each_projects_own_message(monkeypatch):
+    shared = [
+        {"id": 7, "channel_chat_id": "@shared"},
+        {"id": 9, "channel_chat_id": "@shared"},
+    ]
+    pages = [[(7, "@shared"), (9, "@shared")], []]
+    pinned = []
+
+    async def pin(bot, project):
+        pinned.append(project["id"])
+        return True
+
+    async def report(*args):
+        pass
+
+    monkeypatch.setattr(broadcast, "projects", _Projects(shared))
+    monkeypatch.setattr(broadcast, "pin_verification_post", pin)
+    monkeypatch.setattr(broadcast, "_report", report)
+    monkeypatch.setattr(broadcast.db, "get_broadcast_recipients", lambda *args: pages.pop(0))
+    monkeypatch.setattr(broadcast.db, "checkpoint_broadcast", lambda *args: "done" if args[-1] else "running")
+
+    b = {"id": 1, "kind": "pin", "project_id": None, "cursor": 0, "sent": 0, "failed": 0, "total": 2}
+    asyncio.run(broadcast._run(None, b))
+    assert sorted(pinned) == [7, 9]
+
+
+def test_flood_recovery_is_per_loop():
+    async def flood():
+        broadcast._on_flood(0.0)
+
+    async def run():
+        for _ in range(5):
+            broadcast._on_success()
+        await asyncio.to_thread(asyncio.run, flood())  # flood control in another loop
+        return broadcast._pacer().ok_since_flood
+
+    assert asyncio.run(run()) == 5
@@ -0,0 +1,119 @@
+import time
+import asyncio
+
+from bot import blockchain, indexer
+from tests.test_blockchain import FakeRpc
+
+TOKEN = "0x" + "11" * 20
+ALICE = "0x" + "aa" * 20
+BOB = "0x" + "bb" * 20
+ZERO = "0x" + "00" * 20
+
+
+def _topic(address):
+    return "0x" + "00" * 12 + address[2:]
+
+
+class FakeChain:
+    """Blocks with hashes and Transfer logs, served through FakeRpc."""
+
+    def __init__(self, tip):
+        self.tip = tip
+        self.hashes = {n: f"0x{n:x}a" for n in range(tip + 1)}
+        self.logs = []
+
+    def transfer(self, block, src, dst, value):
+        self.logs.append({
+            "blockNumber": hex(block),
+            "topics": [indexer.TRANSFER_TOPIC, _topic(src), _topic(dst)],
+            "data": hex(value),
+        })
+
+    def reorg(self, from_block, new_tip):
+        """Replace every block from `from_block` on (and their logs)."""
+        self.logs = [log for log in self.logs if int(log["blockNumber"], 16) < from_block]
+        self.tip = new_tip
+        for n in range(from_block, new_tip + 1):
+            self.hashes[n] = f"0x{n:x}b"
+
+    def get_logs(self, params):
+        start, end = int(params[0]["fromBlock"], 16), int(params[0]["toBlock"], 16)
+        return [log for log in self.logs if start <= int(log["blockNumber"], 16) <= end]
+
+    def handlers(self):
+        return {
+            "eth_blockNumber": lambda params: hex(self.tip),
+            "eth_getBlockByNumber": lambda params: {"hash": self.hashes[int(params[0], 16)]},
+            "eth_getLogs": self.get_logs,
+        }
+
+
+def _index(monkeypatch, chain, **kwargs):
+    monkeypatch.setattr(indexer, "JsonRpcClient", lambda url: FakeRpc(url, chain.handlers()))
+    return indexer.HolderIndex("eth", TOKEN, reorg_depth=12, **kwargs)
+
+
+def _advance(index, chain, *tips):
+    for tip in tips:
+        chain.tip = max(chain.tip, tip)
+        for n in range(tip + 1):
+            chain.hashes.setdefault(n, f"0x{n:x}a")
+        asyncio.run(index.step())
+
+
+def test_reorg_inside_window_is_rolled_back(monkeypatch):
+    chain = FakeChain(tip=10)
+    chain.transfer(2, ZERO, ALICE, 100)
+    chain.transfer(18, ALICE, BOB, 40)
+    index = _index(monkeypatch, chain)
+    _advance(index, chain, 10, 15, 20)
+    assert index.balance(BOB) == 40
+
+    chain.reorg(from_block=17, new_tip=21)  # the transfer at block 18 is gone
+    asyncio.run(index.step())
+
+    assert index.head == 21
+    assert index.balance(ALICE) == 100
+    assert index.balance(BOB) == 0
+    assert index.logs_applied == 2  # undone in place, not rebuilt
+
+
+def test_reorg_deeper_than_window_rebuilds(monkeypatch):
+    chain = FakeChain(tip=10)
+    chain.transfer(2, ZERO, ALICE, 100)
+    index = _index(monkeypatch, chain, publish=True)
+    _advance(index, chain, 10, 15, 20)
+    index._wiped = False  # as after a successful publish
+
+    chain.reorg(from_block=1, new_tip=22)
+    chain.transfer(3, ZERO, BOB, 7)
+    asyncio.run(index.step())
+
+    assert index.balance(ALICE) == 0
+    assert index.balance(BOB) == 7
+    assert index.logs_applied == 1
+    assert index._wiped  # published rows are dropped with the next publish
+
+
+def test_index_is_behind_once_tip_refresh_stalls(monkeypatch):
+    chain = FakeChain(tip=10)
+    chain.transfer(2, ZERO, ALICE, 100)
+    index = _index(monkeypatch, chain)
+    _advance(index, chain, 10)
+    assert index.balance(ALICE) == 100
+
+    index.refreshed_at = time.time() - indexer.INDEX_MAX_AGE - 1
+    assert not index.caught_up
+    assert index.balance(ALICE) is None
+
+
+def test_indexed_balance_below_minimum_asks_rpc(monkeypatch):
+    async def indexed(chain, contract, address):
+        return 0
+
+    async def hedged(chain, address, contract):
+        return 500
+
+    monkeypatch.setattr(indexer, "indexed_balance", indexed)
+    monkeypatch.setattr(blockchain.registry, "hedged", hedged)
+    assert asyncio.run(blockchain._is_holder_evm(ALICE, TOKEN, 100))
@@ -0,0 +1,113 @@
+import asyncio
+
+from bot import blockchain, multicall
+
+USDC = "0xA0b86991c6218b36c1d19D4a2e9Eb0cE3606eB48"
+HOLDER = "0x28C6c06298d514Db089934071355E5743bf21d60"
+HOLDER_2 = "0x0000000000000000000000000000000000000001"
+HOLDER_3 = "0x00000000000000000000000000000000000000a3"
+
+
+def _balance_of(holder):
+    return bytes.fromhex(blockchain.balance_of_data(holder)[2:])
+
+
+# aggregate3 calldata for balanceOf(HOLDER) and balanceOf(HOLDER_2) on USDC,
+# one ABI word per line (cross-checked against eth_abi)
+AGGREGATE3_CALLDATA = (
+    "0x82ad56cb"
+    "0000000000000000000000000000000000000000000000000000000000000020"
+    "0000000000000000000000000000000000000000000000000000000000000002"
+    "0000000000000000000000000000000000000000000000000000000000000040"
+    "0000000000000000000000000000000000000000000000000000000000000100"
+    "000000000000000000000000a0b86991c6218b36c1d19d4a2e9eb0ce3606eb48"
+    "0000000000000000000000000000000000000000000000000000000000000001"
+    "0000000000000000000000000000000000000000000000000000000000000060"
+    "0000000000000000000000000000000000000000000000000000000000000024"
+    "70a0823100000000000000000000000028c6c06298d514db089934071355e574"
+    "3bf21d6000000000000000000000000000000000000000000000000000000000"
+    "000000000000000000000000a0b86991c6218b36c1d19d4a2e9eb0ce3606eb48"
+    "0000000000000000000000000000000000000000000000000000000000000001"
+    "0000000000000000000000000000000000000000000000000000000000000060"
+    "0000000000000000000000000000000000000000000000000000000000000024"
+    "70a0823100000000000000000000000000000000000000000000000000000000"
+    "0000000100000000000000000000000000000000000000000000000000000000"
+)
+
+# aggregate3 return data: a balance of 123456789, a reverted call
+# (Error("ERC20: invalid holder")) and a success with empty return data
+# (e.g. a target without code)
+AGGREGATE3_RESULT = (
+    "0x"
+    "0000000000000000000000000000000000000000000000000000000000000020"
+    "0000000000000000000000000000000000000000000000000000000000000003"
+    "0000000000000000000000000000000000000000000000000000000000000060"
+    "00000000000000000000000000000000000000000000000000000000000000e0"
+    "00000000000000000000000000000000000000000000000000000000000001c0"
+    "0000000000000000000000000000000000000000000000000000000000000001"
+    "0000000000000000000000000000000000000000000000000000000000000040"
+    "0000000000000000000000000000000000000000000000000000000000000020"
+    "00000000000000000000000000000000000000000000000000000000075bcd15"
+    "0000000000000000000000000000000000000000000000000000000000000000"
+    "0000000000000000000000000000000000000000000000000000000000000040"
+    "0000000000000000000000000000000000000000000000000000000000000064"
+    "08c379a000000000000000000000000000000000000000000000000000000000"
+    "0000002000000000000000000000000000000000000000000000000000000000"
+    "0000001545524332303a20696e76616c696420686f6c64657200000000000000"
+    "0000000000000000000000000000000000000000000000000000000000000000"
+    "0000000000000000000000000000000000000000000000000000000000000001"
+    "0000000000000000000000000000000000000000000000000000000000000040"
+    "0000000000000000000000000000000000000000000000000000000000000000"
+)
+
+
+def test_encode_aggregate3():
+    calls = [(USDC, True, _balance_of(HOLDER)), (USDC, True, _balance_of(HOLDER_2))]
+    assert multicall.encode_aggregate3(calls) == AGGREGATE3_CALLDATA
+
+
+def test_decode_aggregate3():
+    results = multicall.decode_aggregate3(AGGREGATE3_RESULT)
+    assert [ok for ok, _ in results] == [True, False, True]
+    assert multicall.decode_uint256(results[0][1]) == 123456789
+    assert results[1][1][:4] == bytes.fromhex("08c379a0")
+    assert b"ERC20: invalid holder" in results[1][1]
+    assert results[2][1] == b""
+
+
+def test_decode_uint256_short_return():
+    assert multicall.decode_uint256(b"") is None
+    assert multicall.decode_uint256(b"\x01" * 31) is None
+    assert multicall.decode_uint256((5).to_bytes(32, "big") + b"\xff") == 5
+
+
+def test_chunk_calls_respects_budgets():
+    calls = [(USDC, True, _balance_of(HOLDER))] * 10
+    assert [len(c) for c in multicall.chunk_calls(calls, max_gas=4 * multicall.GAS_PER_BALANCE_OF)] == [4, 4, 2]
+    per_call = multicall.encoded_size(calls[0])
+    assert [len(c) for c in multicall.chunk_calls(calls, max_calldata=68 + 3 * per_call)] == [3, 3, 3, 1]
+    for chunk in multicall.chunk_calls(calls, max_calldata=68 + 3 * per_call):
+        assert len(multicall.encode_aggregate3(chunk)) // 2 - 1 <= 68 + 3 * per_call
+
+
+def test_bulk_balances_maps_failed_and_short_calls_to_none(monkeypatch):
+    sent = []
+
+    class Rpc:
+        def __init__(self, url):
+            pass
+
+        async def call(self, method, params):
+            sent.append(params[0]["data"])
+            return AGGREGATE3_RESULT
+
+    monkeypatch.setattr(blockchain, "JsonRpcClient", Rpc)
+    monkeypatch.setattr(blockchain, "evm_rpc_url", lambda chain: "stub")
+    balances = asyncio.run(blockchain.bulk_balances_async("eth", USDC, [HOLDER, HOLDER_2, HOLDER_3, "0xnope"]))
+    assert balances == {
+        HOLDER.lower(): 123456789,
+        HOLDER_2.lower(): None,
+        HOLDER_3.lower(): None,
+        "0xnope": None,
+    }
+    assert len(sent) == 1
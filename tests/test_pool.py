@@ -0,0 +1,40 @@
+import threading
+
+from bot import pool
+from bot.pool import PgPool
+
+
+class FakeConnection:
+    closed = 0
+    status = 1  # psycopg2.extensions.STATUS_READY
+
+    def cursor(self):
+        raise AssertionError("no queries expected")
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = 1
+
+
+def test_counters_under_concurrent_checkouts(monkeypatch):
+    monkeypatch.setattr(pool.psycopg2, "connect", lambda dsn: FakeConnection())
+    p = PgPool("stub", minconn=0, maxconn=8, max_age=0.0)  # every checkin recycles
+
+    def work():
+        for _ in range(200):
+            p.putconn(p.getconn())
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    stats = p.stats()
+    assert stats["checkouts"] == 1600
+    assert stats["created"] == 1600
+    assert stats["recycled"] == 1600
+    assert stats["in_use"] == 0
+    assert not p._born
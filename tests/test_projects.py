@@ -0,0 +1,37 @@
+import asyncio
+
+from bot import projects
+from bot.projects import ProjectRegistry
+
+ROWS = [
+    {"id": 1, "network": "eth", "contract_address": "0xAbC", "channel_chat_id": "@Chan"},
+    {"id": 2, "network": "solana", "contract_address": "Mint", "channel_chat_id": None},
+]
+
+
+def test_lookups_use_the_loaded_snapshot(monkeypatch):
+    calls = []
+    monkeypatch.setattr(projects.db, "get_all_projects", lambda: calls.append(1) or ROWS)
+    registry = ProjectRegistry()
+
+    assert registry.get(1)["id"] == 1  # first use of a cold registry loads once
+    assert registry.by_channel("@chan")["id"] == 1
+    assert registry.by_contract("ETH", "0xabc")["id"] == 1
+    assert registry.latest()["id"] == 2
+    assert [p["id"] for p in registry.all()] == [1, 2]
+    assert len(calls) == 1
+
+
+def test_reload_swaps_without_blocking_lookups(monkeypatch):
+    async def rows():
+        return ROWS[:1]
+
+    def blocking_load():
+        raise AssertionError("lookup fell back to the blocking DB layer")
+
+    monkeypatch.setattr(projects.adb, "get_all_projects", rows)
+    monkeypatch.setattr(projects.db, "get_all_projects", blocking_load)
+    registry = ProjectRegistry()
+    asyncio.run(registry.reload())
+    assert registry.latest()["id"] == 1
+    assert registry.get(2) is None
@@ -0,0 +1,119 @@
+import os
+import sys
+import time
+import asyncio
+import threading
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from bot import blockchain, httpclient
+from bot.config import HEDGE_MIN_DELAY
+from bot.providers import Provider, ProviderRegistry
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), "bench"))
+from stub_rpc import StubState, make_handler  # noqa: E402
+
+CONTRACT = "0xA0b86991c6218b36c1d19D4a2e9Eb0cE3606eB48"
+WALLET = "0x28C6c06298d514Db089934071355E5743bf21d60"
+SLOW = 0.8
+FAST = 0.01
+
+
+class _QuietServer(ThreadingHTTPServer):
+    def handle_error(self, request, client_address):
+        pass  # cancelled hedge losers close their connection mid-response
+
+
+def _stub(latency):
+    state = StubState(latency, 0.0, 0.0, 1.0)
+    server = _QuietServer(("127.0.0.1", 0), make_handler(state))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state
+
+
+@pytest.fixture
+def stubs():
+    (slow, slow_state), (fast, fast_state) = _stub(SLOW), _stub(FAST)
+    yield {
+        "slow": (f"http://127.0.0.1:{slow.server_port}/rpc/eth", slow_state),
+        "fast": (f"http://127.0.0.1:{fast.server_port}/rpc/eth", fast_state),
+    }
+    slow.shutdown()
+    fast.shutdown()
+
+
+def _provider(name, url):
+    return Provider(name, "eth", lambda a, c: blockchain._evm_balance_rpc(url, a, c))
+
+
+def _race(registry, calls=1):
+    async def run():
+        try:
+            out = []
+            for _ in range(calls):
+                started = time.monotonic()
+                out.append((await registry.hedged("eth", WALLET, CONTRACT), time.monotonic() - started))
+            return out
+        finally:
+            await httpclient.aclose()
+
+    return asyncio.run(run())
+
+
+def test_hedge_fires_after_p95_delay_and_cancels_loser(stubs):
+    registry = ProviderRegistry()
+    slow = _provider("slow", stubs["slow"][0])
+    fast = _provider("fast", stubs["fast"][0])
+    # The slow provider looks fastest so far, with a p95 below the hedge floor
+    slow.record(0.01, ok=True)
+    fast.record(0.05, ok=True)
+    registry.register(fast)
+    registry.register(slow)
+    assert registry.providers("eth") == [slow, fast]
+
+    [(balance, elapsed)] = _race(registry)
+
+    assert balance is not None
+    assert HEDGE_MIN_DELAY <= elapsed < SLOW
+    assert stubs["slow"][1].requests["/rpc/eth"] == 1
+    assert stubs["fast"][1].requests["/rpc/eth"] == 1
+    # The loser was cancelled: no outcome recorded, but its EWMA rose
+    assert slow.requests == 1 and slow.failures == 0
+    assert slow.ewma >= 0.2 * HEDGE_MIN_DELAY
+    assert fast.requests == 2
+
+
+def test_ewma_reorders_providers(stubs):
+    registry = ProviderRegistry()
+    slow = _provider("slow", stubs["slow"][0])
+    fast = _provider("fast", stubs["fast"][0])
+    slow.record(0.01, ok=True)
+    registry.register(slow)
+    registry.register(fast)  # unmeasured providers are tried first
+
+    _race(registry, calls=3)
+
+    # A cancelled loss pushes the slow provider behind the fast one, after
+    # which it no longer gets requests
+    assert registry.providers("eth") == [fast, slow]
+    assert fast.ewma < slow.ewma
+    before = stubs["slow"][1].requests["/rpc/eth"]
+    _race(registry, calls=3)
+    assert stubs["slow"][1].requests["/rpc/eth"] == before
+
+
+def test_fast_primary_needs_no_hedge(stubs):
+    registry = ProviderRegistry()
+    slow = _provider("slow", stubs["slow"][0])
+    fast = _provider("fast", stubs["fast"][0])
+    fast.record(0.01, ok=True)
+    slow.record(0.5, ok=True)
+    registry.register(slow)
+    registry.register(fast)
+
+    [(balance, elapsed)] = _race(registry)
+
+    assert balance is not None and elapsed < HEDGE_MIN_DELAY
+    assert stubs["slow"][1].requests["/rpc/eth"] == 0
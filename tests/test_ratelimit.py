@@ -0,0 +1,64 @@
+import asyncio
+
+import pytest
+
+from bot import ratelimit
+from bot.ratelimit import CircuitBreaker, ProviderUnavailable, TokenBucket
+
+
+def _half_open_breaker(monkeypatch, key):
+    breaker = CircuitBreaker(threshold=1, cooldown=0.0)
+    breaker.record_failure()
+    monkeypatch.setitem(ratelimit._breakers, key, breaker)
+    assert breaker.state == "half_open"
+    return breaker
+
+
+def test_admit_rejected_in_queue_releases_probe(monkeypatch):
+    async def run():
+        breaker = _half_open_breaker(monkeypatch, "queue")
+        bucket, _ = ratelimit.limiter("queue", "example.org")
+        bucket.pause(60)
+        with pytest.raises(ProviderUnavailable):
+            await ratelimit.admit("queue", "example.org", max_wait=0.01)
+        assert breaker.allow()
+
+    asyncio.run(run())
+
+
+def test_admit_cancelled_in_queue_releases_probe(monkeypatch):
+    async def run():
+        breaker = _half_open_breaker(monkeypatch, "cancel")
+        bucket, _ = ratelimit.limiter("cancel", "example.org")
+        bucket.pause(60)
+        task = asyncio.ensure_future(ratelimit.admit("cancel", "example.org", max_wait=None))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert breaker.allow()
+
+    asyncio.run(run())
+
+
+def test_bucket_rejects_past_deadline():
+    async def run():
+        bucket = TokenBucket(rate=1.0, burst=1.0)
+        await bucket.acquire()
+        with pytest.raises(ProviderUnavailable):
+            await bucket.acquire(max_wait=0.1)
+        assert bucket.rejected == 1
+
+    asyncio.run(run())
+
+
+def test_buckets_are_per_event_loop():
+    async def contend():
+        bucket, _ = ratelimit.limiter("loops", "example.org")
+        bucket.pause(0.02)
+        await asyncio.gather(bucket.acquire(), bucket.acquire())
+        return bucket
+
+    first = asyncio.run(contend())
+    second = asyncio.run(contend())  # would raise "bound to a different event loop"
+    assert first is not second
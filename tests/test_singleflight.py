@@ -0,0 +1,38 @@
+import asyncio
+
+from bot.singleflight import SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    group = SingleFlight("test_share")
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return 42
+
+    async def run():
+        return await asyncio.gather(*(group.do("k", fetch) for _ in range(5)))
+
+    assert asyncio.run(run()) == [42] * 5
+    assert len(calls) == 1
+    assert group.stats()["coalesced"] == 4 and group.stats()["in_flight"] == 0
+
+
+def test_flight_left_in_a_dead_loop_is_not_joined():
+    group = SingleFlight("test_loops")
+
+    async def hang():
+        await asyncio.sleep(3600)
+
+    async def abandon():
+        asyncio.ensure_future(group.do("k", hang))
+        await asyncio.sleep(0)
+
+    asyncio.run(abandon())  # loop closes with the flight still registered
+
+    async def fresh():
+        return await group.do("k", lambda: asyncio.sleep(0, result="fresh"))
+
+    assert asyncio.run(asyncio.wait_for(fresh(), 1)) == "fresh"
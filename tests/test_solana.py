@@ -0,0 +1,87 @@
+from bot import solana
+
+OWNER = "9WzDXwBbmkg8ZTbNMqUxvQRAyrZzDsGYdLVL9zYtAWWM"
+MINT = "EPjFWdd5AufqSSqeM2qJxdDwkfUgyWvK5hJdx4ZiT5Pg"
+MINT_2022 = "2b1kV6DkPAnxd5ixfnxCpjxmKwqjjaYmCZfHsFu24GXo"
+
+# Expected ATAs as derived by solders' Pubkey.find_program_address
+ATA = "6kgsVUiMY28SnedG4kxzjSqfphcj9LXu2cdqJXgff4gS"
+ATA_2022 = "897krAvWH3RbymaCYE3o9emopUwocieHuKTUk9nySpq6"
+
+# getMultipleAccounts values (encoding=base64)
+TOKEN_ACCOUNT = {
+    "owner": solana.TOKEN_PROGRAM_ID,
+    "data": [
+        "xvp6877brTo9ZfNqq8kqeeMR60MP9qdpUwbseAYLn5N+jAiHYL/eHd3PMsF/IJuCQu5SqvEx+s2I0OosbQsG8ofWEgAAAAAAAAAA"
+        "AAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAQAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA"
+        "AAAAAAAAAAAAAAAAAAAA",
+        "base64",
+    ],
+}
+# Token-2022 account with the account-type byte and an ImmutableOwner extension
+TOKEN_2022_ACCOUNT = {
+    "owner": solana.TOKEN_2022_PROGRAM_ID,
+    "data": [
+        "F5JIO2yKKoe3Rx2BT5WR+TlchAqc49n01bp9OkuKdJ5+jAiHYL/eHd3PMsF/IJuCQu5SqvEx+s2I0OosbQsG8gDyBSoBAAAAAAAA"
+        "AAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAQAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA"
+        "AAAAAAAAAAAAAAAAAAAAAgcAAAA=",
+        "base64",
+    ],
+}
+FROZEN_ACCOUNT = {
+    "owner": solana.TOKEN_PROGRAM_ID,
+    "data": [
+        "xvp6877brTo9ZfNqq8kqeeMR60MP9qdpUwbseAYLn5N+jAiHYL/eHd3PMsF/IJuCQu5SqvEx+s2I0OosbQsG8ioAAAAAAAAAAAAA"
+        "AAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAgAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA"
+        "AAAAAAAAAAAAAAAAAAAA",
+        "base64",
+    ],
+}
+
+
+def test_program_ids_are_pubkeys():
+    for program in (*solana.TOKEN_PROGRAMS, solana.ASSOCIATED_TOKEN_PROGRAM_ID):
+        assert solana.is_pubkey(program), program
+
+
+def test_associated_token_address():
+    assert solana.associated_token_address(OWNER, MINT) == ATA
+    assert solana.associated_token_address(OWNER, MINT, solana.TOKEN_PROGRAM_ID) == ATA
+
+
+def test_associated_token_address_token_2022():
+    assert solana.associated_token_address(OWNER, MINT_2022, solana.TOKEN_2022_PROGRAM_ID) == ATA_2022
+
+
+def test_associated_token_address_malformed():
+    assert solana.associated_token_address("not-a-key", MINT) is None
+    assert solana.associated_token_address(OWNER, MINT + "1") is None
+
+
+def test_b58_roundtrip():
+    for key in (OWNER, MINT, "11111111111111111111111111111111"):
+        assert solana.b58encode(solana.b58decode(key)) == key
+
+
+def test_decode_token_account():
+    token = solana.decode_token_account(solana.account_data(TOKEN_ACCOUNT))
+    assert token == solana.TokenAccount(mint=MINT, owner=OWNER, amount=1234567, frozen=False)
+
+
+def test_decode_token_2022_account():
+    token = solana.decode_token_account(solana.account_data(TOKEN_2022_ACCOUNT))
+    assert token == solana.TokenAccount(mint=MINT_2022, owner=OWNER, amount=5_000_000_000, frozen=False)
+
+
+def test_decode_frozen_account():
+    token = solana.decode_token_account(solana.account_data(FROZEN_ACCOUNT))
+    assert token.amount == 42 and token.frozen
+
+
+def test_decode_rejects_non_accounts():
+    raw = solana.account_data(TOKEN_ACCOUNT)
+    assert solana.decode_token_account(raw[:82]) is None  # mint-sized
+    assert solana.decode_token_account(raw[:108] + b"\x00" + raw[109:]) is None  # uninitialized
+    mint_2022 = solana.account_data(TOKEN_2022_ACCOUNT)
+    assert solana.decode_token_account(mint_2022[:165] + b"\x01" + mint_2022[166:]) is None  # account type Mint
+    assert solana.account_data({"data": ["", "base58"]}) == b""
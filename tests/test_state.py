@@ -0,0 +1,19 @@
+import pytest
+
+from bot import state
+from bot.state import StateStore
+
+
+def test_second_front_end_is_refused(monkeypatch):
+    monkeypatch.setattr(state.db, "try_claim_state_owner", lambda: None)
+    with pytest.raises(RuntimeError, match="Another bot front end"):
+        StateStore().claim(wait=0)
+
+
+def test_claim_keeps_the_lock_connection(monkeypatch):
+    lock = object()
+    monkeypatch.setattr(state.db, "try_claim_state_owner", lambda: lock)
+    store = StateStore()
+    store.claim(wait=0)
+    store.claim(wait=0)  # idempotent
+    assert store._owner is lock
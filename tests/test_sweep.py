@@ -0,0 +1,42 @@
+import asyncio
+
+from bot import blockchain, sweep
+from bot.cache import MISSING
+
+
+def test_budgets_are_per_event_loop():
+    async def contend():
+        budget = sweep._budget("solana")
+        assert sweep._budget("pumpfun") is budget  # one budget per provider key
+        budget.set_rate(1000.0)
+        await asyncio.gather(budget.acquire(), budget.acquire())
+        return budget
+
+    first = asyncio.run(contend())
+    second = asyncio.run(contend())  # a shared bucket's lock is bound to the first loop
+    assert first is not second
+
+
+def test_revoked_wallets_lose_cached_holder_answers(monkeypatch):
+    project = {"id": 1, "network": "eth", "contract_address": "0xToken"}
+    deleted = []
+
+    async def balances(network, contract, wallets, min_amount):
+        return {"0xHolder": 5, "0xSeller": 0}
+
+    async def pg_delete(keys):
+        deleted.extend(keys)
+
+    monkeypatch.setattr(sweep, "bulk_token_balances_async", balances)
+    monkeypatch.setattr(sweep, "record_holder_checks", lambda results: None)
+    monkeypatch.setattr(blockchain._pg_cache, "delete", pg_delete)
+    for wallet in ("0xHolder", "0xSeller"):
+        blockchain._holder_cache.set(blockchain._holder_key("eth", wallet, "0xToken", 1), True, 60)
+
+    checked, revoked = asyncio.run(sweep._check_page(project, [(1, "0xHolder"), (2, "0xSeller")], 1))
+
+    assert (checked, revoked) == (2, 1)
+    seller = blockchain._holder_key("eth", "0xSeller", "0xToken", 1)
+    assert deleted == [seller]
+    assert blockchain._holder_cache.get(seller) is MISSING
+    assert blockchain._holder_cache.get(blockchain._holder_key("eth", "0xHolder", "0xToken", 1)) is True
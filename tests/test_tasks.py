@@ -0,0 +1,55 @@
+import asyncio
+
+from bot import state, tasks
+from bot.jobs import JobContext
+
+PROJECT = {"id": 3, "network": "eth", "contract_address": "0xToken", "group_invite_link": None}
+
+
+class FakeBot:
+    def __init__(self):
+        self.sent = []
+
+    async def send_message(self, chat_id, text, **kwargs):
+        self.sent.append(text)
+
+
+def _check(monkeypatch, holds):
+    async def is_holder(*args):
+        return holds
+
+    async def save(*args):
+        pass
+
+    monkeypatch.setattr(tasks, "is_token_holder_async", is_holder)
+    monkeypatch.setattr(tasks, "save_verified_user", save)
+    monkeypatch.setattr(tasks.projects, "get", lambda pid: PROJECT)
+    monkeypatch.setattr(tasks, "distributed", lambda: False)
+    monkeypatch.setattr(state.store, "_loaded", True)
+    state.upsert_state(11, "VERIFY_WALLET", '{"project_id": 3}')
+
+    bot = FakeBot()
+    payload = {"chat_id": 11, "telegram_id": 11, "project_id": 3, "wallet": "0xWallet"}
+    asyncio.run(tasks.holder_check(JobContext(bot, None, 1, 3), payload))
+    return bot.sent
+
+
+def test_non_holder_can_send_another_wallet(monkeypatch):
+    sent = _check(monkeypatch, holds=False)
+    assert "Send another wallet address" in sent[0]
+    assert state.get_state(11)[0] == "VERIFY_WALLET"
+
+
+def test_holder_leaves_wallet_prompt(monkeypatch):
+    sent = _check(monkeypatch, holds=True)
+    assert sent == ["🎉 Verified!"]
+    assert state.get_state(11) == (None, None)
+
+
+def test_clear_only_if_still_in_state(monkeypatch):
+    monkeypatch.setattr(state.store, "_loaded", True)
+    state.upsert_state(12, "CFG_GROUP", "{}")
+    state.store._apply("12:VERIFY_WALLET")  # the user has moved on
+    assert state.get_state(12)[0] == "CFG_GROUP"
+    state.store._apply("12:CFG_GROUP")
+    assert state.get_state(12) == (None, None)
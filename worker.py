@@ -0,0 +1,68 @@
+# worker.py
+import signal
+import asyncio
+import logging
+import argparse
+import multiprocessing
+
+from telegram import Bot
+
+from bot.config import BOT_TOKEN, WORKER_CONCURRENCY, WORKER_PROCESSES
+from bot.db import init_db
+from bot.httpclient import aclose as close_http_clients
+from bot.jobs import Worker
+from bot.projects import registry as projects
+from bot import tasks  # noqa: F401  (registers job kinds)
+
+logging.basicConfig(
+    format="%(asctime)s [%(levelname)s] %(process)d %(name)s: %(message)s",
+    level=logging.INFO,
+    force=True,
+)
+logger = logging.getLogger("worker")
+
+
+async def serve(concurrency: int):
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    # Jobs resolve projects from the registry: keep it in step with edits
+    await projects.reload()
+    projects.start_listener()
+
+    async with Bot(BOT_TOKEN) as bot:
+        try:
+            await Worker(bot, concurrency).run(stop)
+        finally:
+            await close_http_clients()
+
+
+def run_process(concurrency: int):
+    asyncio.run(serve(concurrency))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run job workers (JOB_QUEUE=postgres)")
+    parser.add_argument("--processes", type=int, default=WORKER_PROCESSES)
+    parser.add_argument("--concurrency", type=int, default=WORKER_CONCURRENCY)
+    args = parser.parse_args()
+
+    if not BOT_TOKEN:
+        raise RuntimeError("TELEGRAM_BOT_TOKEN not set.")
+    init_db()
+
+    if args.processes <= 1:
+        run_process(args.concurrency)
+    else:
+        ctx = multiprocessing.get_context("spawn")
+        procs = [ctx.Process(target=run_process, args=(args.concurrency,), daemon=False) for _ in range(args.processes)]
+        for proc in procs:
+            proc.start()
+        logger.info("Started %d worker processes", len(procs))
+        # Ctrl+C reaches the whole process group; forward SIGTERM so children drain
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGTERM, lambda *_: [proc.terminate() for proc in procs])
+        for proc in procs:
+            proc.join()